@@ -1,109 +1,188 @@
 from collections import defaultdict
-from threading import Thread
-from queue import Queue
+from contextlib import nullcontext
 from core.database import ohlcv_functions
-from core.markets import ticker
+from core.markets import scheduler
 from ccxt import BaseError
 import ccxt
 import logging
-import time
 from pubsub import pub
 from threading import Lock
 
 lock = Lock()
 logger = logging.getLogger(__name__)
 
+# Seconds after a candle closes before it is pulled, so the exchange has closed it too
+CLOSE_DELAY = 2
+# Pulls of one candle before waiting for the next close instead
+PULL_RETRIES = 5
+# Syncs of the historical candles before waiting for the next close to try again
+SYNC_RETRIES = 5
+# Candles loaded for a market without history in the DB, and candles per request while syncing
+HISTORY_CANDLES = 1000
+PAGE_CANDLES = 500
+
 class MarketWatcher:
-    """Active object that subscribes to a ticker of a specific interval and keeps track of OHLCV data
-     A market watcher is instantiated with a trading pair (base, quote) and an interval
-     It then subscribes to the ticker of that interval and calls for candles each time period
-     It is responsible for syncing data with the DB and adding new candles
-     Strategies that subscribe to the ticker will be given the new candles"""
+    """Keeps track of the OHLCV data of a trading pair (base, quote) at one interval
+     A market watcher has no thread of its own: the shared scheduler runs its jobs.
+     It syncs historical candles with the DB, then pulls each candle just after it
+     closes and adds it to the DB. Strategies that subscribe are given the new candles"""
     def __init__(self, exchange, base_currency, quote_currency, interval):
         exchange = getattr(ccxt, exchange)
-        ticker.subscribe(self.tick, interval)
         self.analysis_pair = '{}/{}'.format(base_currency, quote_currency)
         self.exchange = exchange()
         self.interval = interval
+        self.interval_seconds = self.exchange.parse_timeframe(interval)
         self.base_currency = base_currency
         self.quote_currency = quote_currency
         self.topic = self.exchange.id + self.analysis_pair + self.interval
-        self.__thread = Thread(target=self.__run)  # create thread for listener
-        self._jobs = Queue()  # create job queue
-        self.__running = False
+        self.scheduler = scheduler.get_scheduler()
+        self.__running = True
+        self.__next_pull = None
+        self.__next_sync = None
         self.historical_synced = False
         self.latest_candle = None
         self.PairID = ohlcv_functions.write_trade_pairs_to_db(self.exchange.id, self.base_currency, self.quote_currency, self.interval)
-        self.__thread.start()
-
-    def __run(self):
-        """Start listener queue waiting for ticks"""
-        self.__running = True
         self.sync_historical()
-        while self.__running:
-            if not self._jobs.empty():
-                job = self._jobs.get()
-                try:
-                    job()
-                except Exception as e:
-                    print(e)
-                    logger.error(job.__name__ + " threw error:\n" + str(e))
 
     def stop(self):
-        """Stop listener queue"""
+        """Stop pulling candles"""
         self.__running = False
+        self.__cancel_pull()
+        if self.__next_sync is not None:
+            self.scheduler.cancel(self.__next_sync)
+            self.__next_sync = None
 
     def tick(self):
         """Queue a pull of the latest candle"""
         if self.historical_synced:
-            self._jobs.put(lambda: self.__pull_latest_candle(self.interval))
+            self.scheduler.submit(self.__pull_latest_candle)
 
     def sync_historical(self):
         """Queue loading of historical candles"""
-        self._jobs.put(lambda: self.__sync_historical())
+        self.scheduler.submit(self.__sync_historical)
 
     def get_historical_candles(self):
         data = ohlcv_functions.get_all_candles(self.PairID)
         return data
 
-    def __sync_historical(self):
-        """Load all missing historical candles to database"""
-        logger.info('Syncing market candles with DB...')
-        latest_db_candle = ohlcv_functions.get_latest_candle(self.exchange.id, self.analysis_pair, self.interval)
-        data = self.exchange.fetch_ohlcv(self.analysis_pair, self.interval)
-        if latest_db_candle is None:
-            logger.info("No historical data for market, adding all available OHLCV data")
-            for entry in data:
-                ohlcv_functions.insert_data_into_ohlcv_table(self.exchange.id, self.analysis_pair, self.interval, entry, self.PairID)
-                print('Writing candle ' + str(entry[0]) + ' to database')
+    def __cancel_pull(self):
+        if self.__next_pull is not None:
+            self.scheduler.cancel(self.__next_pull)
+            self.__next_pull = None
+
+    def __schedule_next_pull(self):
+        """Pull the next candle just after it closes"""
+        self.__cancel_pull()
+        if self.__running:
+            when = scheduler.next_close(self.interval_seconds) + CLOSE_DELAY
+            self.__next_pull = self.scheduler.call_at(when, self.__pull_latest_candle)
+
+    def __retry_pull(self, attempt, candle_ts):
+        """Try the pull of candle ``candle_ts`` again later, or give up on it and wait for the next close"""
+        if attempt >= PULL_RETRIES:
+            logger.error('Giving up on candle for ' + self.analysis_pair + ' ' + self.interval + ' after ' + str(attempt) + ' attempts')
+            self.__schedule_next_pull()
+        elif self.__running:
+            self.__cancel_pull()
+            delay = self.exchange.rateLimit * 2 / 1000 * (attempt + 1)
+            self.__next_pull = self.scheduler.call_later(delay, self.__pull_latest_candle, attempt + 1, candle_ts)
+
+    def __retry_sync(self, attempt):
+        """Try the sync again later, after SYNC_RETRIES attempts only after the next close"""
+        if not self.__running:
+            return
+        if attempt >= SYNC_RETRIES:
+            logger.error('Syncing candles for ' + self.analysis_pair + ' ' + self.interval + ' failed ' + str(attempt) + ' times, trying again after the next close')
+            when = scheduler.next_close(self.interval_seconds) + CLOSE_DELAY
+            self.__next_sync = self.scheduler.call_at(when, self.__sync_historical)
         else:
-            for entry in data:
-                if not latest_db_candle[10] >= entry[0]:
-                    ohlcv_functions.insert_data_into_ohlcv_table(self.exchange.id, self.analysis_pair, self.interval, entry, self.PairID)
-                    logger.warning('Writing missing candle ' + str(entry[0]) + ' to database')
+            delay = self.exchange.rateLimit * 2 / 1000 * (attempt + 1)
+            self.__next_sync = self.scheduler.call_later(delay, self.__sync_historical, attempt + 1)
+
+    def __sync_historical(self, attempt=0):
+        """Load all missing historical candles to database
+         Only the range after the latest DB candle is fetched, a page at a time,
+         and each page is written in one transaction. A failed sync is retried;
+         it resumes after the pages that were already written"""
+        self.__next_sync = None
+        logger.info('Syncing market candles with DB...')
+        try:
+            written = self.__write_missing_candles()
+        except Exception:
+            logger.exception('Error syncing candles for ' + self.analysis_pair + ' ' + self.interval)
+            self.__retry_sync(attempt)
+            return
+        logger.info('Wrote ' + str(written) + ' missing candles for ' + self.analysis_pair + ' ' + self.interval + ' to database')
         self.historical_synced = True
         pub.sendMessage(self.topic + "historical")
         logger.info('Market data has been synced.')
+        self.__schedule_next_pull()
 
-    def __pull_latest_candle(self, interval):
-        """Initiate a pull of the latest candle, making sure not to pull a duplicate candle"""
-        logger.warning("Getting latest candle for " + self.exchange.id + " " + self.analysis_pair + " " + interval)
+    def __write_missing_candles(self):
+        """Page through the closed candles after the latest DB candle, returns the number written"""
+        interval_ms = self.interval_seconds * 1000
+        latest_db_candle = ohlcv_functions.get_latest_candle(self.exchange.id, self.analysis_pair, self.interval)
+        now = self.exchange.milliseconds()
+        end = now - now % interval_ms  # start of the running candle; only closed candles are synced
+        if latest_db_candle is None:
+            logger.info("No historical data for market, adding the last " + str(HISTORY_CANDLES) + " candles")
+            since = end - HISTORY_CANDLES * interval_ms
+        else:
+            since = latest_db_candle[10] + interval_ms
+        written = 0
+        while since < end:
+            page = self.exchange.fetch_ohlcv(self.analysis_pair, self.interval, since=since, limit=PAGE_CANDLES)
+            entries = [entry for entry in page if since <= entry[0] < end]
+            if not entries:
+                break  # the exchange has nothing newer in this range
+            with page_transaction():
+                for entry in entries:
+                    ohlcv_functions.insert_data_into_ohlcv_table(self.exchange.id, self.analysis_pair, self.interval, entry, self.PairID)
+            written += len(entries)
+            since = entries[-1][0] + interval_ms
+        return written
+
+    def __pull_latest_candle(self, attempt=0, candle_ts=None):
+        """Pull the candle that closed last, making sure not to pull a duplicate candle
+         Only a closed candle is taken, like the sync does: just after a close the
+         exchange's newest candle is the one that opened a moment ago"""
+        if candle_ts is None:
+            interval_ms = self.interval_seconds * 1000
+            now = self.exchange.milliseconds()
+            candle_ts = now - now % interval_ms - interval_ms  # opening time of the candle that closed last
+        logger.info("Getting latest candle for " + self.exchange.id + " " + self.analysis_pair + " " + self.interval)
+        if self.latest_candle is not None and self.latest_candle[0] >= candle_ts:
+            logger.info('Candle already contained in DB')
+            self.__schedule_next_pull()
+            return
         try:
-            latest_data = self.exchange.fetch_ohlcv(self.analysis_pair, interval)[-1]
-            while latest_data == self.latest_candle:
-                print("retrying candle update")
-                logger.info('Candle already contained in DB, retrying...')
-                time.sleep(self.exchange.rateLimit * 2 / 1000)
-                latest_data = self.exchange.fetch_ohlcv(self.analysis_pair, interval)[-1]
-            ohlcv_functions.insert_data_into_ohlcv_table(self.exchange.id, self.analysis_pair, interval, latest_data, self.PairID)
-        except Exception as e:
-            print(e)
-            logger.info("Timeout pulling latest candle, trying again")
-            self.__pull_latest_candle(interval)
+            page = self.exchange.fetch_ohlcv(self.analysis_pair, self.interval, since=candle_ts, limit=1)
+            latest_data = next((entry for entry in page if entry[0] == candle_ts), None)
+            if latest_data is None:
+                logger.info('Candle not available on the exchange yet, retrying...')
+                self.__retry_pull(attempt, candle_ts)
+                return
+            ohlcv_functions.insert_data_into_ohlcv_table(self.exchange.id, self.analysis_pair, self.interval, latest_data, self.PairID)
+        except BaseError as e:
+            logger.info("Error pulling latest candle, trying again: " + str(e))
+            self.__retry_pull(attempt, candle_ts)
+            return
+        except Exception:
+            # A malformed response or a failed insert must not end the pulls of this market
+            logger.exception("Unexpected error pulling latest candle for " + self.analysis_pair + " " + self.interval)
+            self.__retry_pull(attempt, candle_ts)
             return
         self.latest_candle = latest_data
         pub.sendMessage(self.topic, candle=self.latest_candle)
-        print("Sent message to " + self.topic)
+        logger.debug("Sent message to " + self.topic)
+        self.__schedule_next_pull()
+
+
+def page_transaction():
+    """One transaction for a page of candles, on the connection ohlcv_functions writes through
+     Without such a connection the candles are simply inserted one by one"""
+    conn = getattr(ohlcv_functions, 'conn', None)
+    return conn.begin() if conn is not None else nullcontext()
 
 
 lookup_list = defaultdict(MarketWatcher)
@@ -0,0 +1,108 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from queue import Queue
+
+logger = logging.getLogger(__name__)
+
+WORKERS = 4
+
+
+class Scheduler:
+    """Runs the jobs of every market watcher on one timer thread and a small worker pool
+     Timed jobs wait in a heap; the timer thread sleeps until the earliest one is due
+     and hands it to the workers, which block on a queue. Nothing polls, so watching
+     many markets costs no CPU between candle closes"""
+    def __init__(self, workers=WORKERS):
+        self._timers = []  # heap of [due, seq, job, args]
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._jobs = Queue()
+        self._running = True
+        self._timer_thread = threading.Thread(target=self.__run_timers, name='scheduler-timers', daemon=True)
+        self._workers = [threading.Thread(target=self.__run_jobs, name='scheduler-worker-{}'.format(i), daemon=True)
+                         for i in range(workers)]
+        self._timer_thread.start()
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, job, *args):
+        """Run a job on a worker as soon as one is free"""
+        self._jobs.put((job, args))
+
+    def call_at(self, when, job, *args):
+        """Run a job at wall clock time ``when`` (seconds since the epoch); returns a handle for cancel()"""
+        timer = [when, next(self._sequence), job, args]
+        with self._condition:
+            heapq.heappush(self._timers, timer)
+            if self._timers[0] is timer:
+                self._condition.notify()  # earlier than what the timer thread sleeps for
+        return timer
+
+    def call_later(self, delay, job, *args):
+        return self.call_at(time.time() + delay, job, *args)
+
+    def cancel(self, timer):
+        """Cancel a job scheduled with call_at or call_later, if it has not started"""
+        with self._condition:
+            timer[2] = None
+
+    def pending(self):
+        """Number of jobs waiting for their time or for a worker"""
+        with self._condition:
+            return sum(1 for timer in self._timers if timer[2] is not None) + self._jobs.qsize()
+
+    def stop(self):
+        """Stop the timer thread and the workers; scheduled jobs are dropped"""
+        with self._condition:
+            self._running = False
+            self._timers = []
+            self._condition.notify()
+        for _ in self._workers:
+            self._jobs.put(None)
+
+    def __run_timers(self):
+        with self._condition:
+            while self._running:
+                if not self._timers:
+                    self._condition.wait()
+                    continue
+                delay = self._timers[0][0] - time.time()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                _, _, job, args = heapq.heappop(self._timers)
+                if job is not None:
+                    self._jobs.put((job, args))
+
+    def __run_jobs(self):
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                return
+            job, args = item
+            try:
+                job(*args)
+            except Exception as e:
+                logger.error(getattr(job, '__name__', repr(job)) + " threw error:\n" + str(e))
+
+
+def next_close(interval_seconds, now=None):
+    """Wall clock time at which the candle running at ``now`` closes"""
+    now = time.time() if now is None else now
+    return (now // interval_seconds + 1) * interval_seconds
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The scheduler shared by all market watchers, started on first use"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
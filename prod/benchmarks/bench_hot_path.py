@@ -0,0 +1,263 @@
+"""Benchmarks for the trading hot path
+
+Times Coin.check_action (buy and sell side), _calculate_sell_params, the ticker
+cache lookup, create_coin_list, database write throughput and one full
+monitor.run_cycle on synthetic ladders of 100, 1k and 10k rungs. All exchange
+traffic goes to the local fake exchange (src/simulation/fake_exchange.py) and the
+suite runs in a scratch directory, so the bot database in prod/ is not touched.
+
+Results are written as JSON; pass an earlier result file with --compare to see
+the change per benchmark:
+
+    python benchmarks/bench_hot_path.py --output benchmarks/results/$(git rev-parse --short HEAD).json
+    python benchmarks/bench_hot_path.py --sizes 100 1000 --compare benchmarks/results/abc1234.json
+"""
+import sys
+import os
+
+PROD_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROD_DIR)
+sys.path.insert(0, os.path.join(PROD_DIR, 'src'))
+
+import argparse
+import datetime
+import gc
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import traceback
+from typing import Callable, Dict, List
+
+from simulation.fake_exchange import FakeExchange, FakeExchangeServer, SimulatedFeed
+from simulation.price_paths import MarketSimulator
+
+SIZES = (100, 1000, 10000)
+MARKETS = 50               # rungs are spread over this many fake markets
+MAX_TIMED_CALLS = 500      # per-call benchmarks sample at most this many rungs
+DB_WRITES = 2000
+
+logger = logging.getLogger(__name__)
+
+
+def fake_markets(count: int = MARKETS) -> Dict[str, float]:
+    return {f'C{i:03d}-EUR': 10.0 * (1 + i) for i in range(count)}
+
+
+def synthetic_ladder(n: int, markets: Dict[str, float], owned: bool) -> List[Dict]:
+    """``n`` rungs, 2% apart around each market's start price"""
+    names = list(markets)
+    rows = []
+    for k in range(n):
+        market = names[k % len(names)]
+        level = k // len(names)
+        price = markets[market] * (1.02 ** (level - n // len(names) // 2))
+        base, quote = market.split('-')
+        rows.append({
+            'index_num': k + 1,
+            'base_currency': base,
+            'quote_currency': quote,
+            'position': 'Y' if owned else 'N',
+            'transactie_bedrag': 10.0,
+            'current_price': price,
+            'gain': 0.03,
+            'trail': 0.01,
+            'stoploss': 0.0,
+            'temp_high': price,
+            'temp_low': price,
+            'number_deals': 0,
+            'last_update': '',
+            'sleep_till': 0,
+            'last_buy_price': price if owned else 0.0,
+            'proceeds_strategy': 'eur',
+            'proceeds_crypto_ratio': 0.5,
+        })
+    return rows
+
+
+def measure(fn: Callable[[], object], calls: int = 1, repeat: int = 3) -> Dict:
+    """Best/median wall time of ``repeat`` runs of ``fn`` (which does ``calls`` operations)"""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {
+        'best_s': best,
+        'median_s': statistics.median(times),
+        'calls': calls,
+        'per_call_us': best / calls * 1e6,
+        'calls_per_s': calls / best if best else None,
+    }
+
+
+class HotPathBench:
+    """Holds the fake exchange, the bot modules and the seeded database"""
+
+    def __init__(self, sizes):
+        self.sizes = sorted(sizes)
+        self.markets = fake_markets()
+        self.workdir = tempfile.mkdtemp(prefix='bench_hot_path_')
+        os.chdir(self.workdir)  # relative database/log paths end up in the scratch dir
+
+        self.server = FakeExchangeServer(FakeExchange(SimulatedFeed(self.markets, MarketSimulator(seed=1)),
+                                                      balances={'EUR': 1e9})).start()
+
+        from config import config
+        config.BITVAVO_REST_URL = self.server.rest_url
+        config.BITVAVO_WS_URL = self.server.ws_url
+
+        import monitor
+        from coin import Coin
+        from database import db
+        self.config, self.monitor, self.Coin, self.db = config, monitor, Coin, db
+        self.client = monitor.get_client()
+        self.seeded = 0
+
+    def close(self):
+        self.server.stop()
+
+    def seed(self, n: int):
+        """Top the coins table up to ``n`` rungs (alternating owned / watching)"""
+        rows = synthetic_ladder(n, self.markets, owned=False)
+        for k, row in enumerate(rows[self.seeded:], start=self.seeded):
+            row['position'] = 'Y' if k % 2 else 'N'
+            self.db.save_coin(row)
+        self.seeded = max(self.seeded, n)
+
+    def coins(self, n: int, owned: bool) -> List:
+        ids = {c['index_num']: c['id'] for c in self.db.get_all_coins()}
+        return [self.Coin(self.client, row, coin_id=ids.get(row['index_num']))
+                for row in synthetic_ladder(n, self.markets, owned)]
+
+    # -- benchmarks, each returns a measure() dict
+
+    def bench_check_action_buy(self, n):
+        coins = self.coins(n, owned=False)[:MAX_TIMED_CALLS]
+        return measure(lambda: [coin.check_action() for coin in coins], calls=len(coins))
+
+    def bench_check_action_sell(self, n):
+        coins = self.coins(n, owned=True)[:MAX_TIMED_CALLS]
+        return measure(lambda: [coin.check_action() for coin in coins], calls=len(coins))
+
+    def bench_calculate_sell_params(self, n):
+        coins = self.coins(n, owned=True)[:MAX_TIMED_CALLS]
+        return measure(lambda: [coin._calculate_sell_params(coin.current_price * 1.05) for coin in coins],
+                       calls=len(coins))
+
+    def bench_ticker_cache_lookup(self, n):
+        markets = list(self.markets)
+        self.client.get_cycle_cached_data(cycle_id=1)  # warm the cache
+        lookups = [markets[k % len(markets)] for k in range(n)]
+        return measure(lambda: [self.client._get_public_ticker(m) for m in lookups], calls=n)
+
+    def bench_create_coin_list(self, n):
+        return measure(self.monitor.create_coin_list, calls=n, repeat=1)
+
+    def bench_log_price_update(self, n):
+        ids = [c['id'] for c in self.db.get_all_coins()[:n]]
+        return measure(lambda: [self.db.log_price_update(ids[k % len(ids)], 1.0 + k, bid=1.0 + k)
+                                for k in range(DB_WRITES)], calls=DB_WRITES)
+
+    def bench_save_to_database(self, n):
+        coins = self.coins(n, owned=True)[:MAX_TIMED_CALLS]
+        return measure(lambda: [coin._save_to_database() for coin in coins], calls=len(coins))
+
+    def bench_full_cycle(self, n):
+        coins = self.monitor.create_coin_list()
+        cycle = iter(range(1, 1_000_000))
+        return measure(lambda: self.monitor.run_cycle(coins, next(cycle), coin_delay=0), calls=len(coins))
+
+    def run(self, only=None) -> Dict:
+        names = [name[len('bench_'):] for name in dir(self) if name.startswith('bench_')]
+        if only:
+            names = [name for name in names if name in only]
+        results = {name: {} for name in names}
+        for n in self.sizes:
+            self.seed(n)  # the coins table always holds exactly the current ladder size
+            for name in names:
+                try:
+                    results[name][str(n)] = getattr(self, f'bench_{name}')(n)
+                    logger.info(f"{name:24s} {n:>6} rungs: {results[name][str(n)]['per_call_us']:10.1f} us/call")
+                except Exception as e:
+                    results[name][str(n)] = {'error': f'{type(e).__name__}: {e}'}
+                    logger.error(f"{name} {n}: {e}\n{traceback.format_exc()}")
+        return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROD_DIR,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = 0.10) -> List[str]:
+    """Lines describing the per-call change against a baseline result file"""
+    lines = []
+    for name, sizes in current['results'].items():
+        for size, result in sizes.items():
+            old = baseline.get('results', {}).get(name, {}).get(size)
+            if not old or 'per_call_us' not in old or 'per_call_us' not in result:
+                continue
+            change = result['per_call_us'] / old['per_call_us'] - 1
+            flag = '  REGRESSION' if change > threshold else ''
+            lines.append(f"{name:24s} {size:>6}: {old['per_call_us']:10.1f} -> "
+                         f"{result['per_call_us']:10.1f} us/call ({change:+.1%}){flag}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the trading hot path')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--only', nargs='+', default=None, help='benchmark names to run')
+    parser.add_argument('--output', default=None, help='JSON result file')
+    parser.add_argument('--compare', default=None, help='earlier JSON result file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+
+    # The bot logs every check_action at INFO; keep that out of the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    bench = HotPathBench(args.sizes)
+    try:
+        results = bench.run(args.only)
+    finally:
+        bench.close()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sizes': args.sizes,
+        'results': results,
+    }
+    if output:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {baseline.get('commit', '?')}:")
+        for line in compare(report, baseline):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
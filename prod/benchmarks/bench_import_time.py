@@ -0,0 +1,131 @@
+"""Import-time benchmark for the prod entry points
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter for
+each entry point (a few times, keeping the fastest run) and records the total
+import time plus the slowest imports by cumulative time. Short-lived cron runs
+such as the Discord report pay this cost on every start.
+
+    python benchmarks/bench_import_time.py --output benchmarks/results/imports-$(git rev-parse --short HEAD).json
+    python benchmarks/bench_import_time.py --compare benchmarks/results/imports-abc1234.json
+"""
+import sys
+import os
+
+PROD_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+from typing import Dict, List
+
+ENTRY_POINTS = ('monitor', 'portfolio_overview', 'portfolio_discord_report')
+TOP = 15
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Rows of ``-X importtime`` output: module, self and cumulative microseconds, depth"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        rows.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+        })
+    return rows
+
+
+def measure_import(module: str, repeat: int = 5) -> Dict:
+    """Fastest of ``repeat`` cold imports of ``module``"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [PROD_DIR, os.path.join(PROD_DIR, 'src'),
+                                                      env.get('PYTHONPATH')]))
+    env.pop('PYTHONDONTWRITEBYTECODE', None)  # measure with warm .pyc files, as in production
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                              cwd=PROD_DIR, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()
+            return {'error': error[-1] if error else f'exit code {proc.returncode}'}
+        rows = parse_importtime(proc.stderr)
+        total = sum(row['self_us'] for row in rows)
+        if best is None or total < best['total_us']:
+            best = {'total_us': total, 'modules': len(rows), 'rows': rows}
+    rows = best.pop('rows')
+    best['slowest'] = [{'module': row['module'], 'cumulative_us': row['cumulative_us']}
+                       for row in sorted(rows, key=lambda row: row['cumulative_us'], reverse=True)
+                       if row['module'] != module][:TOP]
+    return best
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROD_DIR,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = 0.10) -> List[str]:
+    """Lines describing the change in total import time per entry point"""
+    lines = []
+    for module, result in current['results'].items():
+        old = baseline.get('results', {}).get(module)
+        if not old or 'total_us' not in old or 'total_us' not in result:
+            continue
+        change = result['total_us'] / old['total_us'] - 1
+        flag = '  REGRESSION' if change > threshold else ''
+        lines.append(f"{module:28s} {old['total_us'] / 1000:8.1f} -> {result['total_us'] / 1000:8.1f} ms "
+                     f"({change:+.1%}){flag}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import time of the prod entry points')
+    parser.add_argument('--modules', nargs='+', default=list(ENTRY_POINTS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default=None, help='JSON result file')
+    parser.add_argument('--compare', default=None, help='earlier JSON result file')
+    args = parser.parse_args()
+
+    results = {}
+    for module in args.modules:
+        results[module] = measure_import(module, args.repeat)
+        if 'error' in results[module]:
+            print(f"{module:28s} failed: {results[module]['error']}")
+        else:
+            print(f"{module:28s} {results[module]['total_us'] / 1000:8.1f} ms "
+                  f"({results[module]['modules']} modules)")
+            for row in results[module]['slowest'][:5]:
+                print(f"    {row['cumulative_us'] / 1000:8.1f} ms  {row['module']}")
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    if args.output:
+        output = os.path.abspath(args.output)
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {baseline.get('commit', '?')}:")
+        for line in compare(report, baseline):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,9 @@
-from python_bitvavo_api.bitvavo import Bitvavo
 import os
 import logging
-import requests
 import time
 from typing import Dict, List, Optional
 from config import config
+from services.metrics import QUOTE_AGE, RATE_LIMIT_REMAINING, REST_ERRORS, REST_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -17,14 +16,22 @@ class Bitvavo_client():
         self.use_public_api = False
         
         # Setup for public API fallback
-        self.public_api_url = "https://api.bitvavo.com/v2"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        # Overridable so the bot can run against the local fake exchange (src/simulation/fake_exchange.py)
+        self.public_api_url = getattr(config, 'BITVAVO_REST_URL', "https://api.bitvavo.com/v2")
+        self.ws_url = getattr(config, 'BITVAVO_WS_URL', "wss://ws.bitvavo.com/v2/")
+        self._session = None  # requests.Session, created on first public API call
         self._ticker_cache = {}
         self._cache_timestamp = 0
         self._cycle_id = None  # Track current trading cycle
+        self.tick_store = None  # Optional TickStore that records every quote we fetch
+        self.price_simulator = None  # MarketSimulator feeding Coin.get_next_test in test mode
+        self.state_journal = None  # Optional StateJournal that Coin._save_to_database writes to
+        self.book_quotes: Dict[str, tuple] = {}  # market -> (bid, ask, time) of the last depth-1 book
+        self.bar_builder = None  # Optional BarBuilder turning the quotes of each cycle into OHLCV bars
+        self.ladder_book = None  # Optional LadderBook with the rungs defined by ladder specs
+        self.indicators = None  # Optional IndicatorHub with per-market indicators over the bars
+        self.clock = None  # Optional ClockSync whose exchange time stamps signed requests
+        self.event_bus = None  # Optional EventBus that Coin publishes its buys and sells to
         
         try:
             # Get API credentials from config/environment
@@ -34,11 +41,12 @@ class Bitvavo_client():
             # Initialize client for market data reading (always) and trading (live mode only)
             if self.api_key and self.api_secret:
                 try:
+                    from python_bitvavo_api.bitvavo import Bitvavo
                     self.bitvavo = Bitvavo({
                         'APIKEY': self.api_key,
                         'APISECRET': self.api_secret,
-                        'RESTURL': 'https://api.bitvavo.com/v2',
-                        'WSURL': 'wss://ws.bitvavo.com/v2/',
+                        'RESTURL': self.public_api_url,
+                        'WSURL': self.ws_url,
                         'ACCESSWINDOW': 10000,
                         'DEBUGGING': False
                     })
@@ -68,6 +76,17 @@ class Bitvavo_client():
             self.bitvavo = None
             raise
     
+    @property
+    def session(self):
+        """HTTP session for the public API; requests is imported on first use"""
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+            self._session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            })
+        return self._session
+
     def is_available(self) -> bool:
         """Check if Bitvavo client is available for trading (not market data)"""
         return self.bitvavo is not None and not config.is_test_mode()
@@ -89,18 +108,26 @@ class Bitvavo_client():
         try:
             logger.debug(f"Fetching fresh ticker data from public API (cache age: {cache_age:.1f}s)")
             url = f"{self.public_api_url}/ticker/24h"
-            response = self.session.get(url, timeout=10)
+            with REST_SECONDS.labels(endpoint='/ticker/24h').time():
+                response = self.session.get(url, timeout=10)
+            remaining = response.headers.get('bitvavo-ratelimit-remaining')
+            if remaining is not None:
+                RATE_LIMIT_REMAINING.set(int(remaining))
             response.raise_for_status()
             data = response.json()
             
             # Update cache
             self._ticker_cache = {'data': data}
             self._cache_timestamp = current_time
+
+            if self.tick_store is not None:
+                self.tick_store.append_tickers(data, ts=int(current_time * 1000))
             
             logger.info(f"Retrieved {len(data)} tickers from public API")
             return data
             
         except Exception as e:
+            REST_ERRORS.labels(endpoint='/ticker/24h').inc()
             logger.error(f"Failed to get public ticker data: {e}")
             # Return stale cache if available
             if self._ticker_cache:
@@ -117,6 +144,7 @@ class Bitvavo_client():
             
             for ticker in all_data:
                 if ticker.get('market') == market:
+                    QUOTE_AGE.labels(market=market).set(time.time() - self._cache_timestamp)
                     return ticker
             
             logger.warning(f"Market {market} not found in public ticker data")
@@ -156,6 +184,52 @@ class Bitvavo_client():
         
         return {'error': 'No API available for market data'}
     
+    def record_book(self, market: str, book: Dict):
+        """Record a freshly fetched depth-1 orderbook: metrics, last quote, and the tick store if enabled"""
+        if 'error' in book:
+            return
+        QUOTE_AGE.labels(market=market).set(0.0)
+        if self.bitvavo is not None:
+            RATE_LIMIT_REMAINING.set(self.bitvavo.getRemainingLimit())
+        try:
+            bid, bid_size = book['bids'][0][:2]
+            ask, ask_size = book['asks'][0][:2]
+            now = time.time()
+            self.book_quotes[market] = (float(bid), float(ask), now)
+            if self.tick_store is not None:
+                self.tick_store.append(market, int(now * 1000),
+                                       float(bid), float(ask), float(bid_size), float(ask_size))
+        except (KeyError, IndexError, ValueError) as e:
+            logger.debug(f"Could not record book for {market}: {e}")
+
+    def server_time(self) -> int:
+        """Exchange time in milliseconds from the public /time endpoint (thread-safe, no shared session)"""
+        import requests
+        try:
+            with REST_SECONDS.labels(endpoint='/time').time():
+                response = requests.get(f"{self.public_api_url}/time", timeout=5)
+            response.raise_for_status()
+            return int(response.json()['time'])
+        except Exception:
+            REST_ERRORS.labels(endpoint='/time').inc()
+            raise
+
+    def use_clock(self, clock):
+        """Sign requests with ``clock.now_ms()`` instead of the local time
+
+        python_bitvavo_api takes the timestamp of every signed REST request and
+        of the websocket login from its module-level time_ms().
+        """
+        self.clock = clock
+        try:
+            from python_bitvavo_api import bitvavo as bitvavo_api
+        except ImportError:
+            return
+        if hasattr(bitvavo_api, 'time_ms'):
+            bitvavo_api.time_ms = clock.now_ms
+        else:
+            logger.warning("python_bitvavo_api has no time_ms(); signed requests use the local clock")
+
     def start_new_cycle(self, cycle_id: int = None):
         """Start a new trading cycle - forces cache refresh on next request"""
         if cycle_id != self._cycle_id:
@@ -1,5 +1,8 @@
+import atexit
 import logging
 import os
+import signal
+import sys
 import time
 import threading
 import queue
@@ -9,7 +12,14 @@ from typing import List
 from config import config
 from database import db
 from coin import Coin
-from bitvavo_client import Bitvavo_client
+from market_data import market_snapshot
+from services.state_journal import StateJournal
+from services.profiler import CycleProfiler, parse_command
+from services.event_log import EventLogger, overhead as log_overhead, set_event_levels, setup_async_logging
+from services.query_api import BotState, QueryServer
+from services.event_bus import BarEvent, EventBus, OrderEvent, QuoteEvent, SignalEvent
+from services.metrics import (CHECK_ACTION_SECONDS, CYCLE_SECONDS, CYCLES, DB_SECONDS, LOG_EVENTS, LOG_SECONDS,
+                              QUEUE_DEPTH, MetricsServer, instrument, metrics)
 
 # Setup logging
 logging.basicConfig(
@@ -20,74 +30,242 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+events = EventLogger(logger, {
+    'coin_loaded': (logging.INFO,
+                    "Loading #{index} {market} [{state}] price={price:.2f}, {trigger_name}={trigger:.2f}, "
+                    "active={active}"),
+})
+
+# Per-event level overrides, e.g. {'skip_buy': 'DEBUG', 'temp_high': 'INFO'}
+set_event_levels(getattr(config, 'LOG_EVENT_LEVELS', {}))
+
 def time_ms() -> int:
     return int(time.time() * 1000)
 
 def read_kbd_input(input_queue):
     print("Ready for keyboard input!!")
     while (True):
-        input_str = input()
+        try:
+            input_str = input()
+        except EOFError:
+            return
         input_queue.put(input_str)
 
-# Global instances
-bitvavo_client = Bitvavo_client()
+# Global instances; the exchange client is built on first use by get_client()
+bitvavo_client = None
 coinlist: List[Coin] = []
 
+# Record every quote we fetch for replay/backtesting (disabled unless configured)
+TICK_STORE_DIR = getattr(config, 'TICK_STORE_DIR', None)
+
+# Coin state changes go to an append-only journal that is checkpointed into the coins table
+STATE_JOURNAL = getattr(config, 'STATE_JOURNAL', 'state_journal.log')
+
+# Snapshot of the in-memory state after every SNAPSHOT_EVERY cycles, for a warm restart
+SNAPSHOT_PATH = getattr(config, 'SNAPSHOT_PATH', 'state.snapshot')
+SNAPSHOT_EVERY = getattr(config, 'SNAPSHOT_EVERY', 1)
+# Snapshots older than this many seconds are ignored: every coin is validated live, as on a cold start
+SNAPSHOT_MAX_AGE = getattr(config, 'SNAPSHOT_MAX_AGE', 300.0)
+
+# Latest quotes for the report scripts (market_data/market_snapshot.py), published after every cycle;
+# the reports find the file through the same config setting
+MARKET_SNAPSHOT_PATH = market_snapshot.configured_path(config)
+
+# OHLCV bars built from the quotes of each cycle (market_data/bars.py); None or () to disable
+BAR_INTERVALS = getattr(config, 'BAR_INTERVALS', ('1m', '5m', '1h'))
+
+# Streaming indicators per market over the bars of this interval (market_data/indicators.py); None to disable
+INDICATOR_INTERVAL = getattr(config, 'INDICATOR_INTERVAL', '1m')
+
+# Seconds between /time samples that keep signed requests on the exchange's clock (services/clock_sync.py);
+# live orders are refused while the skew exceeds MAX_CLOCK_SKEW_MS. None to sign with the local clock
+CLOCK_SYNC_INTERVAL = getattr(config, 'CLOCK_SYNC_INTERVAL', 60.0)
+
+# Ladder specs with compact rung state (services/ladder.py); coins are created for rungs near the price
+LADDER_FILE = getattr(config, 'LADDER_FILE', None)
+
+# Read-only JSON API over the live state on http://127.0.0.1:QUERY_API_PORT/ (disabled unless configured)
+QUERY_API_PORT = getattr(config, 'QUERY_API_PORT', None)
+query_state = BotState()
+
+# Quotes, bars, signals and orders of the trading loop for in-process subscribers (services/event_bus.py)
+event_bus = EventBus()
+ORDER_EVENTS = event_bus.topic(OrderEvent)
+SIGNAL_EVENTS = event_bus.topic(SignalEvent)
+QUOTE_EVENTS = event_bus.topics(QuoteEvent)  # per market
+BAR_EVENTS = event_bus.topics(BarEvent)
+ORDER_EVENTS.subscribe(query_state.on_order, name='query_api')
+
+# Discord portfolio report kept up to date by the monitor, posted when it changes (reporting/portfolio_report.py)
+DISCORD_LIVE_REPORT = getattr(config, 'DISCORD_LIVE_REPORT', False)
+discord_report = None
+
+# On-demand profiling: SIGUSR1 (cProfile), SIGUSR2 (sampling) or 'prof [sample] [N]' on stdin
+profiler = CycleProfiler(getattr(config, 'PROFILE_DIR', 'profiles'), cycles=getattr(config, 'PROFILE_CYCLES', 3))
+input_queue: queue.Queue = queue.Queue()
+
+# Prometheus metrics on http://127.0.0.1:METRICS_PORT/metrics (disabled unless configured)
+METRICS_PORT = getattr(config, 'METRICS_PORT', None)
+instrument(db, ['save_coin', 'log_price_update', 'log_signal', 'log_transaction', 'log_proceeds'], DB_SECONDS)
+
+
+def get_client():
+    """The shared Bitvavo_client with the configured recorders attached, built on first call
+
+    Importing the monitor (tests, benchmarks, report scripts) does not load the
+    exchange API client or numpy; that happens when trading starts.
+    """
+    global bitvavo_client
+    if bitvavo_client is not None:
+        return bitvavo_client
+    from bitvavo_client import Bitvavo_client
+    client = Bitvavo_client()
+    client.event_bus = event_bus
+
+    if TICK_STORE_DIR:
+        from market_data.tick_store import TickStore
+        client.tick_store = TickStore(TICK_STORE_DIR)
+        QUEUE_DEPTH.labels(queue='tick_store').set_function(client.tick_store.pending)
+
+    if STATE_JOURNAL:
+        client.state_journal = StateJournal(
+            STATE_JOURNAL, lambda coin_id, state: db.save_coin(Coin.db_row(state)),
+            checkpoint_interval=getattr(config, 'STATE_CHECKPOINT_INTERVAL', 300.0))
+
+    if BAR_INTERVALS:
+        from market_data.bars import BarBuilder
+        client.bar_builder = BarBuilder(BAR_INTERVALS, capacity=getattr(config, 'BAR_CAPACITY', 1000))
+        query_state.bar_builder = client.bar_builder
+        client.bar_builder.subscribe(publish_bar)
+        if INDICATOR_INTERVAL in BAR_INTERVALS:
+            from market_data.indicators import IndicatorHub
+            client.indicators = IndicatorHub(client.bar_builder, INDICATOR_INTERVAL,
+                                             specs=getattr(config, 'INDICATORS', None))
+
+    if CLOCK_SYNC_INTERVAL and client.bitvavo is not None:
+        from services.clock_sync import ClockSync
+        clock = ClockSync(client.server_time, interval=float(CLOCK_SYNC_INTERVAL),
+                          max_skew_ms=getattr(config, 'MAX_CLOCK_SKEW_MS', 5000.0))
+        client.use_clock(clock.start())
+
+    if LADDER_FILE and os.path.exists(LADDER_FILE):
+        from services.ladder import LadderBook
+        client.ladder_book = LadderBook.load(LADDER_FILE, band=getattr(config, 'LADDER_BAND', 0.10))
+
+    # Simulated prices for test mode without market data: one seeded path per market
+    if config.is_test_mode():
+        from simulation.price_paths import MarketSimulator
+        client.price_simulator = MarketSimulator(
+            model=getattr(config, 'TEST_PRICE_MODEL', 'gbm'),
+            seed=getattr(config, 'TEST_PRICE_SEED', 0),
+        )
+
+    bitvavo_client = client
+    return client
+
+
 def create_coin_list() -> List[Coin]:
     """Create coin list from database"""
     global coinlist
     coinlist = []
+    client = get_client()
     
     # Load coins from database
     coin_data_list = db.get_all_coins()
     
-    if not coin_data_list:
+    if not coin_data_list and client.ladder_book is None:
         logger.warning("No coins found in database. Run migrate_csv.py first!")
         return []
     
     logger.info(f"Loading {len(coin_data_list)} coins from database")
-    
+
+    # Changes journaled after the last checkpoint (e.g. before a crash) take precedence over the table
+    journal = client.state_journal
+    recovered = journal.recover() if journal is not None else {}
+
+    # Coins whose row still matches the snapshot skip the REST validation of their signals
+    from services.snapshot import load_snapshot
+    snapshot = load_snapshot(SNAPSHOT_PATH, max_age=SNAPSHOT_MAX_AGE) if SNAPSHOT_PATH else None
+    warm, record = 0, None
+
+    log_coins = events.enabled('coin_loaded')
     for coin_data in coin_data_list:
         try:
-            # Load coin with minimal logging
-            position = coin_data['position']
-            current_price = coin_data['current_price']
-            gain = coin_data['gain']
-            trail = coin_data['trail']
-            temp_high = coin_data['temp_high']
-            temp_low = coin_data['temp_low']
-
-            # Calculate triggers
-            if position == 'Y':
-                sell_trigger = current_price * (1 + gain)
-                trail_stop = temp_high * (1 - trail)
-                trigger_active = temp_high >= sell_trigger
-                logger.info(f"Loading #{coin_data['index_num']} {coin_data['base_currency']}-{coin_data['quote_currency']} [OWNED] "
-                           f"price={current_price:.2f}, sell_trigger={sell_trigger:.2f}, "
-                           f"active={'YES' if trigger_active else 'NO'}")
-            else:
-                buy_trigger = current_price * (1 - gain)
-                trail_stop = temp_low * (1 + trail)
-                trigger_active = temp_low < buy_trigger
-                logger.info(f"Loading #{coin_data['index_num']} {coin_data['base_currency']}-{coin_data['quote_currency']} [WATCHING] "
-                           f"price={current_price:.2f}, buy_trigger={buy_trigger:.2f}, "
-                           f"active={'YES' if trigger_active else 'NO'}")
-
-            coin = Coin(bitvavo_client, coin_data, coin_id=coin_data['id'])
+            if coin_data['id'] in recovered:
+                coin_data = {**coin_data, **Coin.db_row(recovered[coin_data['id']])}
+            if log_coins:
+                current_price = coin_data['current_price']
+                gain = coin_data['gain']
+                market = f"{coin_data['base_currency']}-{coin_data['quote_currency']}"
+                if coin_data['position'] == 'Y':
+                    sell_trigger = current_price * (1 + gain)
+                    events.emit('coin_loaded', index=coin_data['index_num'], market=market, state='OWNED',
+                                price=current_price, trigger_name='sell_trigger', trigger=sell_trigger,
+                                active='YES' if coin_data['temp_high'] >= sell_trigger else 'NO')
+                else:
+                    buy_trigger = current_price * (1 - gain)
+                    events.emit('coin_loaded', index=coin_data['index_num'], market=market, state='WATCHING',
+                                price=current_price, trigger_name='buy_trigger', trigger=buy_trigger,
+                                active='YES' if coin_data['temp_low'] < buy_trigger else 'NO')
+
+            coin = Coin(client, coin_data, coin_id=coin_data['id'], validate_signals=False)
+            record = snapshot.record(coin.coin_id, coin._coin_row()) if snapshot is not None else None
+            if record is not None:
+                coin.restore_runtime_state(record)
+                warm += 1
+            # Tracked before validation, so what it changes is journaled as a delta rather than
+            # as a whole new row (which would include position, and be synced and applied at once)
+            if journal is not None:
+                journal.track(coin.coin_id, coin.journal_state(), dirty=coin.coin_id in recovered)
+            if record is None:
+                coin._init_trading_signals()
             coinlist.append(coin)
 
         except Exception as e:
             logger.error(f"Failed to load coin {coin_data.get('index_num', 'unknown')}: {e}")
     
+    if recovered:
+        journal.checkpoint()
+    if snapshot is not None:
+        if 'ticker_cache' in snapshot.header and not client._ticker_cache:
+            client._ticker_cache = snapshot.header['ticker_cache']
+            client._cache_timestamp = snapshot.header['cache_timestamp']
+        logger.info(f"Warm start: {warm} of {len(coinlist)} coins restored from snapshot "
+                    f"(cycle {snapshot.header.get('cycle')}), {len(coinlist) - warm} validated")
+        record = None  # last view into the mapped file
+        snapshot.close()
+
     # Count positions
     buy_positions = sum(1 for c in coin_data_list if c['position'] == 'Y')
     sell_positions = len(coin_data_list) - buy_positions
     total_transactie_bedrag = sum(c['transactie_bedrag'] for c in coin_data_list)
 
     logger.info(f"Successfully loaded {len(coinlist)} coins: {buy_positions} owned, {sell_positions} watching, total EUR{total_transactie_bedrag:.2f}")
+
+    if client.ladder_book is not None:
+        client._get_public_ticker_data()
+        refresh_ladder_rungs(client, coinlist, collect_quotes(client))
+        logger.info(f"Ladders: {len(client.ladder_book.coins)} of {client.ladder_book.rung_count()} rungs active")
     return coinlist
 
 
+def make_rung_coin(client, row) -> Coin:
+    """Coin for a ladder rung, which has no database row"""
+    return Coin(client, row, coin_id=None)
+
+
+def refresh_ladder_rungs(client, coin_list: List[Coin], quotes: dict):
+    """Add coins for rungs the market approached, fold idle far-away ones back into their ladder"""
+    book = client.ladder_book
+    try:
+        added, retired = book.refresh(coin_list, quotes, lambda row: make_rung_coin(client, row))
+        if added or retired:
+            logger.info(f"Ladder rungs: {added} activated, {retired} retired, {len(book.coins)} active")
+        book.save()
+    except Exception as e:
+        logger.warning(f"Refreshing ladder rungs failed: {e}")
+
+
 def print_test(coin_list):
         coin_list.sort(key = lambda b: b.base_currency)
         for coin in coin_list:
@@ -100,6 +278,187 @@ def print_test(coin_list):
 
 
 
+# Pause between coins to stay within the API rate limit, and between cycles
+COIN_DELAY = getattr(config, 'COIN_DELAY', 1.0)
+CYCLE_DELAY = getattr(config, 'CYCLE_DELAY', 2.0)
+
+# Adaptive polling (services/poll_scheduler.py): markets far from every trigger are checked at most
+# every POLL_MAX_INTERVAL seconds instead of every cycle; None checks every coin every cycle
+POLL_MAX_INTERVAL = getattr(config, 'POLL_MAX_INTERVAL', None)
+poll_scheduler = None
+if POLL_MAX_INTERVAL:
+    from services.poll_scheduler import PollScheduler
+    poll_scheduler = PollScheduler(min_interval=getattr(config, 'POLL_MIN_INTERVAL', 0.0),
+                                   max_interval=float(POLL_MAX_INTERVAL),
+                                   near=getattr(config, 'POLL_NEAR', 0.005),
+                                   far=getattr(config, 'POLL_FAR', 0.20),
+                                   budget=getattr(config, 'POLL_BUDGET', None))
+
+
+def run_cycle(coin_list: List[Coin], cycle_count: int, coin_delay: float = COIN_DELAY) -> float:
+    """Run check_action once for every coin, returns the cycle duration in seconds"""
+    start_time = time_ms()
+    start_dt = datetime.datetime.fromtimestamp(start_time / 1000.0, tz=datetime.timezone.utc)
+
+    logger.info(f"Trading cycle {cycle_count} started at {start_dt.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    # Start new cycle for optimized caching
+    client = get_client()
+    client.start_new_cycle(cycle_count)
+    if client.price_simulator is not None:
+        client.price_simulator.advance()
+
+    due = coin_list if poll_scheduler is None else poll_scheduler.due(coin_list)
+    if len(due) != len(coin_list):
+        logger.info(f"Adaptive polling: checking {len(due)} of {len(coin_list)} coins")
+    for coin in due:
+        try:
+            # Check if coin is in sleep mode
+            current_time = time_ms()
+
+            if coin.sleep_till > current_time:
+                sleep_dt = datetime.datetime.fromtimestamp(coin.sleep_till / 1000.0, tz=datetime.timezone.utc)
+                logger.debug(f"Coin {coin.analysis_pair} sleeping until {sleep_dt.strftime('%Y-%m-%d %H:%M:%S')}")
+                continue
+
+            # Store old state for change detection
+            old_position = coin.get_position()
+            old_signals = (coin.buy_signal, coin.sell_signal)
+            old_temp_high = coin.high
+            old_temp_low = coin.low
+
+            # Execute trading logic
+            with CHECK_ACTION_SECONDS.labels(side='sell' if old_position else 'buy').time():
+                coin.check_action()  # Uses global test mode from config
+
+            # Check for significant changes and log them
+            new_position = coin.get_position()
+
+            if new_position != old_position:
+                logger.info(f"Position change: {coin.analysis_pair} "
+                           f"{'BOUGHT' if new_position else 'SOLD'}")
+            # Buys and sells are published by the coin itself (Coin._record_order), so a sell
+            # whose proceeds are reinvested right away is reported although the position stays
+            if (coin.buy_signal, coin.sell_signal) != old_signals:
+                SIGNAL_EVENTS.publish(SignalEvent(coin.analysis_pair, coin.coin_id, coin.current_price,
+                                                  coin.buy_signal, coin.sell_signal, time.time()))
+
+            # Log significant price movements
+            if not new_position and coin.low < old_temp_low:
+                logger.info(f"New low: {coin.analysis_pair} {coin.low} (was {old_temp_low})")
+
+            if new_position and coin.high > old_temp_high:
+                logger.info(f"New high: {coin.analysis_pair} {coin.high} (was {old_temp_high})")
+
+            # Small delay between coins to prevent API rate limiting
+            if coin_delay:
+                time.sleep(coin_delay)
+
+        except Exception as e:
+            logger.error(f"Error processing coin {coin.analysis_pair}: {e}")
+            continue
+
+    if client.tick_store is not None:
+        client.tick_store.flush()
+    if client.state_journal is not None:
+        client.state_journal.end_cycle()
+    if client.ladder_book is not None:
+        # The ticker is otherwise only fetched when a coin is checked; ladders without
+        # active rungs need it to notice the price moving into their band
+        client._get_public_ticker_data()
+    quotes = collect_quotes(client)
+    publish_quotes(quotes)
+    if poll_scheduler is not None:
+        poll_scheduler.observe(quotes)
+    if client.bar_builder is not None:
+        client.bar_builder.update_quotes(quotes)
+        client.bar_builder.flush(time_ms())
+    if client.ladder_book is not None:
+        refresh_ladder_rungs(client, coin_list, quotes)
+    if MARKET_SNAPSHOT_PATH and quotes:
+        publish_market_snapshot(quotes)
+    if discord_report is not None:
+        try:
+            discord_report.update(coin_list, quotes)
+            discord_report.maybe_post()
+        except Exception as e:
+            logger.warning(f"Updating Discord report failed: {e}")
+    if SNAPSHOT_PATH and cycle_count % SNAPSHOT_EVERY == 0:
+        try:
+            from services.snapshot import write_snapshot
+            write_snapshot(SNAPSHOT_PATH, coin_list, client, cycle_count)
+        except Exception as e:
+            logger.warning(f"Writing snapshot failed: {e}")
+
+    # Calculate cycle time
+    end_time = time_ms()
+    cycle_duration = (end_time - start_time) / 1000.0
+
+    log_seconds, log_events = log_overhead.take()
+    logger.info(f"Trading cycle {cycle_count} completed in {cycle_duration:.2f}s "
+                f"(logging {log_seconds * 1000:.1f} ms for {log_events} events)")
+    CYCLE_SECONDS.observe(cycle_duration)
+    LOG_SECONDS.observe(log_seconds)
+    LOG_EVENTS.inc(log_events)
+    CYCLES.inc()
+    query_state.publish_cycle(coin_list, quotes, cycle_count, cycle_duration)
+    return cycle_duration
+
+
+def collect_quotes(client) -> dict:
+    """Latest price, bid and ask per market fetched this cycle"""
+    try:
+        return market_snapshot.collect(client._ticker_cache.get('data'), client._cache_timestamp,
+                                       client.book_quotes)
+    except Exception as e:
+        logger.warning(f"Collecting quotes failed: {e}")
+        return {}
+
+
+def publish_quotes(quotes: dict):
+    """Quote events for the markets fetched this cycle"""
+    for market, (price, bid, ask, ts) in quotes.items():
+        QUOTE_EVENTS[market].publish(QuoteEvent(market, price, bid, ask, ts))
+
+
+def publish_bar(market: str, interval: str, bar):
+    """BarBuilder subscriber turning finished bars into bar events"""
+    BAR_EVENTS[market].publish(BarEvent(market, interval, *bar))
+
+
+def publish_market_snapshot(quotes: dict):
+    """Share the quotes fetched this cycle so the reports need not call the exchange"""
+    try:
+        market_snapshot.publish(MARKET_SNAPSHOT_PATH, quotes)
+    except Exception as e:
+        logger.warning(f"Publishing market snapshot failed: {e}")
+
+
+def handle_commands():
+    """Process keyboard commands queued by read_kbd_input"""
+    while not input_queue.empty():
+        command = input_queue.get()
+        try:
+            parsed = parse_command(command)
+        except ValueError as e:
+            logger.warning(f"{e}; usage: prof [cprofile|sample] [cycles]")
+            continue
+        if parsed is None:
+            logger.info(f"Unknown command {command!r}; available: prof [cprofile|sample] [cycles]")
+            continue
+        mode, cycles = parsed
+        profiler.request(cycles or None, mode)
+
+
+def install_profile_triggers():
+    """Signals and keyboard input that start a profile while the bot keeps trading"""
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.request(mode='cprofile'))
+        signal.signal(signal.SIGUSR2, lambda signum, frame: profiler.request(mode='sample'))
+    if sys.stdin is not None and sys.stdin.isatty():
+        threading.Thread(target=read_kbd_input, args=(input_queue,), daemon=True).start()
+
+
 def start_trading(coin_list: List[Coin]):
     """Main trading loop with database persistence and test mode support"""
     logger.info(f"Starting {config.get_mode_description()}")
@@ -112,61 +471,13 @@ def start_trading(coin_list: List[Coin]):
     
     while True:
         cycle_count += 1
-        start_time = time_ms()
-        start_dt = datetime.datetime.fromtimestamp(start_time / 1000.0, tz=datetime.timezone.utc)
-        
-        logger.info(f"Trading cycle {cycle_count} started at {start_dt.strftime('%Y-%m-%d %H:%M:%S')}")
-        
-        # Start new cycle for optimized caching
-        bitvavo_client.start_new_cycle(cycle_count)
-        
-        for coin in coin_list:
-            try:
-                # Check if coin is in sleep mode
-                current_time = time_ms()
-                
-                if coin.sleep_till > current_time:
-                    sleep_dt = datetime.datetime.fromtimestamp(coin.sleep_till / 1000.0, tz=datetime.timezone.utc)
-                    logger.debug(f"Coin {coin.analysis_pair} sleeping until {sleep_dt.strftime('%Y-%m-%d %H:%M:%S')}")
-                    continue
-                
-                # Store old state for change detection
-                old_position = coin.get_position()
-                old_temp_high = coin.high
-                old_temp_low = coin.low
-                
-                # Execute trading logic
-                coin.check_action()  # Uses global test mode from config
-                
-                # Check for significant changes and log them
-                new_position = coin.get_position()
-                
-                if new_position != old_position:
-                    logger.info(f"Position change: {coin.analysis_pair} "
-                               f"{'BOUGHT' if new_position else 'SOLD'}")
-                
-                # Log significant price movements
-                if not new_position and coin.low < old_temp_low:
-                    logger.info(f"New low: {coin.analysis_pair} {coin.low} (was {old_temp_low})")
-                
-                if new_position and coin.high > old_temp_high:
-                    logger.info(f"New high: {coin.analysis_pair} {coin.high} (was {old_temp_high})")
-                
-                # Small delay between coins to prevent API rate limiting
-                time.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"Error processing coin {coin.analysis_pair}: {e}")
-                continue
-        
-        # Calculate cycle time
-        end_time = time_ms()
-        cycle_duration = (end_time - start_time) / 1000.0
-        
-        logger.info(f"Trading cycle {cycle_count} completed in {cycle_duration:.2f}s")
+        handle_commands()
+        profiler.start_cycle(cycle_count)
+        run_cycle(coin_list, cycle_count)
+        profiler.end_cycle(cycle_count)
         
         # Brief pause between cycles
-        time.sleep(2)
+        time.sleep(CYCLE_DELAY)
 
 if __name__ == '__main__':
     # Display startup information with configuration validation
@@ -184,6 +495,9 @@ if __name__ == '__main__':
 
         if config.is_test_mode():
             logger.info("SAFE mode - no real trades will be executed")
+            if getattr(config, 'TEST_PRICE_MODEL', 'gbm') == 'bootstrap':
+                raise ValueError("TEST_PRICE_MODEL 'bootstrap' needs historical prices, which the monitor does not "
+                                 "load; use 'gbm' or 'jump'")
         else:
             logger.warning("LIVE TRADING MODE - real money at risk!")
             if not config.BITVAVO_API_KEY:
@@ -197,10 +511,28 @@ if __name__ == '__main__':
         logger.error(f"STARTUP ERROR: {e}")
         exit(1)
     
+    # Log records are written by a listener thread; events optionally also as JSON lines
+    log_listener = setup_async_logging(getattr(config, 'EVENT_LOG_JSON', None))
+    atexit.register(log_listener.stop)
+    QUEUE_DEPTH.labels(queue='log').set_function(lambda: log_listener.queue.qsize())
+
+    if METRICS_PORT:
+        MetricsServer(metrics, port=int(METRICS_PORT)).start()
+    if QUERY_API_PORT:
+        QueryServer(query_state, port=int(QUERY_API_PORT)).start()
+    if DISCORD_LIVE_REPORT and getattr(config, 'DISCORD_WEBHOOK_REPORTS', None):
+        from reporting.portfolio_report import IncrementalReport
+        discord_report = IncrementalReport(config.DISCORD_WEBHOOK_REPORTS,
+                                           min_interval=getattr(config, 'DISCORD_REPORT_INTERVAL', 60.0),
+                                           heartbeat=getattr(config, 'DISCORD_REPORT_HEARTBEAT', 3600.0))
+        ORDER_EVENTS.subscribe(discord_report.on_order, name='discord_report')
+        SIGNAL_EVENTS.subscribe(discord_report.on_signal, name='discord_report')
+    install_profile_triggers()
+
     # Load coins and start trading
     coin_list = create_coin_list()
 
-    if not coin_list:
+    if not coin_list and get_client().ladder_book is None:
         logger.error("No coins loaded. Run migrate_csv.py first!")
         exit(1)
 
@@ -208,6 +540,13 @@ if __name__ == '__main__':
         start_trading(coin_list)
     except KeyboardInterrupt:
         logger.info("Trading stopped by user")
+        client = get_client()
+        if client.tick_store is not None:
+            client.tick_store.close()
+        if client.state_journal is not None:
+            client.state_journal.close()
+        if client.ladder_book is not None:
+            client.ladder_book.save()
     except Exception as e:
         logger.error(f"Trading failed: {e}")
         exit(1)
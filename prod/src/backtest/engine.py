@@ -0,0 +1,485 @@
+"""Vectorized backtest engine for the gain/trail ladder strategy
+
+Replays a bid/ask series through the same state machine as ``Coin.check_action``:
+matrix price, gain trigger, trailing stop, temp_high/temp_low resets, the
+"stijgende markt" buy gate and the proceeds strategies after a sell.
+
+Instead of stepping every rung through every tick, the engine jumps from event to
+event. Between two events a rung only moves its running extreme (temp_low or
+temp_high), so the next trigger or trail hit can be found with NumPy over whole
+ranges of the series:
+
+- a rung without an active signal waits for a first-passage below/above a level,
+  answered with per-block minima/maxima of the series;
+- a rung with an active signal trails a running min/max, answered with
+  ``minimum.accumulate``/``maximum.accumulate`` over growing chunks.
+
+Only the ticks where something happens run the scalar ``check_action`` logic.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BLOCK = 256
+FIRST_CHUNK = 512
+
+TRADE_DTYPE = np.dtype([
+    ('tick', np.int64),
+    ('ts', np.int64),
+    ('rung', np.int32),
+    ('side', 'U4'),
+    ('price', np.float64),
+    ('eur', np.float64),
+    ('amount', np.float64),
+    ('fee', np.float64),
+])
+
+
+def proceeds_new_buy_amount(strategy: str, sell_amount: float, original_amount: float) -> float:
+    """EUR to reinvest right after a sell, as decided by services.proceeds_calculator
+
+    - 'crypto': everything that was sold is bought back immediately
+    - 'split':  on profit the sold amount (original + ratio of the profit) is bought back,
+                on a loss nothing is reinvested
+    - 'eur':    nothing is reinvested, the profit is taken
+    """
+    if strategy == 'crypto':
+        return sell_amount
+    if strategy == 'split' and sell_amount > original_amount:
+        return sell_amount
+    return 0.0
+
+
+def sell_amount_eur(strategy: str, transactie_bedrag: float, last_buy_price: float,
+                    price: float, crypto_ratio: float) -> float:
+    """EUR proceeds of a sell at ``price``, mirroring Coin._calculate_sell_params"""
+    if last_buy_price <= 0:
+        return transactie_bedrag
+    crypto_owned = transactie_bedrag / last_buy_price
+    if strategy == 'crypto':
+        return crypto_owned * price
+    if strategy == 'split':
+        profit = crypto_owned * price - transactie_bedrag
+        if profit > 0:
+            return transactie_bedrag + profit * crypto_ratio
+    return transactie_bedrag
+
+
+def quotes_from_bars(open_, high, low, close, spread: float = 0.0, ts: Optional[np.ndarray] = None):
+    """Expand OHLC bars into a bid/ask series of 4 quotes per bar
+
+    The intra-bar path is open -> low -> high -> close for rising bars and
+    open -> high -> low -> close for falling bars. ``spread`` is the relative
+    bid/ask spread around each price.
+    """
+    open_, high, low, close = (np.asarray(a, dtype=np.float64) for a in (open_, high, low, close))
+    rising = close >= open_
+    path = np.empty((len(open_), 4), dtype=np.float64)
+    path[:, 0] = open_
+    path[:, 1] = np.where(rising, low, high)
+    path[:, 2] = np.where(rising, high, low)
+    path[:, 3] = close
+    mid = path.ravel()
+    bid = mid * (1 - spread / 2)
+    ask = mid * (1 + spread / 2)
+    if ts is not None:
+        ts = np.repeat(np.asarray(ts, dtype=np.int64), 4)
+    return bid, ask, ts
+
+
+class _BlockExtremes:
+    """First-passage queries on a series using per-block minima and maxima"""
+
+    def __init__(self, values: np.ndarray, block: int = BLOCK):
+        self.values = values
+        self.block = block
+        self.n = len(values)
+        nb = -(-self.n // block)
+        pad = nb * block - self.n
+        self.block_min = np.concatenate([values, np.full(pad, np.inf)]).reshape(nb, block).min(axis=1)
+        self.block_max = np.concatenate([values, np.full(pad, -np.inf)]).reshape(nb, block).max(axis=1)
+
+    def _first(self, start: int, hit, block_hit) -> int:
+        if start >= self.n:
+            return self.n
+        b0 = start // self.block
+        end = min((b0 + 1) * self.block, self.n)
+        idx = np.flatnonzero(hit(self.values[start:end]))
+        if idx.size:
+            return start + int(idx[0])
+        blocks = np.flatnonzero(block_hit(b0 + 1))
+        if not blocks.size:
+            return self.n
+        b = b0 + 1 + int(blocks[0])
+        lo = b * self.block
+        return lo + int(np.flatnonzero(hit(self.values[lo:lo + self.block]))[0])
+
+    def first_below(self, start: int, level: float, inclusive: bool = False) -> int:
+        """First index >= start with value < level (<= when inclusive), or n"""
+        cmp = np.less_equal if inclusive else np.less
+        return self._first(start, lambda v: cmp(v, level), lambda b: cmp(self.block_min[b:], level))
+
+    def first_above(self, start: int, level: float, inclusive: bool = False) -> int:
+        """First index >= start with value > level (>= when inclusive), or n"""
+        cmp = np.greater_equal if inclusive else np.greater
+        return self._first(start, lambda v: cmp(v, level), lambda b: cmp(self.block_max[b:], level))
+
+
+@dataclass
+class BacktestResult:
+    trades: np.ndarray
+    final_state: List[Dict]
+    start_equity: float
+    end_equity: float
+    cash: float
+    crypto: float
+    fees: float
+    capital_utilisation: float
+
+    @property
+    def profit(self) -> float:
+        return self.end_equity - self.start_equity
+
+    @property
+    def deals(self) -> int:
+        return int(sum(r['number_deals'] for r in self.final_state))
+
+    def summary(self) -> Dict:
+        return {
+            'profit': self.profit,
+            'deals': self.deals,
+            'buys': int(np.count_nonzero(self.trades['side'] == 'buy')),
+            'sells': int(np.count_nonzero(self.trades['side'] == 'sell')),
+            'fees': self.fees,
+            'capital_utilisation': self.capital_utilisation,
+            'end_equity': self.end_equity,
+        }
+
+
+class LadderBacktest:
+    """Replay one market's quotes through all rungs of its ladder
+
+    ``rungs`` use the coins table format (``current_price``, ``gain``, ``trail``,
+    ``transactie_bedrag``, ``position``, ``temp_high``, ``temp_low``, ...), in the
+    order the monitor processes them. ``fee`` is charged on every fill and
+    ``slippage`` moves fills against us; with both at zero the rung state matches
+    the live Coin in test mode exactly.
+    """
+
+    def __init__(self, rungs: Sequence[Dict], fee: float = 0.0025, slippage: float = 0.0,
+                 default_strategy: str = 'eur', default_crypto_ratio: float = 0.5):
+        self.rungs = [dict(r) for r in rungs]
+        self.fee = fee
+        self.slippage = slippage
+        self.default_strategy = default_strategy
+        self.default_crypto_ratio = default_crypto_ratio
+
+    # ------------------------------------------------------------------ setup
+
+    def _init_state(self, bid0: float, ask0: float):
+        n = len(self.rungs)
+        get = lambda key, default=0.0: np.array([r.get(key, default) for r in self.rungs], dtype=np.float64)
+        self.matrix = get('current_price')
+        self.gain = get('gain')
+        self.trail = get('trail')
+        self.bedrag = get('transactie_bedrag')
+        self.last_buy = np.array([r.get('last_buy_price') or 0.0 for r in self.rungs], dtype=np.float64)
+        self.deals = np.array([r.get('number_deals', 0) for r in self.rungs], dtype=np.int64)
+        self.pos = np.array([r.get('position') in ('Y', True) for r in self.rungs], dtype=bool)
+        self.strategy = [r.get('proceeds_strategy') or self.default_strategy for r in self.rungs]
+        self.ratio = np.array([self.default_crypto_ratio if r.get('proceeds_crypto_ratio') is None
+                               else r['proceeds_crypto_ratio'] for r in self.rungs], dtype=np.float64)
+        self.th = np.array([r.get('temp_high', r['current_price']) for r in self.rungs], dtype=np.float64)
+        self.tl = np.array([r.get('temp_low', r['current_price']) for r in self.rungs], dtype=np.float64)
+        self.sell_drempel = self.matrix * (1 + self.gain)
+        self.buy_drempel = self.matrix * (1 - self.gain)
+        self.ssig = np.zeros(n, dtype=bool)
+        self.bsig = np.zeros(n, dtype=bool)
+        self.trail_sell = np.zeros(n, dtype=np.float64)
+        self.trail_buy = np.zeros(n, dtype=np.float64)
+
+        # Restart validation as in Coin._init_trading_signals, against the first quote
+        for i in range(n):
+            if self.pos[i]:
+                if self.th[i] >= self.sell_drempel[i]:
+                    if bid0 >= self.sell_drempel[i]:
+                        # Live keeps trail_stop_sell_drempel at 0 until the next new high
+                        self.ssig[i] = True
+                    else:
+                        self.th[i] = bid0
+            elif self.tl[i] < self.buy_drempel[i]:
+                if ask0 <= self.buy_drempel[i]:
+                    self.bsig[i] = True
+                    self.trail_buy[i] = self.tl[i] * (1 + self.trail[i])
+                else:
+                    self.tl[i] = ask0
+
+        # Holdings ledger: crypto per rung, EUR cash flow for the whole ladder
+        self.qty = np.where(self.pos, self.bedrag / np.where(self.last_buy > 0, self.last_buy, self.matrix), 0.0)
+        self.cash = 0.0
+        self.fees = 0.0
+        self.entered = np.where(self.pos, 0, -1).astype(np.int64)
+        self.entry_bedrag = self.bedrag.copy()
+        self.utilised = 0.0
+
+    def _gate(self) -> float:
+        """Lowest matrix price of rungs in position; buy rungs skip asks above it"""
+        owned = self.matrix[self.pos]
+        return float(owned.min()) if owned.size else np.inf
+
+    # ------------------------------------------------------------------ event search
+
+    def _next_event(self, i: int, start: int, gate: float) -> int:
+        T = self.T
+        if start >= T:
+            return T
+        if self.pos[i]:
+            if not self.ssig[i]:
+                # New high that reaches the sell trigger
+                th, sd = self.th[i], self.sell_drempel[i]
+                return self.bid_x.first_above(start, th) if th >= sd else self.bid_x.first_above(start, sd, inclusive=True)
+            return self._scan_sell(i, start)
+        if not self.bsig[i]:
+            # New low below the buy trigger on an ask the gate lets through
+            level = min(self.tl[i], self.buy_drempel[i])
+            if level <= gate:
+                return self.ask_x.first_below(start, level)
+            return self.ask_x.first_below(start, gate, inclusive=True)
+        return self._scan_buy(i, start, gate)
+
+    def _scan_sell(self, i: int, start: int) -> int:
+        th, ts0, k = self.th[i], self.trail_sell[i], 1 - self.trail[i]
+        pos, length = start, FIRST_CHUNK
+        while pos < self.T:
+            end = min(self.T, pos + length)
+            seg = self.bid[pos:end]
+            cmx = np.maximum.accumulate(seg)
+            np.maximum(cmx, th, out=cmx)
+            trail = np.where(cmx > th, cmx * k, ts0)
+            hit = np.flatnonzero(seg <= trail)
+            if hit.size:
+                return pos + int(hit[0])
+            if cmx[-1] > th:
+                th = cmx[-1]
+                ts0 = th * k
+            pos, length = end, length * 2
+        return self.T
+
+    def _scan_buy(self, i: int, start: int, gate: float) -> int:
+        tl, tb0, k = self.tl[i], self.trail_buy[i], 1 + self.trail[i]
+        pos, length = start, FIRST_CHUNK
+        while pos < self.T:
+            end = min(self.T, pos + length)
+            seg = self.ask[pos:end]
+            eligible = seg <= gate
+            cm = np.minimum.accumulate(np.where(eligible, seg, np.inf))
+            np.minimum(cm, tl, out=cm)
+            trail = np.where(cm < tl, cm * k, tb0)
+            hit = np.flatnonzero(eligible & (trail <= seg))
+            if hit.size:
+                return pos + int(hit[0])
+            if cm[-1] < tl:
+                tl = cm[-1]
+                tb0 = tl * k
+            pos, length = end, length * 2
+        return self.T
+
+    def _advance(self, i: int, end: int, gate: float):
+        """Move rung i's running extreme through ticks [processed, end) without events"""
+        start = self.processed[i]
+        if end <= start:
+            return
+        if self.pos[i]:
+            high = float(self.bid[start:end].max())
+            if high > self.th[i]:
+                self.th[i] = high
+                if self.ssig[i]:
+                    self.trail_sell[i] = high * (1 - self.trail[i])
+        else:
+            seg = self.ask[start:end]
+            seg = seg[seg <= gate] if gate != np.inf else seg
+            if seg.size:
+                low = float(seg.min())
+                if low < self.tl[i]:
+                    self.tl[i] = low
+                    if self.bsig[i]:
+                        self.trail_buy[i] = low * (1 + self.trail[i])
+        self.processed[i] = end
+
+    # ------------------------------------------------------------------ check_action
+
+    def _record(self, t: int, i: int, side: str, price: float, eur: float, amount: float, fee: float):
+        self.trades.append((t, self.ts[t] if self.ts is not None else t, i, side, price, eur, amount, fee))
+
+    def _buy(self, t: int, i: int, eur: float) -> float:
+        price = self.ask[t] * (1 + self.slippage)
+        fee = eur * self.fee
+        amount = (eur - fee) / price
+        self.qty[i] += amount
+        self.cash -= eur
+        self.fees += fee
+        self._record(t, i, 'buy', price, eur, amount, fee)
+        return price
+
+    def _sell(self, t: int, i: int) -> float:
+        price = self.bid[t] * (1 - self.slippage)
+        eur = sell_amount_eur(self.strategy[i], self.bedrag[i], self.last_buy[i], price, self.ratio[i])
+        amount = min(eur / price, self.qty[i])
+        if self.strategy[i] == 'crypto' and self.last_buy[i] > 0:
+            amount = self.qty[i]
+        gross = amount * price
+        fee = gross * self.fee
+        self.qty[i] -= amount
+        self.cash += gross - fee
+        self.fees += fee
+        self._record(t, i, 'sell', price, gross, amount, fee)
+        return eur
+
+    def _close_interval(self, t: int, i: int):
+        if self.entered[i] >= 0:
+            self.utilised += (t - self.entered[i]) * self.entry_bedrag[i]
+            self.entered[i] = -1
+
+    def _open_interval(self, t: int, i: int):
+        self.entered[i] = t
+        self.entry_bedrag[i] = self.bedrag[i]
+
+    def _step(self, t: int, i: int, gate: float) -> bool:
+        """Coin.check_action for rung i at tick t. Returns True when a trade happened"""
+        if self.pos[i]:
+            bid = self.bid[t]
+            if bid > self.th[i]:
+                self.th[i] = bid
+                if self.th[i] >= self.sell_drempel[i]:
+                    self.ssig[i] = True
+                    self.trail_sell[i] = self.th[i] * (1 - self.trail[i])
+            if self.ssig[i] and bid <= self.trail_sell[i]:
+                self._sell_and_reinvest(t, i)
+                return True
+            return False
+
+        ask = self.ask[t]
+        if ask > gate:
+            return False
+        if ask < self.tl[i]:
+            self.tl[i] = ask
+            if self.tl[i] < self.buy_drempel[i]:
+                self.bsig[i] = True
+                self.trail_buy[i] = self.tl[i] * (1 + self.trail[i])
+        if self.bsig[i] and self.trail_buy[i] <= ask:
+            price = self._buy(t, i, self.bedrag[i])
+            self.bsig[i] = False
+            self.pos[i] = True
+            self.th[i] = self.tl[i] = self.matrix[i]
+            self.deals[i] += 1
+            self.last_buy[i] = price
+            self._open_interval(t, i)
+            return True
+        return False
+
+    def _sell_and_reinvest(self, t: int, i: int):
+        sold_eur = self._sell(t, i)
+        self.ssig[i] = False
+        self.deals[i] += 1
+        self._close_interval(t, i)
+        reinvest = proceeds_new_buy_amount(self.strategy[i], sold_eur, self.bedrag[i])
+        if reinvest > 0:
+            self.bedrag[i] = reinvest
+            price = self._buy(t, i, reinvest)
+            self.last_buy[i] = price
+            self.th[i] = self.tl[i] = price
+            self._open_interval(t, i)
+            return
+        self.pos[i] = False
+        if self.strategy[i] == 'split':
+            self.bedrag[i] = sold_eur
+        self.th[i] = self.tl[i] = self.matrix[i]
+        self.last_buy[i] = 0.0
+
+    # ------------------------------------------------------------------ run
+
+    def run(self, bid, ask, ts=None) -> BacktestResult:
+        self.bid = np.ascontiguousarray(bid, dtype=np.float64)
+        self.ask = np.ascontiguousarray(ask, dtype=np.float64)
+        self.ts = None if ts is None else np.asarray(ts, dtype=np.int64)
+        self.T = T = len(self.bid)
+        if T == 0 or len(self.ask) != T:
+            raise ValueError("bid and ask must be non-empty and of equal length")
+        self.bid_x = _BlockExtremes(self.bid)
+        self.ask_x = _BlockExtremes(self.ask)
+        self._init_state(float(self.bid[0]), float(self.ask[0]))
+        self.trades = []
+
+        n = len(self.rungs)
+        start_equity = float(self.qty.sum() * self.bid[0])
+        self.processed = np.zeros(n, dtype=np.int64)
+        gate = self._gate()
+        next_ev = np.array([self._next_event(i, 0, gate) for i in range(n)], dtype=np.int64)
+        order = np.arange(n, dtype=np.int64)
+
+        while n:
+            i = int(np.argmin(next_ev * n + order))
+            t = int(next_ev[i])
+            if t >= T:
+                break
+            self._advance(i, t, gate)
+            traded = self._step(t, i, gate)
+            self.processed[i] = t + 1
+            if traded:
+                new_gate = self._gate()
+                if new_gate != gate:
+                    # Buy rungs saw the old gate up to this point; rungs after i in
+                    # the cycle see the new gate from tick t, the others from t + 1
+                    for j in range(n):
+                        if j != i and not self.pos[j]:
+                            self._advance(j, t + 1 if j < i else t, gate)
+                    gate = new_gate
+                    for j in range(n):
+                        if j != i and not self.pos[j]:
+                            next_ev[j] = self._next_event(j, int(self.processed[j]), gate)
+            next_ev[i] = self._next_event(i, t + 1, gate)
+
+        for i in range(n):
+            self._advance(i, T, gate)
+            self._close_interval(T, i)
+
+        capital = float(np.sum([r['transactie_bedrag'] for r in self.rungs]))
+        end_equity = float(self.cash + self.qty.sum() * self.bid[-1])
+        return BacktestResult(
+            trades=np.array(self.trades, dtype=TRADE_DTYPE),
+            final_state=self._final_state(),
+            start_equity=start_equity,
+            end_equity=end_equity,
+            cash=float(self.cash),
+            crypto=float(self.qty.sum()),
+            fees=float(self.fees),
+            capital_utilisation=float(self.utilised / (capital * T)) if capital > 0 else 0.0,
+        )
+
+    def _final_state(self) -> List[Dict]:
+        state = []
+        for i, rung in enumerate(self.rungs):
+            row = dict(rung)
+            row.update({
+                'position': 'Y' if self.pos[i] else 'N',
+                'transactie_bedrag': float(self.bedrag[i]),
+                'temp_high': float(self.th[i]),
+                'temp_low': float(self.tl[i]),
+                'number_deals': int(self.deals[i]),
+                'last_buy_price': float(self.last_buy[i]),
+                'buy_signal': bool(self.bsig[i]),
+                'sell_signal': bool(self.ssig[i]),
+                'trail_stop_buy_drempel': float(self.trail_buy[i]),
+                'trail_stop_sell_drempel': float(self.trail_sell[i]),
+            })
+            state.append(row)
+        return state
+
+
+def run_backtest(rungs: Sequence[Dict], bid, ask, ts=None, **kwargs) -> BacktestResult:
+    """Convenience wrapper: backtest one market's ladder over a bid/ask series"""
+    return LadderBacktest(rungs, **kwargs).run(bid, ask, ts)
@@ -0,0 +1,73 @@
+"""Monte Carlo profit distribution of a ladder over simulated price paths
+
+Paths come from simulation.price_paths and are shared with the worker processes
+through shared memory, like the parameter sweep; each task backtests a slice of
+path indices and returns one summary per path.
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backtest.engine import run_backtest
+from simulation.price_paths import generate_paths
+
+logger = logging.getLogger(__name__)
+
+_worker_paths = {}
+
+
+def _attach(shm_name: str, shape):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_paths['shm'] = shm  # keep the mapping alive for the worker's lifetime
+    _worker_paths['paths'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+
+
+def _evaluate(indices: Sequence[int], rungs: List[Dict], spread: float, backtest_kwargs: Dict) -> List[Dict]:
+    paths = _worker_paths['paths']
+    summaries = []
+    for i in indices:
+        mid = paths[i]
+        bid = mid * (1 - spread / 2)
+        ask = mid * (1 + spread / 2)
+        summaries.append(run_backtest(rungs, bid, ask, **backtest_kwargs).summary())
+    return summaries
+
+
+def run_paths(rungs: List[Dict], paths: np.ndarray, spread: float = 0.001,
+              workers: Optional[int] = None, batch: int = 32, **backtest_kwargs) -> Dict[str, np.ndarray]:
+    """Backtest ``rungs`` on every row of ``paths`` (mid prices), in parallel
+
+    Returns one array per summary field (profit, deals, ...), ordered like ``paths``.
+    """
+    paths = np.ascontiguousarray(paths, dtype=np.float64)
+    workers = workers or os.cpu_count() or 1
+    shm = shared_memory.SharedMemory(create=True, size=paths.nbytes)
+    try:
+        shared = np.ndarray(paths.shape, dtype=np.float64, buffer=shm.buf)
+        shared[:] = paths
+        chunks = [range(i, min(i + batch, len(paths))) for i in range(0, len(paths), batch)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(shm.name, paths.shape)) as pool:
+            summaries = [summary
+                         for result in pool.map(_evaluate, chunks, [rungs] * len(chunks),
+                                                [spread] * len(chunks), [backtest_kwargs] * len(chunks))
+                         for summary in result]
+        del shared
+    finally:
+        shm.close()
+        shm.unlink()
+    return {field: np.array([s[field] for s in summaries]) for field in summaries[0]}
+
+
+def profit_distribution(rungs: List[Dict], s0: float, n_steps: int, n_paths: int = 1000,
+                        model: str = 'gbm', seed: int = 0, spread: float = 0.001,
+                        workers: Optional[int] = None, model_params: Optional[Dict] = None,
+                        **backtest_kwargs) -> Dict[str, np.ndarray]:
+    """Simulate ``n_paths`` paths of ``model`` from ``s0`` and backtest the ladder on each"""
+    paths = generate_paths(model, s0, n_steps, n_paths, seed=seed, **(model_params or {}))
+    logger.info(f"Monte Carlo: {n_paths} {model} paths of {n_steps} steps on {len(rungs)} rungs")
+    return run_paths(rungs, paths, spread=spread, workers=workers, **backtest_kwargs)
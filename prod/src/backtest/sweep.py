@@ -0,0 +1,309 @@
+"""Parallel parameter sweep for ladder settings on top of the backtest engine
+
+A sweep evaluates many (gain, trail, spacing, proceeds_strategy, crypto_ratio)
+combinations over the same bid/ask series. The series is placed in shared memory
+once and every worker process maps it, so nothing large is pickled per task.
+Results are written to a SQLite table as they come in; a sweep that is started
+again with the same name skips the combinations that are already stored.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from backtest.engine import run_backtest
+
+logger = logging.getLogger(__name__)
+
+PARAM_NAMES = ('gain', 'trail', 'spacing', 'proceeds_strategy', 'proceeds_crypto_ratio')
+
+RESULTS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS sweep_results (
+        sweep TEXT NOT NULL,
+        params_key TEXT NOT NULL,
+        gain REAL,
+        trail REAL,
+        spacing REAL,
+        proceeds_strategy TEXT,
+        proceeds_crypto_ratio REAL,
+        profit REAL,
+        deals INTEGER,
+        buys INTEGER,
+        sells INTEGER,
+        fees REAL,
+        capital_utilisation REAL,
+        end_equity REAL,
+        elapsed REAL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (sweep, params_key)
+    )
+'''
+
+
+def build_ladder(low: float, high: float, spacing: float, gain: float, trail: float,
+                 amount: float = 10.0, proceeds_strategy: str = 'eur',
+                 proceeds_crypto_ratio: float = 0.5, owned_above: Optional[float] = None) -> List[Dict]:
+    """Rungs from ``low`` to ``high`` with geometric ``spacing`` (0.01 = 1% apart)
+
+    Rungs with a matrix price at or above ``owned_above`` start in position, as if
+    bought at their matrix price.
+    """
+    if low <= 0 or spacing <= 0:
+        raise ValueError(f"Ladder needs a positive low price and spacing, got low={low}, spacing={spacing}")
+    prices = []
+    price = low
+    while price <= high:
+        prices.append(price)
+        price *= 1 + spacing
+    rows = []
+    for k, matrix in enumerate(prices):
+        owned = owned_above is not None and matrix >= owned_above
+        rows.append({
+            'index_num': k,
+            'current_price': matrix,
+            'gain': gain,
+            'trail': trail,
+            'transactie_bedrag': amount,
+            'position': 'Y' if owned else 'N',
+            'temp_high': matrix,
+            'temp_low': matrix,
+            'number_deals': 0,
+            'last_buy_price': matrix if owned else 0.0,
+            'proceeds_strategy': proceeds_strategy,
+            'proceeds_crypto_ratio': proceeds_crypto_ratio,
+        })
+    return rows
+
+
+def params_key(params: Dict) -> str:
+    return json.dumps({name: params[name] for name in PARAM_NAMES}, sort_keys=True)
+
+
+def grid(space: Dict[str, Sequence]) -> Iterator[Dict]:
+    """Every combination of the listed values"""
+    names = [name for name in PARAM_NAMES if name in space]
+    for values in itertools.product(*(space[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def random_search(space: Dict[str, Sequence], n: int, seed: int = 0) -> Iterator[Dict]:
+    """``n`` samples; (low, high) tuples are sampled uniformly, lists are choices
+
+    The same seed always yields the same sequence, so a resumed random search
+    continues where it stopped.
+    """
+    rng = np.random.default_rng(seed)
+    for _ in range(n):
+        params = {}
+        for name in PARAM_NAMES:
+            if name not in space:
+                continue
+            values = space[name]
+            if isinstance(values, tuple):
+                params[name] = round(float(rng.uniform(*values)), 6)
+            else:
+                params[name] = values[int(rng.integers(len(values)))]
+        yield params
+
+
+# ---------------------------------------------------------------------- workers
+
+_worker_series = {}
+
+
+def _attach(shm_name: str, length: int):
+    """Pool initializer: map the shared bid/ask block into this worker"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    series = np.ndarray((2, length), dtype=np.float64, buffer=shm.buf)
+    _worker_series['shm'] = shm  # keep the mapping alive for the worker's lifetime
+    _worker_series['bid'] = series[0]
+    _worker_series['ask'] = series[1]
+
+
+def _evaluate(params: Dict, ladder: Dict, fee: float, slippage: float) -> Dict:
+    bid, ask = _worker_series['bid'], _worker_series['ask']
+    start = time.perf_counter()
+    rows = build_ladder(
+        ladder['low'], ladder['high'], params['spacing'], params['gain'], params['trail'],
+        amount=ladder.get('amount', 10.0),
+        proceeds_strategy=params['proceeds_strategy'],
+        proceeds_crypto_ratio=params['proceeds_crypto_ratio'],
+        owned_above=ladder.get('owned_above'),
+    )
+    summary = run_backtest(rows, bid, ask, fee=fee, slippage=slippage).summary()
+    summary['elapsed'] = time.perf_counter() - start
+    return summary
+
+
+# ---------------------------------------------------------------------- runner
+
+class ParameterSweep:
+    """Fan a parameter grid or random search out over a process pool
+
+    ``ladder`` holds the fixed ladder layout: ``low``, ``high``, ``amount`` and
+    optionally ``spacing`` and ``owned_above``.
+    """
+
+    def __init__(self, name: str, bid, ask, ladder: Dict, results_db: str,
+                 fee: float = 0.0025, slippage: float = 0.0, workers: Optional[int] = None):
+        self.name = name
+        self.bid = np.asarray(bid, dtype=np.float64)
+        self.ask = np.asarray(ask, dtype=np.float64)
+        self.ladder = ladder
+        self.results_db = results_db
+        self.fee = fee
+        self.slippage = slippage
+        self.workers = workers or os.cpu_count() or 1
+
+        self.conn = sqlite3.connect(results_db)
+        self.conn.execute(RESULTS_SCHEMA)
+        self.conn.commit()
+
+    def completed(self) -> set:
+        cursor = self.conn.execute('SELECT params_key FROM sweep_results WHERE sweep = ?', (self.name,))
+        return {row[0] for row in cursor}
+
+    def _store(self, params: Dict, summary: Dict):
+        self.conn.execute('''
+            INSERT OR REPLACE INTO sweep_results
+                (sweep, params_key, gain, trail, spacing, proceeds_strategy, proceeds_crypto_ratio,
+                 profit, deals, buys, sells, fees, capital_utilisation, end_equity, elapsed)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            self.name, params_key(params),
+            params['gain'], params['trail'], params['spacing'],
+            params['proceeds_strategy'], params['proceeds_crypto_ratio'],
+            summary['profit'], summary['deals'], summary['buys'], summary['sells'], summary['fees'],
+            summary['capital_utilisation'], summary['end_equity'], summary['elapsed'],
+        ))
+        self.conn.commit()
+
+    def _normalise(self, params: Dict) -> Dict:
+        full = {
+            'gain': 0.03,
+            'trail': 0.01,
+            'spacing': self.ladder.get('spacing', 0.01),
+            'proceeds_strategy': 'eur',
+            'proceeds_crypto_ratio': 0.5,
+        }
+        full.update(params)
+        return full
+
+    def run(self, combinations: Iterable[Dict]) -> int:
+        """Evaluate all combinations not yet in the results table, returns how many ran"""
+        done = self.completed()
+        todo = []
+        for params in combinations:
+            params = self._normalise(params)
+            key = params_key(params)
+            if key not in done:
+                done.add(key)
+                todo.append(params)
+        if not todo:
+            logger.info(f"Sweep {self.name}: nothing left to run")
+            return 0
+
+        length = len(self.bid)
+        shm = shared_memory.SharedMemory(create=True, size=2 * length * 8)
+        try:
+            series = np.ndarray((2, length), dtype=np.float64, buffer=shm.buf)
+            series[0] = self.bid
+            series[1] = self.ask
+            logger.info(f"Sweep {self.name}: {len(todo)} combinations on {self.workers} workers")
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_attach,
+                                     initargs=(shm.name, length)) as pool:
+                futures = {pool.submit(_evaluate, params, self.ladder, self.fee, self.slippage): params
+                           for params in todo}
+                for n, future in enumerate(as_completed(futures), 1):
+                    params = futures[future]
+                    try:
+                        summary = future.result()
+                    except Exception as e:
+                        logger.error(f"Sweep {self.name}: {params} failed: {e}")
+                        continue
+                    self._store(params, summary)
+                    logger.debug(f"Sweep {self.name}: {n}/{len(todo)} profit {summary['profit']:.2f}")
+            del series
+        finally:
+            shm.close()
+            shm.unlink()
+        return len(todo)
+
+    def results(self, order_by: str = 'profit') -> List[Dict]:
+        if order_by not in ('profit', 'deals', 'capital_utilisation', 'end_equity'):
+            raise ValueError(f"Cannot order by {order_by!r}")
+        self.conn.row_factory = sqlite3.Row
+        try:
+            cursor = self.conn.execute(
+                f'SELECT * FROM sweep_results WHERE sweep = ? ORDER BY {order_by} DESC', (self.name,))
+            return [dict(row) for row in cursor]
+        finally:
+            self.conn.row_factory = None
+
+    def close(self):
+        self.conn.close()
+
+
+def _values(text: str, cast=float):
+    """'0.01,0.02' -> [0.01, 0.02]; '0.01:0.05' -> (0.01, 0.05) for random search"""
+    if ':' in text:
+        low, high = text.split(':')
+        return (cast(low), cast(high))
+    return [cast(v) for v in text.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel ladder parameter sweep over recorded ticks')
+    parser.add_argument('--ticks', required=True, help='TickStore directory')
+    parser.add_argument('--market', required=True)
+    parser.add_argument('--low', type=float, required=True)
+    parser.add_argument('--high', type=float, required=True)
+    parser.add_argument('--amount', type=float, default=10.0)
+    parser.add_argument('--owned-above', type=float, default=None)
+    parser.add_argument('--gain', default='0.02,0.03,0.04')
+    parser.add_argument('--trail', default='0.005,0.01')
+    parser.add_argument('--spacing', default='0.01,0.02')
+    parser.add_argument('--strategy', default='eur,crypto,split')
+    parser.add_argument('--crypto-ratio', default='0.5')
+    parser.add_argument('--random', type=int, default=0, help='number of random samples instead of a grid')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--results', default='sweep_results.db')
+    parser.add_argument('--name', default=None, help='sweep name, reuse it to resume')
+    args = parser.parse_args()
+
+    from market_data.tick_store import TickStore
+    view = TickStore(args.ticks).read(args.market)
+    if len(view.ts) == 0:
+        parser.error(f"No ticks for {args.market} in {args.ticks}")
+
+    space = {
+        'gain': _values(args.gain),
+        'trail': _values(args.trail),
+        'spacing': _values(args.spacing),
+        'proceeds_strategy': args.strategy.split(','),
+        'proceeds_crypto_ratio': _values(args.crypto_ratio),
+    }
+    combinations = random_search(space, args.random, args.seed) if args.random else grid(space)
+    ladder = {'low': args.low, 'high': args.high, 'amount': args.amount, 'owned_above': args.owned_above}
+    sweep = ParameterSweep(args.name or args.market, view.bid, view.ask, ladder, args.results,
+                           workers=args.workers)
+    sweep.run(combinations)
+    for row in sweep.results()[:10]:
+        print(f"{row['profit']:>10.2f}  deals {row['deals']:>5}  util {row['capital_utilisation']:.2f}  "
+              f"gain {row['gain']} trail {row['trail']} spacing {row['spacing']} "
+              f"{row['proceeds_strategy']} {row['proceeds_crypto_ratio']}")
+    sweep.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
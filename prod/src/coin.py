@@ -8,11 +8,65 @@ from typing import Optional, Dict, Any
 
 from config import config
 from database import db
-from reporting.trade_discord_notifier import send_sell_notification, send_buy_notification
-from services.proceeds_calculator import proceeds_calculator, ProceedsResult
+from services.metrics import ORDERS, REST_SECONDS
+from services.event_log import EventLogger
+from services.event_bus import OrderEvent
 
 logger = logging.getLogger(__name__)
 
+# Hot-path log events of check_action; formatted only when their level is enabled
+events = EventLogger(logger, {
+    'skip_buy': (logging.INFO,
+                 "⏸️  SKIP BUY {market}: Stijgende markt (ask {ask:,.2f} > laagste bezit {lowest:,.2f}). "
+                 "{owned} coin(s) in bezit monitoren voor verkoop."),
+    'dip_detected': (logging.INFO,
+                     "📉 DIP DETECTED {market}: ask {ask:,.2f} < laagste bezit {lowest:,.2f}. "
+                     "Buy check toegestaan (extra positie bij daling)."),
+    'temp_high': (logging.DEBUG,
+                  "📈 TEMP_HIGH: {market} | Coin ID: {coin_id} | €{old:,.2f} → €{new:,.2f} (+€{diff:,.2f})"),
+    'sell_trigger': (logging.DEBUG,
+                     "🚀 SELL TRIGGER BEREIKT: {market} | Coin ID: {coin_id} | Matrix: €{matrix:,.2f} | "
+                     "Sell drempel: €{trigger:,.2f} (matrix × {trigger_factor:.4f}) | BID: €{bid:,.2f} ✅ | "
+                     "→ SELL SIGNAL ACTIEF | temp_high init: €{temp_high:,.2f} | "
+                     "Trail sell: €{trail:,.2f} (temp_high × {trail_factor:.4f})"),
+    'sell_trail_moved': (logging.DEBUG,
+                         "⬆️ TRAIL HERBEREKEND (SELL): {market} | Coin ID: {coin_id} | "
+                         "temp_high: €{old_temp:,.2f} → €{temp_high:,.2f} | Oude trail: €{old_trail:,.2f} | "
+                         "Nieuwe trail: €{trail:,.2f} (+€{diff:,.2f}) | "
+                         "→ Moet nu €{trail:,.2f} doorbreken voor verkoop"),
+    'sell_executed': (logging.DEBUG,
+                      "💰 SELL UITGEVOERD: {market} | Coin ID: {coin_id} | Order ID: {order_id} | "
+                      "Matrix: €{matrix:,.2f} | Sell trigger: €{trigger:,.2f} (matrix × {trigger_factor:.4f}) | "
+                      "temp_high (hoogste): €{temp_high:,.2f} | "
+                      "Trail sell: €{trail:,.2f} (temp_high × {trail_factor:.4f}) | "
+                      "Verkocht @ €{price:,.2f} ✅ | Amount: {amount:.8f} {base} | Total: €{total:,.2f} | "
+                      "Fees: €{fee:,.4f} | Winst: €{profit:,.2f} ({profit_pct:.2f}% boven matrix)"),
+    'temp_low': (logging.DEBUG,
+                 "📉 TEMP_LOW: {market} | Coin ID: {coin_id} | €{old:,.2f} → €{new:,.2f} (-€{diff:,.2f})"),
+    'buy_trigger': (logging.DEBUG,
+                    "📉 BUY TRIGGER BEREIKT: {market} | Coin ID: {coin_id} | Matrix: €{matrix:,.2f} | "
+                    "Buy drempel: €{trigger:,.2f} (matrix × {trigger_factor:.4f}) | ASK: €{ask:,.2f} ✅ | "
+                    "→ BUY SIGNAL ACTIEF | temp_low init: €{temp_low:,.2f} | "
+                    "Trail buy: €{trail:,.2f} (temp_low × {trail_factor:.4f})"),
+    'buy_trail_moved': (logging.DEBUG,
+                        "⬇️ TRAIL HERBEREKEND (BUY): {market} | Coin ID: {coin_id} | "
+                        "temp_low: €{old_temp:,.2f} → €{temp_low:,.2f} | Oude trail: €{old_trail:,.2f} | "
+                        "Nieuwe trail: €{trail:,.2f} (-€{diff:,.2f}) | "
+                        "→ Moet nu €{trail:,.2f} doorbreken voor aankoop"),
+    'buy_executed': (logging.DEBUG,
+                     "💰 BUY UITGEVOERD: {market} | Coin ID: {coin_id} | Order ID: {order_id} | "
+                     "Matrix: €{matrix:,.2f} | Buy trigger: €{trigger:,.2f} (matrix × {trigger_factor:.4f}) | "
+                     "temp_low (laagste): €{temp_low:,.2f} | "
+                     "Trail buy: €{trail:,.2f} (temp_low × {trail_factor:.4f}) | "
+                     "Gekocht @ €{price:,.2f} ✅ | Amount: {amount:.8f} {base} | Total: €{total:,.2f} | "
+                     "Fees: €{fee:,.4f} | Discount: €{discount:,.2f} ({discount_pct:.2f}% onder matrix)"),
+    'buy_price_tracked': (logging.DEBUG, "💰 BUY PRICE TRACKED: {market} @ €{price:,.2f}"),
+})
+
+# Journaled with the coin (see journal_state) but not columns of the coins table;
+# signals are re-validated against the market on every restart
+JOURNAL_ONLY_FIELDS = ('buy_signal', 'sell_signal')
+
 markets = []
 
 def time_ms() -> int:
@@ -24,7 +78,8 @@ class Coin:
     This includes functionality to contain and update TA indicators as well as the latest OHLCV data
     This also handles the API key for authentication, as well as methods to place orders"""
 
-    def __init__(self, bitvavo_client, coin_info, coin_id: Optional[int] = None):
+    def __init__(self, bitvavo_client, coin_info, coin_id: Optional[int] = None,
+                 validate_signals: bool = True):
         # Database ID for tracking
         self.coin_id = coin_id
         
@@ -35,11 +90,11 @@ class Coin:
             self._init_from_list(coin_info)
         
         # Trading client
+        self.client = bitvavo_client
         self.bitvavo = bitvavo_client.bitvavo if bitvavo_client else None
         
         # Technical analysis data
         self.signals = []
-        self.indicators = defaultdict(list)
         self.candles = defaultdict(list)
         self.latest_candle = defaultdict(list)
         
@@ -56,13 +111,20 @@ class Coin:
         self.trail_stop_sell_drempel = 0.0
         self.ask = 0
         self.bid = 0
-        # Initialize trading signals
-        self._init_trading_signals()
+        # Initialize trading signals (the monitor skips this for coins restored from a snapshot)
+        if validate_signals:
+            self._init_trading_signals()
         
         # Test mode configuration
         self.test_mode = config.is_test_mode()
         self.testdata = self.current_price
-    
+
+    @property
+    def indicators(self):
+        """IndicatorSet of this coin's market, shared by all its rungs (None until its first bar)"""
+        hub = getattr(self.client, 'indicators', None)
+        return hub.get(self.analysis_pair) if hub is not None else None
+
     def _init_from_list(self, coin_info):
         """Initialize from CSV list format"""
         self.index = int(coin_info[0])
@@ -116,6 +178,14 @@ class Coin:
         if self.proceeds_crypto_ratio is None:
             self.proceeds_crypto_ratio = config.DEFAULT_PROCEEDS_CRYPTO_RATIO
 
+    def restore_runtime_state(self, record):
+        """Take signal flags, high/low and trigger levels from a snapshot record (services/snapshot.py)"""
+        self.buy_signal = bool(record['buy_signal'])
+        self.sell_signal = bool(record['sell_signal'])
+        for field in ('high', 'low', 'buy_drempel', 'sell_drempel', 'trail_stop_buy_drempel',
+                      'trail_stop_sell_drempel', 'ask', 'bid'):
+            setattr(self, field, float(record[field]))
+
     @property
     def buy_price_reference(self):
         """Price reference for buy logic calculations"""
@@ -227,16 +297,21 @@ class Coin:
         # Probeer eerst de originele client (als beschikbaar)
         if self.bitvavo:
             try:
-                best = self.bitvavo.book(self.analysis_pair, {'depth': '1'})
+                with REST_SECONDS.labels(endpoint='/book').time():
+                    best = self.bitvavo.book(self.analysis_pair, {'depth': '1'})
                 if 'error' not in best:
+                    if self.client:
+                        self.client.record_book(self.analysis_pair, best)
                     return best['bids'][0][0]
             except Exception as e:
                 logger.debug(f"Originele API gefaald voor {self.analysis_pair}: {e}")
 
-        # Fallback naar publieke API
+        # Fallback naar publieke API (gedeelde client, zodat de ticker cache werkt)
         try:
-            from bitvavo_client import Bitvavo_client
-            client = Bitvavo_client()
+            client = self.client
+            if client is None:
+                from bitvavo_client import Bitvavo_client
+                client = Bitvavo_client()
             if client.can_read_market_data():
                 best = client.book(self.analysis_pair, {'depth': '1'})
                 if 'error' not in best:
@@ -252,16 +327,21 @@ class Coin:
         # Probeer eerst de originele client (als beschikbaar)
         if self.bitvavo:
             try:
-                best = self.bitvavo.book(self.analysis_pair, {'depth': '1'})
+                with REST_SECONDS.labels(endpoint='/book').time():
+                    best = self.bitvavo.book(self.analysis_pair, {'depth': '1'})
                 if 'error' not in best:
+                    if self.client:
+                        self.client.record_book(self.analysis_pair, best)
                     return best['asks'][0][0]
             except Exception as e:
                 logger.debug(f"Originele API gefaald voor {self.analysis_pair}: {e}")
 
-        # Fallback naar publieke API
+        # Fallback naar publieke API (gedeelde client, zodat de ticker cache werkt)
         try:
-            from bitvavo_client import Bitvavo_client
-            client = Bitvavo_client()
+            client = self.client
+            if client is None:
+                from bitvavo_client import Bitvavo_client
+                client = Bitvavo_client()
             if client.can_read_market_data():
                 best = client.book(self.analysis_pair, {'depth': '1'})
                 if 'error' not in best:
@@ -287,6 +367,25 @@ class Coin:
         spread = round(((ask - bid) / ask) * 100, 2)
         return spread
 
+    def get_next_test(self, side: str = 'mid') -> float:
+        """Simulated bid/ask/mid price for this market
+
+        All rungs of a market read the same seeded path from the client's
+        MarketSimulator; the monitor advances it once per trading cycle.
+        """
+        from simulation.price_paths import MarketSimulator  # numpy; only needed without market data
+        if self.client is not None:
+            if getattr(self.client, 'price_simulator', None) is None:
+                self.client.price_simulator = MarketSimulator()
+            simulator = self.client.price_simulator
+        else:
+            if not hasattr(self, '_price_simulator'):
+                self._price_simulator = MarketSimulator()
+            simulator = self._price_simulator
+        bid, ask = simulator.quote(self.analysis_pair, start=self.current_price)
+        self.testdata = {'bid': bid, 'ask': ask}.get(side, (bid + ask) / 2)
+        return self.testdata
+
     def get_position(self):
         return self.position
 
@@ -309,6 +408,9 @@ class Coin:
         if not self.position:  # WIL KOPEN
             # Check of er al een coin van deze crypto in BEZIT is
             coins_in_bezit = db.get_coins_in_position(self.base_currency)
+            ladder_book = getattr(self.client, 'ladder_book', None)
+            if ladder_book is not None:
+                coins_in_bezit = list(coins_in_bezit) + ladder_book.in_position(self.base_currency)
 
             if coins_in_bezit:
                 # Er zijn al coins in bezit!
@@ -326,20 +428,14 @@ class Coin:
                 if current_ask > laagste_matrix:
                     # Markt stijgt boven de laagste inkoop prijs!
                     # NIET kopen - laat bestaande coins richting trigger bewegen
-                    logger.info(
-                        f"⏸️  SKIP BUY {self.analysis_pair}: Stijgende markt "
-                        f"(ask {current_ask:,.2f} > laagste bezit {laagste_matrix:,.2f}). "
-                        f"{len(coins_in_bezit)} coin(s) in bezit monitoren voor verkoop."
-                    )
+                    events.emit('skip_buy', market=self.analysis_pair, ask=current_ask,
+                                lowest=laagste_matrix, owned=len(coins_in_bezit))
                     return  # Stop hier - geen buy check
                 else:
                     # Markt daalt onder laagste inkoop
                     # Dit is een DIP - WEL kopen toegestaan (extra positie opbouwen)
-                    logger.info(
-                        f"📉 DIP DETECTED {self.analysis_pair}: "
-                        f"ask {current_ask:,.2f} < laagste bezit {laagste_matrix:,.2f}. "
-                        f"Buy check toegestaan (extra positie bij daling)."
-                    )
+                    events.emit('dip_detected', market=self.analysis_pair, ask=current_ask,
+                                lowest=laagste_matrix)
                     # Ga door naar normale buy logic hieronder
 
         if self.position:               # we are going to sell
@@ -349,10 +445,10 @@ class Coin:
                     bid = float(self.get_best_bid())
                 except Exception as e:
                     logger.warning(f"API call failed, using test data: {e}")
-                    bid = self.get_next_test()
+                    bid = self.get_next_test('bid')
             else:
                 # Fallback to test data if no API available
-                bid = self.get_next_test()
+                bid = self.get_next_test('bid')
             self.bid = bid
             
             # Log price update with bid/ask
@@ -377,27 +473,17 @@ class Coin:
                 self._save_to_database()
 
                 # Logging: temp_high update
-                diff = bid - old_temp_high
-                logger.debug(
-                    f"📈 TEMP_HIGH: {self.analysis_pair} | "
-                    f"Coin ID: {self.coin_id} | "
-                    f"€{old_temp_high:,.2f} → €{bid:,.2f} (+€{diff:,.2f})"
-                )
+                events.emit('temp_high', market=self.analysis_pair, coin_id=self.coin_id,
+                            old=old_temp_high, new=bid, diff=bid - old_temp_high)
 
                 if self.high >= self.sell_drempel:
                     if not self.sell_signal:
                         # Signal wordt NU actief (trigger doorbraak)
                         self.trail_stop_sell_drempel = self.temp_high * (1 - self.trail)
-                        logger.debug(
-                            f"🚀 SELL TRIGGER BEREIKT: {self.analysis_pair} | "
-                            f"Coin ID: {self.coin_id} | "
-                            f"Matrix: €{self.current_price:,.2f} | "
-                            f"Sell drempel: €{self.sell_drempel:,.2f} (matrix × {1 + self.gain:.4f}) | "
-                            f"BID: €{bid:,.2f} ✅ | "
-                            f"→ SELL SIGNAL ACTIEF | "
-                            f"temp_high init: €{self.temp_high:,.2f} | "
-                            f"Trail sell: €{self.trail_stop_sell_drempel:,.2f} (temp_high × {1 - self.trail:.4f})"
-                        )
+                        events.emit('sell_trigger', market=self.analysis_pair, coin_id=self.coin_id,
+                                    matrix=self.current_price, trigger=self.sell_drempel,
+                                    trigger_factor=1 + self.gain, bid=bid, temp_high=self.temp_high,
+                                    trail=self.trail_stop_sell_drempel, trail_factor=1 - self.trail)
 
                     self.sell_signal = True
 
@@ -407,15 +493,9 @@ class Coin:
                     # Trail herberekening logging (alleen als signal al actief was)
                     if old_trail is not None:
                         new_trail = self.trail_stop_sell_drempel
-                        trail_diff = new_trail - old_trail
-                        logger.debug(
-                            f"⬆️ TRAIL HERBEREKEND (SELL): {self.analysis_pair} | "
-                            f"Coin ID: {self.coin_id} | "
-                            f"temp_high: €{old_temp_high:,.2f} → €{self.temp_high:,.2f} | "
-                            f"Oude trail: €{old_trail:,.2f} | "
-                            f"Nieuwe trail: €{new_trail:,.2f} (+€{trail_diff:,.2f}) | "
-                            f"→ Moet nu €{new_trail:,.2f} doorbreken voor verkoop"
-                        )
+                        events.emit('sell_trail_moved', market=self.analysis_pair, coin_id=self.coin_id,
+                                    old_temp=old_temp_high, temp_high=self.temp_high, old_trail=old_trail,
+                                    trail=new_trail, diff=new_trail - old_trail)
 
                     # Sla sell signal status ook op
                     self._save_to_database()
@@ -428,6 +508,7 @@ class Coin:
                 if bid <= self.trail_stop_sell_drempel:
                     # Execute sell order
                     transaction_result = self._execute_sell_order(bid, is_test_mode)
+                    self._record_order('sell', transaction_result, is_test_mode, bid)
 
                     if transaction_result['success']:
                         # Bereken transactie details
@@ -452,22 +533,15 @@ class Coin:
                         profit_pct = (profit / self.current_price) * 100 if self.current_price > 0 else 0
 
                         # Detail logging
-                        logger.debug(
-                            f"💰 SELL UITGEVOERD: {self.analysis_pair} | "
-                            f"Coin ID: {self.id} | "
-                            f"Order ID: {order_id} | "
-                            f"Matrix: €{self.current_price:,.2f} | "
-                            f"Sell trigger: €{self.sell_drempel:,.2f} (matrix × {1 + self.gain:.4f}) | "
-                            f"temp_high (hoogste): €{self.temp_high:,.2f} | "
-                            f"Trail sell: €{self.trail_stop_sell_drempel:,.2f} (temp_high × {1 - self.trail:.4f}) | "
-                            f"Verkocht @ €{actual_price:,.2f} ✅ | "
-                            f"Amount: {amount:.8f} {self.base_currency} | "
-                            f"Total: €{total:,.2f} | "
-                            f"Fees: €{fee:,.4f} | "
-                            f"Winst: €{profit:,.2f} ({profit_pct:.2f}% boven matrix)"
-                        )
-
-                        # Discord notificatie voor SELL transactie
+                        events.emit('sell_executed', market=self.analysis_pair, coin_id=self.coin_id,
+                                    order_id=order_id, matrix=self.current_price, trigger=self.sell_drempel,
+                                    trigger_factor=1 + self.gain, temp_high=self.temp_high,
+                                    trail=self.trail_stop_sell_drempel, trail_factor=1 - self.trail,
+                                    price=actual_price, amount=amount, base=self.base_currency, total=total,
+                                    fee=fee, profit=profit, profit_pct=profit_pct)
+
+                        # Discord notificatie voor SELL transactie (module pas laden bij een trade)
+                        from reporting.trade_discord_notifier import send_sell_notification
                         send_sell_notification(
                             coin_id=self.coin_id,
                             crypto=self.analysis_pair,
@@ -568,10 +642,10 @@ class Coin:
                     ask = float(self.get_best_ask())
                 except Exception as e:
                     logger.warning(f"API call failed, using test data: {e}")
-                    ask = self.get_next_test()
+                    ask = self.get_next_test('ask')
             else:
                 # Fallback to test data if no API available
-                ask = self.get_next_test()
+                ask = self.get_next_test('ask')
             self.ask = ask
             
             # Log price update with ask
@@ -596,27 +670,17 @@ class Coin:
                 self._save_to_database()
 
                 # Logging: temp_low update
-                diff = old_temp_low - ask
-                logger.debug(
-                    f"📉 TEMP_LOW: {self.analysis_pair} | "
-                    f"Coin ID: {self.coin_id} | "
-                    f"€{old_temp_low:,.2f} → €{ask:,.2f} (-€{diff:,.2f})"
-                )
+                events.emit('temp_low', market=self.analysis_pair, coin_id=self.coin_id,
+                            old=old_temp_low, new=ask, diff=old_temp_low - ask)
 
                 if self.low < self.buy_drempel:
                     if not self.buy_signal:
                         # Signal wordt NU actief (trigger doorbraak)
                         self.trail_stop_buy_drempel = self.temp_low * (1 + self.trail)
-                        logger.debug(
-                            f"📉 BUY TRIGGER BEREIKT: {self.analysis_pair} | "
-                            f"Coin ID: {self.coin_id} | "
-                            f"Matrix: €{self.current_price:,.2f} | "
-                            f"Buy drempel: €{self.buy_drempel:,.2f} (matrix × {1 - self.gain:.4f}) | "
-                            f"ASK: €{ask:,.2f} ✅ | "
-                            f"→ BUY SIGNAL ACTIEF | "
-                            f"temp_low init: €{self.temp_low:,.2f} | "
-                            f"Trail buy: €{self.trail_stop_buy_drempel:,.2f} (temp_low × {1 + self.trail:.4f})"
-                        )
+                        events.emit('buy_trigger', market=self.analysis_pair, coin_id=self.coin_id,
+                                    matrix=self.current_price, trigger=self.buy_drempel,
+                                    trigger_factor=1 - self.gain, ask=ask, temp_low=self.temp_low,
+                                    trail=self.trail_stop_buy_drempel, trail_factor=1 + self.trail)
 
                     self.buy_signal = True
 
@@ -626,15 +690,9 @@ class Coin:
                     # Trail herberekening logging (alleen als signal al actief was)
                     if old_trail is not None:
                         new_trail = self.trail_stop_buy_drempel
-                        trail_diff = old_trail - new_trail
-                        logger.debug(
-                            f"⬇️ TRAIL HERBEREKEND (BUY): {self.analysis_pair} | "
-                            f"Coin ID: {self.coin_id} | "
-                            f"temp_low: €{old_temp_low:,.2f} → €{self.temp_low:,.2f} | "
-                            f"Oude trail: €{old_trail:,.2f} | "
-                            f"Nieuwe trail: €{new_trail:,.2f} (-€{trail_diff:,.2f}) | "
-                            f"→ Moet nu €{new_trail:,.2f} doorbreken voor aankoop"
-                        )
+                        events.emit('buy_trail_moved', market=self.analysis_pair, coin_id=self.coin_id,
+                                    old_temp=old_temp_low, temp_low=self.temp_low, old_trail=old_trail,
+                                    trail=new_trail, diff=old_trail - new_trail)
 
                     # Sla buy signal status ook op
                     self._save_to_database()
@@ -647,6 +705,7 @@ class Coin:
                 if self.trail_stop_buy_drempel <= ask:
                     # Execute buy order
                     transaction_result = self._execute_buy_order(ask, is_test_mode)
+                    self._record_order('buy', transaction_result, is_test_mode, ask)
 
                     if transaction_result['success']:
                         # Bereken transactie details
@@ -671,22 +730,15 @@ class Coin:
                         discount_pct = (discount / self.current_price) * 100 if self.current_price > 0 else 0
 
                         # Detail logging
-                        logger.debug(
-                            f"💰 BUY UITGEVOERD: {self.analysis_pair} | "
-                            f"Coin ID: {self.coin_id} | "
-                            f"Order ID: {order_id} | "
-                            f"Matrix: €{self.current_price:,.2f} | "
-                            f"Buy trigger: €{self.buy_drempel:,.2f} (matrix × {1 - self.gain:.4f}) | "
-                            f"temp_low (laagste): €{self.temp_low:,.2f} | "
-                            f"Trail buy: €{self.trail_stop_buy_drempel:,.2f} (temp_low × {1 + self.trail:.4f}) | "
-                            f"Gekocht @ €{actual_price:,.2f} ✅ | "
-                            f"Amount: {amount:.8f} {self.base_currency} | "
-                            f"Total: €{total:,.2f} | "
-                            f"Fees: €{fee:,.4f} | "
-                            f"Discount: €{discount:,.2f} ({discount_pct:.2f}% onder matrix)"
-                        )
-
-                        # Discord notificatie voor BUY transactie
+                        events.emit('buy_executed', market=self.analysis_pair, coin_id=self.coin_id,
+                                    order_id=order_id, matrix=self.current_price, trigger=self.buy_drempel,
+                                    trigger_factor=1 - self.gain, temp_low=self.temp_low,
+                                    trail=self.trail_stop_buy_drempel, trail_factor=1 + self.trail,
+                                    price=actual_price, amount=amount, base=self.base_currency, total=total,
+                                    fee=fee, discount=discount, discount_pct=discount_pct)
+
+                        # Discord notificatie voor BUY transactie (module pas laden bij een trade)
+                        from reporting.trade_discord_notifier import send_buy_notification
                         send_buy_notification(
                             coin_id=self.coin_id,
                             crypto=self.analysis_pair,
@@ -716,7 +768,7 @@ class Coin:
                         # Track buy price voor winst berekening bij sell
                         self.last_buy_price = actual_price
 
-                        logger.debug(f"💰 BUY PRICE TRACKED: {self.analysis_pair} @ €{actual_price:,.2f}")
+                        events.emit('buy_price_tracked', market=self.analysis_pair, price=actual_price)
 
                         # Save updated coin state
                         self._save_to_database()
@@ -827,6 +879,24 @@ class Coin:
                 'strategy': 'eur'
             }
 
+    def _record_order(self, side: str, transaction_result: Dict[str, Any], is_test_mode: bool, price: float):
+        """Count an order attempt in the metrics registry and publish it on the event bus once it went through
+
+        Every order passes here, including the reinvestment buy right after a
+        sell, which leaves ``position`` unchanged.
+        """
+        if not transaction_result['success']:
+            ORDERS.labels(side=side, result='failed').inc()
+            return
+        ORDERS.labels(side=side, result='test' if is_test_mode else 'filled').inc()
+        bus = getattr(self.client, 'event_bus', None)
+        if bus is not None:
+            fills = (transaction_result.get('result') or {}).get('fills') or []
+            if fills:
+                price = float(fills[0].get('price', price))
+            bus.publish(OrderEvent(self.analysis_pair, self.coin_id, side, price, self.transactie_bedrag,
+                                   self.current_price, time.time()), key=self.analysis_pair)
+
     def _execute_sell_order(self, price: float, is_test_mode: bool) -> Dict[str, Any]:
         """Execute sell order with strategy-aware amount calculation"""
         try:
@@ -872,6 +942,7 @@ class Coin:
                 # Execute real order
                 if not self.bitvavo:
                     raise ValueError("Bitvavo client not available for live trading")
+                self._check_clock()
 
                 # Build order params based on strategy
                 var_sell = {'operatorId': config.OPERATOR_ID}
@@ -886,7 +957,8 @@ class Coin:
                     f"Params: {var_sell}"
                 )
 
-                result = self.bitvavo.placeOrder(self.analysis_pair, 'sell', 'market', var_sell)
+                with REST_SECONDS.labels(endpoint='/order').time():
+                    result = self.bitvavo.placeOrder(self.analysis_pair, 'sell', 'market', var_sell)
 
                 if 'errorCode' in result:
                     error_msg = result.get('error', 'Unknown API error')
@@ -919,6 +991,13 @@ class Coin:
 
             return {'success': False, 'error': error_msg}
     
+    def _check_clock(self):
+        """Refuse live orders while the local clock is too far off the exchange's (services/clock_sync.py)"""
+        clock = getattr(self.client, 'clock', None)
+        if clock is not None and not clock.in_sync():
+            raise ValueError(f"Clock is {clock.offset_ms:.0f} ms off the exchange "
+                             f"(bound {clock.max_skew_ms:.0f} ms); not placing orders")
+
     def _execute_buy_order(self, price: float, is_test_mode: bool) -> Dict[str, Any]:
         """Execute buy order with test mode support"""
         try:
@@ -942,9 +1021,11 @@ class Coin:
                 # Execute real order
                 if not self.bitvavo:
                     raise ValueError("Bitvavo client not available for live trading")
+                self._check_clock()
 
                 var_buy = {'amountQuote': str(self.transactie_bedrag), 'operatorId': config.OPERATOR_ID}
-                result = self.bitvavo.placeOrder(self.analysis_pair, 'buy', 'market', var_buy)
+                with REST_SECONDS.labels(endpoint='/order').time():
+                    result = self.bitvavo.placeOrder(self.analysis_pair, 'buy', 'market', var_buy)
                 
                 if 'errorCode' in result:
                     error_msg = result.get('error', 'Unknown API error')
@@ -988,6 +1069,7 @@ class Coin:
             Dict with result if new BUY was placed, None if no reinvestment
         """
         # Calculate proceeds using the configured strategy
+        from services.proceeds_calculator import proceeds_calculator
         result = proceeds_calculator.calculate(
             sell_amount=Decimal(str(sell_amount)),
             original_amount=Decimal(str(self.transactie_bedrag)),
@@ -1056,6 +1138,7 @@ class Coin:
 
         # Execute the BUY order
         buy_result = self._execute_buy_order(ask_price, is_test_mode)
+        self._record_order('buy', buy_result, is_test_mode, ask_price)
 
         if buy_result['success']:
             # Update position and state for the new BUY
@@ -1091,6 +1174,7 @@ class Coin:
             )
 
             # Send Discord notification for the reinvestment buy
+            from reporting.trade_discord_notifier import send_buy_notification
             send_buy_notification(
                 coin_id=self.coin_id,
                 crypto=self.analysis_pair,
@@ -1173,11 +1257,33 @@ class Coin:
             }
 
     def _save_to_database(self):
-        """Save current coin state to database"""
+        """Save current coin state to database, through the state journal when one is attached"""
         if not self.coin_id:
+            # Ladder rungs have no database row; their state is kept in the ladder file
+            ladder_book = getattr(self.client, 'ladder_book', None)
+            if ladder_book is not None:
+                ladder_book.record(self)
             return
 
-        coin_data = {
+        journal = getattr(self.client, 'state_journal', None)
+        if journal is not None:
+            journal.record(self.coin_id, self.journal_state())
+        else:
+            db.save_coin(self._coin_row())
+
+    def journal_state(self) -> Dict[str, Any]:
+        """The coins row plus the in-memory signal state, as journaled by StateJournal"""
+        state = self._coin_row()
+        state.update(buy_signal=self.buy_signal, sell_signal=self.sell_signal)
+        return state
+
+    @staticmethod
+    def db_row(state: Dict[str, Any]) -> Dict[str, Any]:
+        """Journaled state without the fields that are not stored in the coins table"""
+        return {key: value for key, value in state.items() if key not in JOURNAL_ONLY_FIELDS}
+
+    def _coin_row(self) -> Dict[str, Any]:
+        return {
             'index_num': self.index,
             'base_currency': self.base_currency,
             'quote_currency': self.quote_currency,
@@ -1197,8 +1303,6 @@ class Coin:
             'proceeds_crypto_ratio': self.proceeds_crypto_ratio
         }
 
-        db.save_coin(coin_data)
-
 
 def get_timestamp():
     return datetime.datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d %H:%M:%S')
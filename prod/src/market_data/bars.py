@@ -0,0 +1,151 @@
+"""OHLCV bars built in-process from the quotes the monitor already fetches
+
+The monitor sees a price for every market each cycle. ``BarBuilder`` folds those
+quotes into 1m/5m/1h bars per market, so indicators and charts need no candle
+requests to the exchange. Finished bars are kept in a fixed-size ring buffer
+per market and interval and passed to subscribers as soon as their period has
+ended. A period without quotes has no bar, as with exchange candles.
+
+Bars use the CANDLE_DTYPE layout of candles.py with timestamps in milliseconds.
+There are no traded volumes in a quote feed, so ``volume`` counts the quotes in
+the bar (tick volume).
+"""
+import logging
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from market_data.candles import CANDLE_DTYPE, INTERVAL_MS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVALS = ('1m', '5m', '1h')
+DEFAULT_CAPACITY = 1000
+
+# (market, interval, bar) with bar = (ts, open, high, low, close, volume)
+Bar = Tuple[int, float, float, float, float, float]
+Subscriber = Callable[[str, str, Bar], None]
+
+
+class BarSeries:
+    """Finished bars of one market and interval in a ring buffer, plus the bar being built"""
+
+    __slots__ = ('interval_ms', 'data', 'count', 'current')
+
+    def __init__(self, interval_ms: int, capacity: int):
+        self.interval_ms = interval_ms
+        self.data = np.zeros(capacity, dtype=CANDLE_DTYPE)
+        self.count = 0                      # finished bars ever, the newest is at (count - 1) % capacity
+        self.current: Optional[List] = None  # [ts, open, high, low, close, volume]
+
+    def add(self, ts: int, price: float) -> Optional[Bar]:
+        """Add a quote; returns the bar it finished, if any"""
+        start = ts - ts % self.interval_ms
+        current = self.current
+        if current is not None and start == current[0]:
+            if price > current[2]:
+                current[2] = price
+            if price < current[3]:
+                current[3] = price
+            current[4] = price
+            current[5] += 1
+            return None
+        finished = self.close() if current is not None else None
+        self.current = [start, price, price, price, price, 1.0]
+        return finished
+
+    def close(self) -> Bar:
+        """Finish the bar being built"""
+        bar = tuple(self.current)
+        self.data[self.count % len(self.data)] = bar
+        self.count += 1
+        self.current = None
+        return bar
+
+    def bars(self) -> np.ndarray:
+        """Finished bars, oldest first (a copy)"""
+        capacity = len(self.data)
+        if self.count <= capacity:
+            return self.data[:self.count].copy()
+        head = self.count % capacity
+        return np.concatenate((self.data[head:], self.data[:head]))
+
+
+class BarBuilder:
+    """Bars per market and interval from a stream of quotes"""
+
+    def __init__(self, intervals: Iterable[str] = DEFAULT_INTERVALS, capacity: int = DEFAULT_CAPACITY):
+        self.intervals = tuple(intervals)
+        for interval in self.intervals:
+            if interval not in INTERVAL_MS:
+                raise ValueError(f"Unsupported bar interval: {interval!r}")
+        self.capacity = capacity
+        self._series: Dict[str, Dict[str, BarSeries]] = {}
+        self._last_ts: Dict[str, int] = {}
+        self._subscribers: List[Tuple[Optional[str], Optional[str], Subscriber]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Subscriber, market: Optional[str] = None, interval: Optional[str] = None):
+        """Call ``callback(market, interval, bar)`` for every finished bar (optionally filtered)"""
+        self._subscribers.append((market, interval, callback))
+
+    def _publish(self, market: str, interval: str, bar: Bar):
+        for wanted_market, wanted_interval, callback in self._subscribers:
+            if wanted_market not in (None, market) or wanted_interval not in (None, interval):
+                continue
+            try:
+                callback(market, interval, bar)
+            except Exception as e:
+                logger.warning(f"Bar subscriber {callback!r} failed for {market} {interval}: {e}")
+
+    def update(self, market: str, price: float, ts: int):
+        """Add one quote (``ts`` in milliseconds); repeated or older quotes are ignored"""
+        if math.isnan(price) or ts <= self._last_ts.get(market, -1):
+            return
+        finished = []
+        with self._lock:
+            self._last_ts[market] = ts
+            series = self._series.get(market)
+            if series is None:
+                series = self._series[market] = {interval: BarSeries(INTERVAL_MS[interval], self.capacity)
+                                                 for interval in self.intervals}
+            for interval, bar_series in series.items():
+                bar = bar_series.add(ts, price)
+                if bar is not None:
+                    finished.append((interval, bar))
+        for interval, bar in finished:
+            self._publish(market, interval, bar)
+
+    def update_quotes(self, quotes: Dict[str, Tuple[float, float, float, float]]):
+        """Add the quotes of a cycle, as collected by market_snapshot.collect"""
+        for market, (price, _, _, ts) in quotes.items():
+            self.update(market, price, int(ts * 1000))
+
+    def flush(self, now: int):
+        """Finish the bars whose period ended before ``now`` (milliseconds) without a newer quote"""
+        finished = []
+        with self._lock:
+            for market, series in self._series.items():
+                for interval, bar_series in series.items():
+                    current = bar_series.current
+                    if current is not None and current[0] + bar_series.interval_ms <= now:
+                        finished.append((market, interval, bar_series.close()))
+        for market, interval, bar in finished:
+            self._publish(market, interval, bar)
+
+    def bars(self, market: str, interval: str) -> np.ndarray:
+        """Finished bars of a market, oldest first"""
+        with self._lock:
+            series = self._series.get(market, {}).get(interval)
+            return series.bars() if series is not None else np.zeros(0, dtype=CANDLE_DTYPE)
+
+    def current(self, market: str, interval: str) -> Optional[Bar]:
+        """The bar still being built, if any"""
+        with self._lock:
+            series = self._series.get(market, {}).get(interval)
+            return tuple(series.current) if series is not None and series.current is not None else None
+
+    def markets(self) -> List[str]:
+        return sorted(self._series)
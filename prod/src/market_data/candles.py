@@ -0,0 +1,309 @@
+"""Resumable Bitvavo candle downloader with an on-disk binary cache
+
+Candles are stored per market and interval as one fixed-width record file
+(timestamp, open, high, low, close, volume) next to a small JSON file listing the
+time ranges that have already been fetched. Ranges without trades legitimately
+have no candles, so coverage is tracked separately from the data: a range that
+was fetched once is never requested again, and an interrupted download resumes
+with exactly the ranges that are still missing.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+logger = logging.getLogger(__name__)
+
+CANDLE_DTYPE = np.dtype([
+    ('ts', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+])
+
+INTERVAL_MS = {
+    '1m': 60_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '6h': 21_600_000,
+    '8h': 28_800_000, '12h': 43_200_000, '1d': 86_400_000,
+}
+
+MAX_CANDLES_PER_REQUEST = 1440  # Bitvavo limit for /{market}/candles
+
+_MARKET_RE = re.compile(r'^[A-Z0-9]+-[A-Z0-9]+$')
+
+Range = Tuple[int, int]
+
+
+def merge_ranges(ranges: Iterable[Range]) -> List[Range]:
+    """Merge overlapping or touching half-open ``[start, end)`` ranges"""
+    merged: List[List[int]] = []
+    for start, end in sorted(ranges):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def missing_ranges(covered: List[Range], start: int, end: int) -> List[Range]:
+    """Parts of ``[start, end)`` that are not in the (merged) ``covered`` list"""
+    gaps = []
+    cursor = start
+    for lo, hi in covered:
+        if hi <= cursor:
+            continue
+        if lo >= end:
+            break
+        if lo > cursor:
+            gaps.append((cursor, min(lo, end)))
+        cursor = max(cursor, hi)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class CandleCache:
+    """Candle records and fetched-range bookkeeping for many markets
+
+    Forward downloads append to the record file; a backfill before the last stored
+    candle rewrites the file through a temp file and ``os.replace``. The ranges file
+    is always written after the data, so a crash can only cause a range to be
+    fetched twice, never to be marked as fetched without its candles.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, market: str, interval: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault((market, interval), threading.Lock())
+
+    def _paths(self, market: str, interval: str) -> Tuple[str, str]:
+        if not _MARKET_RE.match(market):
+            raise ValueError(f"Invalid market name: {market!r}")
+        if interval not in INTERVAL_MS:
+            raise ValueError(f"Unsupported candle interval: {interval!r}")
+        directory = os.path.join(self.root, market)
+        return (os.path.join(directory, f'{interval}.bin'),
+                os.path.join(directory, f'{interval}.ranges.json'))
+
+    def covered(self, market: str, interval: str) -> List[Range]:
+        _, ranges_path = self._paths(market, interval)
+        if not os.path.exists(ranges_path):
+            return []
+        with open(ranges_path) as f:
+            return [tuple(r) for r in json.load(f)]
+
+    def _stored(self, data_path: str) -> int:
+        if not os.path.exists(data_path):
+            return 0
+        return os.path.getsize(data_path) // CANDLE_DTYPE.itemsize
+
+    def read(self, market: str, interval: str, start: Optional[int] = None,
+             end: Optional[int] = None) -> np.ndarray:
+        """Candles with ``start <= ts < end`` as a read-only memory-mapped record array"""
+        data_path, _ = self._paths(market, interval)
+        rows = self._stored(data_path)
+        if rows == 0:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        candles = np.memmap(data_path, dtype=CANDLE_DTYPE, mode='r', shape=(rows,))
+        lo = 0 if start is None else int(np.searchsorted(candles['ts'], start, side='left'))
+        hi = rows if end is None else int(np.searchsorted(candles['ts'], end, side='left'))
+        return candles[lo:hi]
+
+    def store(self, market: str, interval: str, candles: np.ndarray, fetched: Range):
+        """Add fetched candles and mark ``fetched`` as covered"""
+        data_path, ranges_path = self._paths(market, interval)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        candles = np.sort(np.asarray(candles, dtype=CANDLE_DTYPE), order='ts')
+
+        with self._lock(market, interval):
+            rows = self._stored(data_path)
+            if len(candles):
+                last_ts = None
+                if rows:
+                    existing = np.memmap(data_path, dtype=CANDLE_DTYPE, mode='r', shape=(rows,))
+                    last_ts = int(existing['ts'][-1])
+                    del existing
+                if last_ts is None or int(candles['ts'][0]) > last_ts:
+                    with open(data_path, 'ab') as f:
+                        expected = rows * CANDLE_DTYPE.itemsize
+                        if f.tell() != expected:  # torn record from an earlier crash
+                            f.truncate(expected)
+                            f.seek(expected)
+                        f.write(candles.tobytes())
+                else:
+                    existing = np.fromfile(data_path, dtype=CANDLE_DTYPE, count=rows)
+                    merged = np.concatenate([candles, existing])  # fresh values win on duplicates
+                    _, first = np.unique(merged['ts'], return_index=True)
+                    tmp = data_path + '.tmp'
+                    merged[first].tofile(tmp)
+                    os.replace(tmp, data_path)
+
+            covered = merge_ranges(self.covered(market, interval) + [tuple(fetched)])
+            tmp = ranges_path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(covered, f)
+            os.replace(tmp, ranges_path)
+
+    def missing(self, market: str, interval: str, start: int, end: int) -> List[Range]:
+        return missing_ranges(self.covered(market, interval), start, end)
+
+
+class RateBudget:
+    """Token bucket shared by all download threads
+
+    Bitvavo allows 1000 weight points per minute per IP; a candle request costs 1.
+    The downloader only takes ``share`` of that, so a running monitor keeps headroom.
+    The server's own ``bitvavo-ratelimit-remaining`` header pauses everyone when low.
+    """
+
+    def __init__(self, per_minute: int = 1000, share: float = 0.5, min_remaining: int = 100):
+        self.rate = per_minute * share / 60.0
+        self.capacity = max(1.0, self.rate * 5)
+        self.tokens = self.capacity
+        self.min_remaining = min_remaining
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, weight: int = 1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= weight:
+                        self.tokens -= weight
+                        return
+                    wait = (weight - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def observe(self, headers):
+        """Back off until the reset time when the exchange reports few weight points left"""
+        remaining = headers.get('bitvavo-ratelimit-remaining')
+        reset_at = headers.get('bitvavo-ratelimit-resetat')
+        if remaining is None or int(remaining) >= self.min_remaining:
+            return
+        pause = 60.0 if reset_at is None else max(0.0, int(reset_at) / 1000 - time.time())
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+        logger.warning(f"Rate limit low ({remaining} left), pausing downloads for {pause:.1f}s")
+
+
+class CandleDownloader:
+    """Fill a CandleCache from ``GET {base_url}/{market}/candles``
+
+    Every missing range is split into windows of at most 1440 candles, which is one
+    request each. Windows are fetched oldest first so the cache file is appended to.
+    Markets are downloaded concurrently; all threads share one RateBudget.
+    """
+
+    def __init__(self, cache: CandleCache, base_url: str = 'https://api.bitvavo.com/v2',
+                 budget: Optional[RateBudget] = None, workers: int = 4,
+                 retries: int = 3, timeout: float = 10.0):
+        self.cache = cache
+        self.base_url = base_url.rstrip('/')
+        self.budget = budget or RateBudget()
+        self.workers = workers
+        self.retries = retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.requests_made = 0
+
+    def _fetch_window(self, market: str, interval: str, start: int, end: int) -> np.ndarray:
+        params = {'interval': interval, 'start': start, 'end': end - 1, 'limit': MAX_CANDLES_PER_REQUEST}
+        url = f"{self.base_url}/{market}/candles"
+        for attempt in range(self.retries + 1):
+            self.budget.acquire()
+            self.requests_made += 1
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                self.budget.observe(response.headers)
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+                response.raise_for_status()
+                payload = response.json()
+                if isinstance(payload, dict) and 'errorCode' in payload:
+                    raise requests.HTTPError(f"Bitvavo error {payload['errorCode']}: {payload.get('error')}")
+                rows = [tuple([int(c[0])] + [float(v) for v in c[1:6]]) for c in payload]
+                return np.array(rows, dtype=CANDLE_DTYPE)
+            except (requests.RequestException, ValueError) as e:
+                if attempt == self.retries:
+                    raise
+                backoff = 2 ** attempt
+                logger.warning(f"Candle request {market} {interval} {start} failed ({e}), retry in {backoff}s")
+                time.sleep(backoff)
+
+    def download(self, market: str, interval: str, start: int, end: Optional[int] = None) -> int:
+        """Fetch whatever part of ``[start, end)`` is not cached, returns candles stored
+
+        ``end`` defaults to now; the candle that is still forming is never marked as
+        covered, so it is fetched again on the next call.
+        """
+        step = INTERVAL_MS[interval]
+        now = int(time.time() * 1000)
+        end = min(end if end is not None else now, now // step * step)
+        start = start // step * step
+        stored = 0
+        for gap_start, gap_end in self.cache.missing(market, interval, start, end):
+            window_start = gap_start
+            while window_start < gap_end:
+                window_end = min(gap_end, window_start + MAX_CANDLES_PER_REQUEST * step)
+                candles = self._fetch_window(market, interval, window_start, window_end)
+                candles = candles[(candles['ts'] >= window_start) & (candles['ts'] < window_end)]
+                self.cache.store(market, interval, candles, (window_start, window_end))
+                stored += len(candles)
+                window_start = window_end
+        logger.info(f"{market} {interval}: {stored} candles downloaded")
+        return stored
+
+    def download_many(self, markets: Iterable[str], interval: str, start: int,
+                      end: Optional[int] = None) -> Dict[str, object]:
+        """Download several markets concurrently; failures are reported per market"""
+        results: Dict[str, object] = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {market: pool.submit(self.download, market, interval, start, end) for market in markets}
+            for market, future in futures.items():
+                try:
+                    results[market] = future.result()
+                except Exception as e:
+                    logger.error(f"Candle download for {market} failed: {e}")
+                    results[market] = e
+        return results
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Download Bitvavo candles into the local cache')
+    parser.add_argument('markets', nargs='+')
+    parser.add_argument('--interval', default='1m', choices=sorted(INTERVAL_MS))
+    parser.add_argument('--days', type=float, default=30)
+    parser.add_argument('--cache', default='candle_cache')
+    parser.add_argument('--base-url', default='https://api.bitvavo.com/v2')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    downloader = CandleDownloader(CandleCache(args.cache), base_url=args.base_url)
+    since = int((time.time() - args.days * 86400) * 1000)
+    for market, result in downloader.download_many(args.markets, args.interval, since).items():
+        print(f"{market}: {result}")
@@ -0,0 +1,419 @@
+"""Streaming technical indicators, computed once per market
+
+Every indicator is a small object fed one bar at a time. ``update`` costs O(1)
+and keeps its history in a ring buffer allocated up front, so a market with
+thousands of rungs pays for its indicators once per bar and not once per Coin.
+Until an indicator has seen enough bars, ``update`` returns None.
+
+Each indicator also has a ``batch`` function over a historical array. It gives
+the values ``update`` would have given bar by bar, with NaN for the warm-up
+bars, so stored candles can warm an ``IndicatorSet`` up or be analysed
+offline. Windowed indicators (SMA, Bollinger, min/max) are vectorized.
+The recursive ones (EMA, RSI, ATR) depend on their previous value and run the
+same recurrence over the array. Running sums are recomputed from the ring
+buffer every time it wraps, so streaming values do not drift from the batch
+ones over long runs.
+
+``IndicatorHub`` subscribes to a ``BarBuilder`` and keeps one ``IndicatorSet``
+per market. Coins of the same market read the shared set through
+``Coin.indicators``.
+"""
+import math
+import threading
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# name -> (kind, *parameters), used for every market unless configured otherwise
+DEFAULT_INDICATORS = {
+    'sma_20': ('sma', 20),
+    'ema_20': ('ema', 20),
+    'rsi_14': ('rsi', 14),
+    'atr_14': ('atr', 14),
+    'bb_20': ('bollinger', 20, 2.0),
+    'low_50': ('min', 50),
+    'high_50': ('max', 50),
+}
+
+
+def _check_period(period: int) -> int:
+    period = int(period)
+    if period < 1:
+        raise ValueError(f"Indicator period must be at least 1, not {period}")
+    return period
+
+
+def _windows(values: np.ndarray, period: int) -> np.ndarray:
+    """Full windows of ``values``; row i ends at index i + period - 1"""
+    return sliding_window_view(np.asarray(values, dtype=np.float64), period)
+
+
+def _padded(values: np.ndarray, length: int) -> np.ndarray:
+    """``values`` right-aligned in an array of ``length``, NaN in front"""
+    out = np.full(length, np.nan)
+    if len(values):
+        out[length - len(values):] = values
+    return out
+
+
+class Indicator:
+    """Base class: an indicator of the close price"""
+
+    def update(self, value: float) -> Optional[float]:
+        raise NotImplementedError
+
+    def update_bar(self, bar) -> Optional[float]:
+        """Feed a bar ``(ts, open, high, low, close, volume)``"""
+        return self.update(bar[4])
+
+
+class SMA(Indicator):
+    """Simple moving average over ``period`` values"""
+
+    def __init__(self, period: int):
+        self.period = _check_period(period)
+        self._buffer = np.zeros(self.period)
+        self._count = 0
+        self._sum = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, value: float) -> Optional[float]:
+        i = self._count % self.period
+        self._sum += value - self._buffer[i]
+        self._buffer[i] = value
+        self._count += 1
+        if i == self.period - 1:
+            self._sum = math.fsum(self._buffer)  # once per wrap, amortized O(1)
+        if self._count >= self.period:
+            self.value = self._sum / self.period
+        return self.value
+
+    @staticmethod
+    def batch(values: np.ndarray, period: int) -> np.ndarray:
+        period = _check_period(period)
+        return _padded(_windows(values, period).mean(axis=1), len(values)) if len(values) >= period \
+            else np.full(len(values), np.nan)
+
+
+class EMA(Indicator):
+    """Exponential moving average, seeded with the SMA of the first ``period`` values"""
+
+    def __init__(self, period: int):
+        self.period = _check_period(period)
+        self.alpha = 2.0 / (self.period + 1)
+        self._seed = SMA(self.period)
+        self.value: Optional[float] = None
+
+    def update(self, value: float) -> Optional[float]:
+        if self.value is None:
+            self.value = self._seed.update(value)
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+    @staticmethod
+    def batch(values: np.ndarray, period: int) -> np.ndarray:
+        period = _check_period(period)
+        values = np.asarray(values, dtype=np.float64)
+        out = np.full(len(values), np.nan)
+        if len(values) < period:
+            return out
+        alpha = 2.0 / (period + 1)
+        ema = math.fsum(values[:period]) / period
+        out[period - 1] = ema
+        for i in range(period, len(values)):
+            ema += alpha * (values[i] - ema)
+            out[i] = ema
+        return out
+
+
+class RSI(Indicator):
+    """Relative strength index with Wilder's smoothing over ``period`` price changes"""
+
+    def __init__(self, period: int):
+        self.period = _check_period(period)
+        self._previous: Optional[float] = None
+        self._changes = 0
+        self._gain = 0.0
+        self._loss = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, value: float) -> Optional[float]:
+        previous, self._previous = self._previous, value
+        if previous is None:
+            return None
+        change = value - previous
+        gain, loss = (change, 0.0) if change > 0 else (0.0, -change)
+        self._changes += 1
+        if self._changes <= self.period:  # first averages are plain means
+            self._gain += gain
+            self._loss += loss
+            if self._changes < self.period:
+                return None
+            self._gain /= self.period
+            self._loss /= self.period
+        else:
+            self._gain = (self._gain * (self.period - 1) + gain) / self.period
+            self._loss = (self._loss * (self.period - 1) + loss) / self.period
+        self.value = _rsi(self._gain, self._loss)
+        return self.value
+
+    @staticmethod
+    def batch(values: np.ndarray, period: int) -> np.ndarray:
+        period = _check_period(period)
+        values = np.asarray(values, dtype=np.float64)
+        out = np.full(len(values), np.nan)
+        if len(values) <= period:
+            return out
+        changes = np.diff(values)
+        gains = np.where(changes > 0, changes, 0.0)
+        losses = np.where(changes > 0, 0.0, -changes)
+        gain = loss = 0.0
+        for i in range(period):  # summed in order, as update() does
+            gain += gains[i]
+            loss += losses[i]
+        gain /= period
+        loss /= period
+        out[period] = _rsi(gain, loss)
+        for i in range(period, len(changes)):
+            gain = (gain * (period - 1) + gains[i]) / period
+            loss = (loss * (period - 1) + losses[i]) / period
+            out[i + 1] = _rsi(gain, loss)
+        return out
+
+
+def _rsi(gain: float, loss: float) -> float:
+    if loss == 0:
+        return 100.0 if gain > 0 else 50.0
+    return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+class ATR(Indicator):
+    """Average true range with Wilder's smoothing; needs whole bars"""
+
+    def __init__(self, period: int):
+        self.period = _check_period(period)
+        self._close: Optional[float] = None
+        self._count = 0
+        self._sum = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, value: float) -> Optional[float]:
+        return self.update_hlc(value, value, value)
+
+    def update_bar(self, bar) -> Optional[float]:
+        return self.update_hlc(bar[2], bar[3], bar[4])
+
+    def update_hlc(self, high: float, low: float, close: float) -> Optional[float]:
+        previous, self._close = self._close, close
+        true_range = high - low if previous is None else \
+            max(high - low, abs(high - previous), abs(low - previous))
+        self._count += 1
+        if self._count < self.period:
+            self._sum += true_range
+            return None
+        if self._count == self.period:
+            self.value = (self._sum + true_range) / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + true_range) / self.period
+        return self.value
+
+    @staticmethod
+    def batch(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+        period = _check_period(period)
+        high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+        out = np.full(len(close), np.nan)
+        if len(close) < period:
+            return out
+        previous = np.concatenate(([np.nan], close[:-1]))
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+        atr = 0.0
+        for i in range(period - 1):  # summed in order, as update() does
+            atr += true_range[i]
+        atr = (atr + true_range[period - 1]) / period
+        out[period - 1] = atr
+        for i in range(period, len(close)):
+            atr = (atr * (period - 1) + true_range[i]) / period
+            out[i] = atr
+        return out
+
+
+class Bollinger(Indicator):
+    """Bollinger bands: (middle, upper, lower) at ``width`` population standard deviations"""
+
+    def __init__(self, period: int, width: float = 2.0):
+        self.period = _check_period(period)
+        self.width = width
+        self._buffer = np.zeros(self.period)
+        self._count = 0
+        self._shift = 0.0  # sums are kept relative to the first value, against cancellation
+        self._sum = 0.0
+        self._squares = 0.0
+        self.value: Optional[Tuple[float, float, float]] = None
+
+    def update(self, value: float) -> Optional[Tuple[float, float, float]]:
+        if self._count == 0:
+            self._shift = value
+        x = value - self._shift
+        i = self._count % self.period
+        old = self._buffer[i]
+        self._buffer[i] = x
+        self._sum += x - old
+        self._squares += x * x - old * old
+        self._count += 1
+        if i == self.period - 1:
+            self._sum = math.fsum(self._buffer)
+            self._squares = math.fsum(self._buffer * self._buffer)
+        if self._count >= self.period:
+            mean = self._sum / self.period
+            deviation = math.sqrt(max(self._squares / self.period - mean * mean, 0.0))
+            middle = mean + self._shift
+            self.value = (middle, middle + self.width * deviation, middle - self.width * deviation)
+        return self.value
+
+    @staticmethod
+    def batch(values: np.ndarray, period: int, width: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        period = _check_period(period)
+        if len(values) < period:
+            nan = np.full(len(values), np.nan)
+            return nan, nan.copy(), nan.copy()
+        windows = _windows(values, period)
+        middle = windows.mean(axis=1)
+        deviation = windows.std(axis=1)
+        return (_padded(middle, len(values)), _padded(middle + width * deviation, len(values)),
+                _padded(middle - width * deviation, len(values)))
+
+
+class RollingExtreme(Indicator):
+    """Lowest (or highest) value of the last ``period``, with a monotonic deque (amortized O(1))"""
+
+    def __init__(self, period: int, highest: bool = False):
+        self.period = _check_period(period)
+        self.highest = highest
+        self._window = deque()  # (index, value), values increasing (min) or decreasing (max)
+        self._count = 0
+        self.value: Optional[float] = None
+
+    def update(self, value: float) -> Optional[float]:
+        window = self._window
+        if self.highest:
+            while window and window[-1][1] <= value:
+                window.pop()
+        else:
+            while window and window[-1][1] >= value:
+                window.pop()
+        window.append((self._count, value))
+        if window[0][0] <= self._count - self.period:
+            window.popleft()
+        self._count += 1
+        if self._count >= self.period:
+            self.value = window[0][1]
+        return self.value
+
+    def update_bar(self, bar) -> Optional[float]:
+        return self.update(bar[2] if self.highest else bar[3])
+
+    @staticmethod
+    def batch(values: np.ndarray, period: int, highest: bool = False) -> np.ndarray:
+        period = _check_period(period)
+        if len(values) < period:
+            return np.full(len(values), np.nan)
+        windows = _windows(values, period)
+        return _padded(windows.max(axis=1) if highest else windows.min(axis=1), len(values))
+
+
+def make_indicator(kind: str, *parameters) -> Indicator:
+    """Indicator from a DEFAULT_INDICATORS style spec"""
+    if kind == 'sma':
+        return SMA(*parameters)
+    if kind == 'ema':
+        return EMA(*parameters)
+    if kind == 'rsi':
+        return RSI(*parameters)
+    if kind == 'atr':
+        return ATR(*parameters)
+    if kind == 'bollinger':
+        return Bollinger(*parameters)
+    if kind in ('min', 'max'):
+        return RollingExtreme(*parameters, highest=kind == 'max')
+    raise ValueError(f"Unknown indicator: {kind!r}")
+
+
+def batch_indicator(bars: np.ndarray, kind: str, *parameters):
+    """Values of an indicator over CANDLE_DTYPE bars, as ``IndicatorSet`` would give them bar by bar"""
+    if kind == 'sma':
+        return SMA.batch(bars['close'], *parameters)
+    if kind == 'ema':
+        return EMA.batch(bars['close'], *parameters)
+    if kind == 'rsi':
+        return RSI.batch(bars['close'], *parameters)
+    if kind == 'atr':
+        return ATR.batch(bars['high'], bars['low'], bars['close'], *parameters)
+    if kind == 'bollinger':
+        return Bollinger.batch(bars['close'], *parameters)
+    if kind == 'min':
+        return RollingExtreme.batch(bars['low'], *parameters)
+    if kind == 'max':
+        return RollingExtreme.batch(bars['high'], *parameters, highest=True)
+    raise ValueError(f"Unknown indicator: {kind!r}")
+
+
+class IndicatorSet:
+    """The indicators of one market and interval, updated together"""
+
+    def __init__(self, specs: Optional[Dict[str, Tuple]] = None):
+        self.specs = dict(DEFAULT_INDICATORS if specs is None else specs)
+        self._indicators = {name: make_indicator(*spec) for name, spec in self.specs.items()}
+        self.bar = None  # last bar fed
+        self.count = 0
+
+    def update(self, bar):
+        """Feed a finished bar ``(ts, open, high, low, close, volume)``"""
+        for indicator in self._indicators.values():
+            indicator.update_bar(bar)
+        self.bar = tuple(bar)
+        self.count += 1
+
+    def warm_up(self, bars: np.ndarray):
+        """Feed historical bars (CANDLE_DTYPE), oldest first"""
+        for bar in bars.tolist():
+            self.update(bar)
+
+    def get(self, name: str, default=None):
+        indicator = self._indicators.get(name)
+        return default if indicator is None or indicator.value is None else indicator.value
+
+    def __getitem__(self, name: str):
+        return self._indicators[name].value
+
+    def values(self) -> Dict:
+        return {name: indicator.value for name, indicator in self._indicators.items()}
+
+
+class IndicatorHub:
+    """One IndicatorSet per market, fed by the finished bars of a BarBuilder"""
+
+    def __init__(self, bar_builder, interval: str = '1m', specs: Optional[Dict[str, Tuple]] = None):
+        if interval not in bar_builder.intervals:
+            raise ValueError(f"Bar builder has no {interval!r} bars")
+        self.interval = interval
+        self.specs = dict(DEFAULT_INDICATORS if specs is None else specs)
+        self._sets: Dict[str, IndicatorSet] = {}
+        self._lock = threading.Lock()
+        bar_builder.subscribe(self.on_bar, interval=interval)
+
+    def on_bar(self, market: str, interval: str, bar):
+        with self._lock:
+            indicators = self._sets.get(market)
+            if indicators is None:
+                indicators = self._sets[market] = IndicatorSet(self.specs)
+            indicators.update(bar)
+
+    def get(self, market: str) -> Optional[IndicatorSet]:
+        """Indicators of a market such as 'BTC-EUR', None before its first bar"""
+        return self._sets.get(market)
+
+    def markets(self):
+        return sorted(self._sets)
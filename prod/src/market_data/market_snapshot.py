@@ -0,0 +1,106 @@
+"""Latest quotes per market, published by the monitor for the report scripts
+
+The monitor already fetches every market it trades each cycle; the report
+scripts used to fetch ``/ticker/price`` and ``/ticker/24h`` again on every run.
+After each cycle the monitor now writes its latest quotes to a small binary file
+(atomically replaced, so readers never see a half-written file) and the reports
+memory-map it, falling back to the exchange only when it is missing or stale.
+
+The monitor and the reports find the file through ``configured_path``:
+MARKET_SNAPSHOT_PATH from the bot config, relative to the prod directory, so it
+does not matter from which directory each of them is started.
+
+Layout: header (magic, publish time, record count) followed by fixed-width
+records (market, price, bid, ask, quote time). Missing prices are NaN.
+"""
+import math
+import mmap
+import os
+import struct
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+MAGIC = b'MKTSNAP1'
+HEADER = struct.Struct('<8sdI')
+RECORD = struct.Struct('<16sdddd')
+
+# prod/, where monitor.py and the report scripts live
+PROD_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_PATH = os.path.join(PROD_DIR, 'market_snapshot.bin')
+DEFAULT_MAX_AGE = 60.0
+
+Quote = Tuple[float, float, float, float]  # price, bid, ask, timestamp
+
+
+def _float(value) -> float:
+    try:
+        return float(value) if value not in (None, '') else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def collect(tickers: Optional[Iterable[Dict]], tickers_ts: float,
+            book_quotes: Optional[Dict[str, Tuple[float, float, float]]] = None) -> Dict[str, Quote]:
+    """Merge /ticker/24h rows with fresher depth-1 book quotes ({market: (bid, ask, ts)})"""
+    quotes: Dict[str, Quote] = {}
+    for ticker in tickers or ():
+        market = ticker.get('market')
+        if market:
+            quotes[market] = (_float(ticker.get('last')), _float(ticker.get('bid')),
+                              _float(ticker.get('ask')), tickers_ts)
+    for market, (bid, ask, ts) in (book_quotes or {}).items():
+        if market not in quotes or ts > quotes[market][3]:
+            quotes[market] = ((bid + ask) / 2, bid, ask, ts)
+    return quotes
+
+
+def configured_path(config) -> Optional[str]:
+    """MARKET_SNAPSHOT_PATH of the bot config (a relative path is taken from PROD_DIR); None when disabled"""
+    path = getattr(config, 'MARKET_SNAPSHOT_PATH', DEFAULT_PATH)
+    return os.path.join(PROD_DIR, path) if path else None
+
+
+def publish(path: str, quotes: Dict[str, Quote], ts: Optional[float] = None):
+    """Atomically replace the snapshot at ``path``"""
+    parts = [HEADER.pack(MAGIC, time.time() if ts is None else ts, len(quotes))]
+    for market, (price, bid, ask, quote_ts) in quotes.items():
+        parts.append(RECORD.pack(market.encode()[:16], price, bid, ask, quote_ts))
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(b''.join(parts))
+    os.replace(tmp, path)
+
+
+def read(path: str = DEFAULT_PATH, max_age: float = DEFAULT_MAX_AGE,
+         now: Optional[float] = None) -> Optional[Dict[str, Dict[str, Optional[float]]]]:
+    """{market: {'price', 'bid', 'ask'}} for quotes at most ``max_age`` seconds old
+
+    None when there is no usable snapshot (missing, damaged or published longer
+    than ``max_age`` ago), so callers know to ask the exchange instead.
+    """
+    now = time.time() if now is None else now
+    try:
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        if len(buffer) < HEADER.size:
+            return None
+        magic, published, count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or len(buffer) != HEADER.size + count * RECORD.size or now - published > max_age:
+            return None
+        market_data = {}
+        for market, price, bid, ask, quote_ts in RECORD.iter_unpack(buffer[HEADER.size:]):
+            if now - quote_ts > max_age:
+                continue
+            bid = None if math.isnan(bid) else bid
+            ask = None if math.isnan(ask) else ask
+            if math.isnan(price):
+                if bid is None or ask is None:
+                    continue
+                price = (bid + ask) / 2
+            market_data[market.rstrip(b'\0').decode()] = {'price': price, 'bid': bid, 'ask': ask}
+        return market_data
+    finally:
+        buffer.close()
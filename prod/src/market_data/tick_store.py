@@ -0,0 +1,194 @@
+"""Append-only columnar store for recorded top-of-book quotes
+
+Every market gets its own directory with one fixed-width binary file per column
+(timestamp, bid, ask, bid size, ask size). Columns are only ever appended to, so
+readers can memory-map them and hand out zero-copy NumPy views over a time range.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Column name -> dtype. The timestamp column is written LAST on every flush, so a
+# crash mid-flush leaves at most a few trailing values without a timestamp; the
+# reader only exposes rows that are present in every column.
+COLUMNS = (
+    ('bid', np.float64),
+    ('ask', np.float64),
+    ('bid_size', np.float64),
+    ('ask_size', np.float64),
+    ('ts', np.int64),
+)
+
+_MARKET_RE = re.compile(r'^[A-Z0-9]+-[A-Z0-9]+$')
+
+
+def time_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class TickView(NamedTuple):
+    """Zero-copy view over a slice of one market's ticks"""
+    ts: np.ndarray
+    bid: np.ndarray
+    ask: np.ndarray
+    bid_size: np.ndarray
+    ask_size: np.ndarray
+
+
+def _empty_view() -> TickView:
+    return TickView(**{column: np.empty(0, dtype=dtype) for column, dtype in COLUMNS})
+
+
+class TickStore:
+    """Per-market append-only tick files with memory-mapped readers
+
+    Writers buffer ticks in memory and append them in batches of ``flush_every``.
+    Ticks older than the last stored timestamp of a market are dropped, which keeps
+    every column sorted by time and makes range lookups a binary search.
+    """
+
+    def __init__(self, root: str, flush_every: int = 256):
+        self.root = root
+        self.flush_every = flush_every
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[tuple]] = defaultdict(list)
+        self._last_ts: Dict[str, int] = {}
+        self._maps: Dict[str, tuple] = {}
+
+    def _market_dir(self, market: str) -> str:
+        if not _MARKET_RE.match(market):
+            raise ValueError(f"Invalid market name: {market!r}")
+        return os.path.join(self.root, market)
+
+    def _column_path(self, market: str, column: str) -> str:
+        return os.path.join(self._market_dir(market), f'{column}.bin')
+
+    def _stored_rows(self, market: str) -> int:
+        """Number of complete rows on disk for a market"""
+        rows = None
+        for column, dtype in COLUMNS:
+            path = self._column_path(market, column)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            n = size // np.dtype(dtype).itemsize
+            rows = n if rows is None else min(rows, n)
+        return rows or 0
+
+    def _load_last_ts(self, market: str) -> int:
+        if market not in self._last_ts:
+            rows = self._stored_rows(market)
+            if rows:
+                ts = np.memmap(self._column_path(market, 'ts'), dtype=np.int64, mode='r', shape=(rows,))
+                self._last_ts[market] = int(ts[-1])
+                del ts
+            else:
+                self._last_ts[market] = -1
+        return self._last_ts[market]
+
+    # ------------------------------------------------------------------ writing
+
+    def append(self, market: str, ts: int, bid: float, ask: float,
+               bid_size: float = 0.0, ask_size: float = 0.0) -> bool:
+        """Buffer one quote. Returns False if the tick was out of order and dropped"""
+        with self._lock:
+            last = self._pending[market][-1][0] if self._pending[market] else self._load_last_ts(market)
+            if ts < last:
+                logger.debug(f"Dropping out-of-order tick for {market}: {ts} < {last}")
+                return False
+            self._pending[market].append((int(ts), float(bid), float(ask), float(bid_size), float(ask_size)))
+            if len(self._pending[market]) >= self.flush_every:
+                self._flush_market(market)
+        return True
+
+    def append_tickers(self, tickers: Iterable[Dict], ts: Optional[int] = None) -> int:
+        """Record a /ticker/24h or /ticker/book payload, returns the number of ticks stored"""
+        ts = ts if ts is not None else time_ms()
+        stored = 0
+        for ticker in tickers:
+            market = ticker.get('market')
+            bid = ticker.get('bid')
+            ask = ticker.get('ask')
+            if not market or not bid or not ask:
+                continue
+            try:
+                if self.append(market, ts, float(bid), float(ask),
+                               float(ticker.get('bidSize') or 0), float(ticker.get('askSize') or 0)):
+                    stored += 1
+            except ValueError as e:
+                logger.debug(f"Skipping ticker for {market}: {e}")
+        return stored
+
+    def _flush_market(self, market: str):
+        rows = self._pending.pop(market, None)
+        if not rows:
+            return
+        os.makedirs(self._market_dir(market), exist_ok=True)
+        # Truncate any torn tail left by a crash so every column starts aligned
+        stored = self._stored_rows(market)
+        data = list(zip(*rows))
+        for column, dtype in COLUMNS:
+            path = self._column_path(market, column)
+            values = np.asarray(data[TickView._fields.index(column)], dtype=dtype)
+            with open(path, 'ab') as f:
+                expected = stored * np.dtype(dtype).itemsize
+                if f.tell() != expected:
+                    f.truncate(expected)
+                    f.seek(expected)
+                f.write(values.tobytes())
+        self._last_ts[market] = rows[-1][0]
+
+    def flush(self):
+        """Write all buffered ticks to disk"""
+        with self._lock:
+            for market in list(self._pending):
+                self._flush_market(market)
+
+    def pending(self) -> int:
+        """Number of buffered ticks not yet written"""
+        with self._lock:
+            return sum(len(rows) for rows in self._pending.values())
+
+    def close(self):
+        self.flush()
+        self._maps.clear()
+
+    # ------------------------------------------------------------------ reading
+
+    def markets(self) -> List[str]:
+        """Markets that have ticks on disk"""
+        return sorted(name for name in os.listdir(self.root)
+                      if _MARKET_RE.match(name) and os.path.isdir(os.path.join(self.root, name)))
+
+    def _columns(self, market: str) -> Optional[tuple]:
+        """Memory-mapped columns, re-mapped only when the files have grown"""
+        rows = self._stored_rows(market)
+        cached = self._maps.get(market)
+        if cached is not None and cached[0] == rows:
+            return cached[1]
+        if rows == 0:
+            return None
+        columns = {column: np.memmap(self._column_path(market, column), dtype=dtype, mode='r', shape=(rows,))
+                   for column, dtype in COLUMNS}
+        view = TickView(**columns)
+        self._maps[market] = (rows, view)
+        return view
+
+    def read(self, market: str, start: Optional[int] = None, end: Optional[int] = None) -> TickView:
+        """Ticks with ``start <= ts < end`` as views on the mapped files (no copy)"""
+        columns = self._columns(market)
+        if columns is None:
+            return _empty_view()
+        lo = 0 if start is None else int(np.searchsorted(columns.ts, start, side='left'))
+        hi = len(columns.ts) if end is None else int(np.searchsorted(columns.ts, end, side='left'))
+        return TickView(*(column[lo:hi] for column in columns))
+
+    def count(self, market: str) -> int:
+        return self._stored_rows(market)
@@ -0,0 +1,150 @@
+"""Per-market ladder of rungs (coins) around the market price, for the reports
+
+A market can have thousands of rungs. Instead of classifying every rung and
+sorting them again on each report, a ``MarketLadder`` keeps them sorted once by
+matrix price and by trigger price, and answers with ``bisect`` around the
+market price:
+
+    hot   watching: price <= buy trigger      in position: price >= sell trigger
+    warm  watching: buy trigger < price < matrix
+          in position: matrix < price < sell trigger
+    cold  everything else
+
+Hot rungs are a contiguous range of the trigger-sorted lists. Warm rungs lie in
+a window of at most the largest gain next to the price, so only that window is
+checked one by one. The nearest rungs are found by walking outwards from the
+market price in the matrix-sorted list.
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Callable, Dict, Generic, Iterable, List, Tuple, TypeVar
+
+T = TypeVar('T')
+
+# (matrix, gain, in position) of a rung
+Fields = Tuple[float, float, bool]
+
+
+def temperature(position: bool, matrix: float, gain: float, price: float) -> str:
+    """'hot', 'warm' or 'cold' for one rung at ``price``"""
+    if not position:
+        buy_trigger = matrix * (1 - gain)
+        if price <= buy_trigger:
+            return 'hot'
+        return 'warm' if buy_trigger < price < matrix else 'cold'
+    sell_trigger = matrix * (1 + gain)
+    if price >= sell_trigger:
+        return 'hot'
+    return 'warm' if matrix < price < sell_trigger else 'cold'
+
+
+def row_fields(row: Dict) -> Fields:
+    """Fields of a report row as selected from the coins table (matrix, gain, position 'Y'/'N')"""
+    return row['matrix'], row['gain'], row['position'] == 'Y'
+
+
+class MarketLadder(Generic[T]):
+    """The rungs of one market, sorted by matrix and by trigger price"""
+
+    def __init__(self, rungs: Iterable[T], fields: Callable[[T], Fields] = row_fields):
+        entries = sorted(((*fields(rung), rung) for rung in rungs), key=lambda entry: entry[0])
+        self.rungs: List[T] = [entry[3] for entry in entries]
+        self.matrices: List[float] = [entry[0] for entry in entries]
+        self._gains = [entry[1] for entry in entries]
+        self._positions = [entry[2] for entry in entries]
+        self.max_gain = max(self._gains, default=0.0)
+
+        buying = sorted((matrix * (1 - gain), i) for i, (matrix, gain, position, _) in enumerate(entries)
+                        if not position)
+        selling = sorted((matrix * (1 + gain), i) for i, (matrix, gain, position, _) in enumerate(entries)
+                         if position)
+        self._buy_triggers = [trigger for trigger, _ in buying]
+        self._buying = [i for _, i in buying]
+        self._sell_triggers = [trigger for trigger, _ in selling]
+        self._selling = [i for _, i in selling]
+        # Indexes into self.rungs per side, in matrix order
+        self._side = {False: sorted(self._buying), True: sorted(self._selling)}
+
+    def __len__(self) -> int:
+        return len(self.rungs)
+
+    def _temperature(self, i: int, price: float) -> str:
+        return temperature(self._positions[i], self.matrices[i], self._gains[i], price)
+
+    def _hot_buying(self, price: float) -> List[int]:
+        return self._buying[bisect_left(self._buy_triggers, price):]
+
+    def _hot_selling(self, price: float) -> List[int]:
+        return self._selling[:bisect_right(self._sell_triggers, price)]
+
+    def _hot_indexes(self, price: float) -> List[int]:
+        return sorted(self._hot_buying(price) + self._hot_selling(price))
+
+    def hot(self, price: float) -> List[T]:
+        """Rungs past their trigger, by matrix price"""
+        return [self.rungs[i] for i in self._hot_indexes(price)]
+
+    def warm(self, price: float) -> List[T]:
+        """Rungs between their matrix and trigger, by matrix price"""
+        # matrix > price (watching) implies buy trigger > price * (1 - max_gain), and
+        # matrix < price (in position) implies sell trigger < price * (1 + max_gain)
+        buy_from = bisect_left(self._buy_triggers, price * (1 - self.max_gain))
+        buy_to = bisect_left(self._buy_triggers, price)
+        sell_from = bisect_right(self._sell_triggers, price)
+        sell_to = bisect_right(self._sell_triggers, price * (1 + self.max_gain))
+        candidates = self._buying[buy_from:buy_to] + self._selling[sell_from:sell_to]
+        return [self.rungs[i] for i in sorted(candidates) if self._temperature(i, price) == 'warm']
+
+    def nearest(self, price: float, limit: int) -> Tuple[List[T], List[T]]:
+        """(below, above) the price: all hot rungs plus the ``limit`` closest others on each side
+
+        Below means matrix <= price. Both lists are sorted by matrix price, so the
+        market price sits between them.
+        """
+        split = bisect_right(self.matrices, price)
+        hot = self._hot_indexes(price)
+        below = [i for i in hot if i < split]
+        above = [i for i in hot if i >= split]
+
+        below += self._others(range(split - 1, -1, -1), price, limit)
+        above += self._others(range(split, len(self.rungs)), price, limit)
+        return [self.rungs[i] for i in sorted(below)], [self.rungs[i] for i in sorted(above)]
+
+    def side(self, position: bool, price: float, limit: int) -> List[T]:
+        """Hot rungs plus the first ``limit`` others of one side, by matrix price
+
+        The others are the lowest rungs in position and the highest watching ones,
+        as listed by the Discord report.
+        """
+        indexes = self._side[position]
+        hot = self._hot_selling(price) if position else self._hot_buying(price)
+        others = self._others(indexes if position else reversed(indexes), price, limit)
+        return [self.rungs[i] for i in sorted(hot + others)]
+
+    def _others(self, order: Iterable[int], price: float, limit: int) -> List[int]:
+        """The first ``limit`` rungs in ``order`` that are not hot"""
+        others = []
+        for i in order:
+            if len(others) >= limit:
+                break
+            if self._temperature(i, price) != 'hot':
+                others.append(i)
+        return others
+
+    def counts(self, price: float) -> Dict[str, int]:
+        """Number of hot and warm rungs and rungs per side"""
+        return {
+            'hot': len(self._hot_buying(price)) + len(self._hot_selling(price)),
+            'warm': len(self.warm(price)),
+            'in_position': len(self._selling),
+            'watching': len(self._buying),
+        }
+
+
+def build_ladders(rungs: Iterable[T], market: Callable[[T], str],
+                  fields: Callable[[T], Fields] = row_fields) -> Dict[str, MarketLadder[T]]:
+    """One MarketLadder per market"""
+    by_market: Dict[str, List[T]] = defaultdict(list)
+    for rung in rungs:
+        by_market[market(rung)].append(rung)
+    return {name: MarketLadder(market_rungs, fields) for name, market_rungs in by_market.items()}
@@ -0,0 +1,280 @@
+"""Compact portfolio report for Discord, rendered per crypto
+
+``portfolio_discord_report.py`` builds the report from the database on every
+run. The monitor instead keeps an ``IncrementalReport`` up to date from what it
+already knows: buys and sells, signal changes and the quotes fetched each cycle.
+Only the sections of cryptos with an event or a new price are rendered again,
+and the report is posted only when it changed since the last post (price moves
+count once they exceed ``price_tolerance``), at most every ``min_interval``
+seconds and at least every ``heartbeat`` seconds.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from reporting.ladder_view import MarketLadder
+
+logger = logging.getLogger(__name__)
+
+# Hot coins plus this many normal ones per side
+SHOW_NORMAL = 3
+
+
+def format_price(price):
+    """Format prijs consistent"""
+    if price >= 1000:
+        return f"{price:,.2f}"
+    elif price >= 1:
+        return f"{price:.4f}"
+    else:
+        return f"{price:.8f}"
+
+
+def get_coin_status(coin, market_price):
+    """Bepaal coin status: hot, signal, of normal
+
+    Returns:
+        tuple: (status, trigger_price)
+        status: 'hot' = trigger bereikt en trailing actief
+                'signal' = buy/sell signal actief
+                'normal' = geen actief signal
+    """
+    matrix = coin['matrix']
+    gain = coin['gain']
+
+    if coin['position'] == 'Y':  # In bezit - wil verkopen
+        sell_trigger = matrix * (1 + gain)
+        if market_price >= sell_trigger:
+            return 'hot', sell_trigger
+        else:
+            return 'normal', sell_trigger
+    else:  # Watching - wil kopen
+        buy_trigger = matrix * (1 - gain)
+        if market_price <= buy_trigger:
+            return 'hot', buy_trigger
+        else:
+            return 'normal', buy_trigger
+
+
+def render_crypto(crypto: str, market_price: float, ladder: MarketLadder,
+                  tx_buy: int = 0, tx_sell: int = 0) -> Tuple[str, Dict]:
+    """Section text for one crypto and its statistics
+
+    ``stats['key']`` identifies what the section shows apart from the market
+    price, so callers can tell a changed report from a moved price.
+    """
+    bezit_show = ladder.side(True, market_price, SHOW_NORMAL)
+    koop_show = ladder.side(False, market_price, SHOW_NORMAL)
+    for coin in bezit_show + koop_show:
+        coin['status'], coin['trigger_price'] = get_coin_status(coin, market_price)
+    counts = ladder.counts(market_price)
+    hot = counts['hot']
+
+    text = ""
+    # BOVEN: [B] coins (in bezit, wil verkopen) - ALTIJD boven API prijs
+    if bezit_show:
+        text += "^ " + " | ".join(
+            f"[B!] {format_price(coin['matrix'])}" if coin['status'] == 'hot' else f"[B] {format_price(coin['matrix'])}"
+            for coin in bezit_show) + "\n"
+
+    # MIDDEN: Crypto info lijn met API prijs
+    emoji = "!" if hot > 0 else "-"
+    text += f"{emoji} {crypto} {format_price(market_price)} | Bezit:{counts['in_position']} | Watch:{counts['watching']}"
+    if hot > 0:
+        text += f" | HOT:{hot}"
+    text += "\n"
+
+    # ONDER: [K] coins (wil kopen) - ALTIJD onder API prijs, hoogste eerst
+    if koop_show:
+        text += "v " + " | ".join(
+            f"[K!] {format_price(coin['matrix'])}" if coin['status'] == 'hot' else f"[K] {format_price(coin['matrix'])}"
+            for coin in reversed(koop_show)) + "\n"
+
+    # Transacties laatste uur
+    if tx_buy > 0 or tx_sell > 0:
+        text += f"Tx: {tx_buy} buy, {tx_sell} sell\n"
+    text += "\n"
+
+    stats = {
+        'hot': hot,
+        'bezit': counts['in_position'],
+        'watching': counts['watching'],
+        'key': (tuple((coin['matrix'], coin['position'], coin['status']) for coin in bezit_show + koop_show),
+                hot, counts['in_position'], counts['watching'], tx_buy, tx_sell),
+    }
+    return text, stats
+
+
+def build_message(sections: Iterable[Tuple[str, Dict]], tx_total: int, health_text: str, health_color: int,
+                  now: Optional[datetime] = None) -> Dict:
+    """Discord webhook payload from the rendered crypto sections"""
+    sections = list(sections)
+    now = now or datetime.now()
+    total_bezit = sum(stats['bezit'] for _, stats in sections)
+    total_watching = sum(stats['watching'] for _, stats in sections)
+    total_hot = sum(stats['hot'] for _, stats in sections)
+
+    summary = f"Totaal: {total_bezit + total_watching} coins\n"
+    summary += f"In bezit: {total_bezit}\n"
+    summary += f"Watching: {total_watching}\n"
+    summary += f"Hot: {total_hot}\n"
+    summary += f"Transacties laatste uur: {tx_total}"
+
+    crypto_text = "".join(text for text, _ in sections)
+    return {
+        "username": "Trading Bot",
+        "embeds": [{
+            "title": "Portfolio Overzicht",
+            "description": summary,
+            "color": health_color,
+            "fields": [{
+                "name": "Per Crypto",
+                "value": crypto_text[:1024] if crypto_text else "Geen data",
+                "inline": False
+            }],
+            "timestamp": now.isoformat(),
+            "footer": {
+                "text": f"{health_text} | {now.strftime('%d-%m-%Y %H:%M')}"
+            }
+        }]
+    }
+
+
+def post_message(webhook: str, data: Dict) -> bool:
+    import requests  # loaded on demand, as in the report scripts
+    try:
+        response = requests.post(webhook, json=data, timeout=10)
+        response.raise_for_status()
+        return True
+    except Exception as e:
+        logger.warning(f"Discord rapport gefaald: {e}")
+        return False
+
+
+def coin_row(coin) -> Dict:
+    """Report row for a monitor Coin, with the columns portfolio_discord_report.py selects"""
+    return {'id': coin.coin_id, 'base_currency': coin.base_currency, 'matrix': coin.current_price,
+            'position': 'Y' if coin.position else 'N', 'gain': coin.gain, 'trail': coin.trail,
+            'temp_low': coin.low, 'temp_high': coin.high}
+
+
+class IncrementalReport:
+    """The Discord portfolio report, maintained by the monitor between posts"""
+
+    HEALTH = ("Bot actief", 3066993)
+
+    def __init__(self, webhook: str, min_interval: float = 60.0, heartbeat: float = 3600.0,
+                 price_tolerance: float = 0.01, tx_window: float = 3600.0,
+                 post: Callable[[str, Dict], bool] = post_message):
+        self.webhook = webhook
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+        self.price_tolerance = price_tolerance
+        self.tx_window = tx_window
+        self._post = post
+        self._coins: Dict[str, List] = {}             # crypto -> Coin objects
+        self._coin_ids: Tuple[int, ...] = ()           # id() of every coin, to notice (de)activated rungs
+        self._ladders: Dict[str, MarketLadder] = {}
+        self._prices: Dict[str, float] = {}            # crypto -> price of the current section
+        self._sections: Dict[str, Tuple[str, Dict]] = {}
+        self._dirty = set()
+        self._transactions = deque()                   # (time, crypto, side)
+        self._tx_counts: Dict[str, Dict[str, int]] = {}
+        self._posted_keys: Optional[Dict] = None
+        self._posted_prices: Dict[str, float] = {}
+        self._posted_at = 0.0
+        self._posting = threading.Lock()
+
+    def on_order(self, event):
+        """OrderEvent subscriber (services/event_bus.py)"""
+        self._add_transaction(event.market.split('-')[0], event.side, event.ts)
+
+    def on_signal(self, event):
+        """SignalEvent subscriber (services/event_bus.py)"""
+        self._dirty.add(event.market.split('-')[0])
+
+    def _add_transaction(self, crypto: str, side: str, ts: float):
+        self._transactions.append((ts, crypto, side))
+        counts = self._tx_counts.setdefault(crypto, {'buy': 0, 'sell': 0})
+        counts[side] += 1
+        self._dirty.add(crypto)
+
+    def _expire_transactions(self, now: float):
+        while self._transactions and self._transactions[0][0] < now - self.tx_window:
+            _, crypto, side = self._transactions.popleft()
+            self._tx_counts[crypto][side] -= 1
+            self._dirty.add(crypto)
+
+    def update(self, coins: Iterable, quotes: Dict[str, Tuple[float, float, float, float]],
+               now: Optional[float] = None):
+        """Render the sections whose crypto had an event or a new price this cycle"""
+        now = time.time() if now is None else now
+        coins = list(coins)
+        coin_ids = tuple(map(id, coins))
+        if coin_ids != self._coin_ids:  # first update, or ladder rungs (de)activated
+            # A rung retired and another activated in the same cycle leave the count unchanged
+            old = set(self._coins)
+            self._coins = {}
+            for coin in coins:
+                self._coins.setdefault(coin.base_currency, []).append(coin)
+            self._coin_ids = coin_ids
+            self._dirty.update(self._coins)
+            for crypto in old - set(self._coins):
+                self._ladders.pop(crypto, None)
+                self._sections.pop(crypto, None)
+                self._prices.pop(crypto, None)
+        self._expire_transactions(now)
+
+        for crypto, crypto_coins in self._coins.items():
+            quote = quotes.get(f"{crypto}-EUR")
+            price = quote[0] if quote else self._prices.get(crypto)
+            if not price or price != price:  # no quote yet, or NaN
+                continue
+            dirty = crypto in self._dirty or crypto not in self._ladders
+            if not dirty and price == self._prices.get(crypto):
+                continue
+            if dirty:
+                self._ladders[crypto] = MarketLadder([coin_row(coin) for coin in crypto_coins])
+                self._dirty.discard(crypto)
+            tx = self._tx_counts.get(crypto, {'buy': 0, 'sell': 0})
+            self._sections[crypto] = render_crypto(crypto, price, self._ladders[crypto], tx['buy'], tx['sell'])
+            self._prices[crypto] = price
+
+    def _changed(self) -> bool:
+        keys = {crypto: stats['key'] for crypto, (_, stats) in self._sections.items()}
+        if keys != self._posted_keys:
+            return True
+        return any(abs(price / self._posted_prices[crypto] - 1) > self.price_tolerance
+                   for crypto, price in self._prices.items() if self._posted_prices.get(crypto))
+
+    def message(self, now: Optional[datetime] = None) -> Dict:
+        sections = [self._sections[crypto] for crypto in sorted(self._sections)]
+        return build_message(sections, len(self._transactions), *self.HEALTH, now=now)
+
+    def maybe_post(self, now: Optional[float] = None) -> bool:
+        """Post the report in the background if it changed (or the heartbeat is due)"""
+        now = time.time() if now is None else now
+        if not self._sections or now - self._posted_at < self.min_interval:
+            return False
+        if not self._changed() and now - self._posted_at < self.heartbeat:
+            return False
+        if not self._posting.acquire(blocking=False):
+            return False  # previous post still in flight
+        data = self.message(datetime.fromtimestamp(now))
+        keys = {crypto: stats['key'] for crypto, (_, stats) in self._sections.items()}
+        threading.Thread(target=self._send, args=(data, keys, dict(self._prices), now),
+                         name='discord-report', daemon=True).start()
+        return True
+
+    def _send(self, data: Dict, keys: Dict, prices: Dict[str, float], now: float):
+        """Post ``data``; only a successful post counts as posted, so a failed one is retried"""
+        try:
+            if self._post(self.webhook, data):
+                self._posted_keys = keys
+                self._posted_prices = prices
+                self._posted_at = now
+        finally:
+            self._posting.release()
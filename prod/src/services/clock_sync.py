@@ -0,0 +1,95 @@
+"""Offset between the local clock and Bitvavo's, for signed requests
+
+Signed requests carry a timestamp that Bitvavo rejects when it is more than
+ACCESSWINDOW off its own clock. ``ClockSync`` samples the exchange's ``/time``
+in the background. Each sample gives an offset (server time minus the midpoint
+of the request) and a round-trip time. A slow round trip makes the midpoint
+uncertain, so only the fastest half of the recent samples is used, and the
+offset is their median. Signed requests are timestamped with ``now_ms()``,
+i.e. local time plus that offset.
+
+The offset is exported as ``bot_clock_offset_seconds``. ``in_sync()`` is false
+while the offset exceeds ``max_skew_ms``: a clock that far off is more likely
+to jump again than to be corrected, and the bot does not place orders then.
+"""
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional, Tuple
+
+from services.metrics import CLOCK_OFFSET, CLOCK_RTT
+
+logger = logging.getLogger(__name__)
+
+
+class ClockSync:
+    """Estimates the exchange clock offset from periodic /time samples"""
+
+    def __init__(self, fetch_time: Callable[[], int], interval: float = 60.0, samples: int = 8,
+                 max_skew_ms: float = 5000.0, clock: Callable[[], float] = time.time):
+        self.fetch_time = fetch_time  # server time in milliseconds
+        self.interval = interval
+        self.max_skew_ms = max_skew_ms
+        self.clock = clock
+        self._samples = deque(maxlen=samples)  # (offset_ms, rtt_ms)
+        self.offset_ms = 0.0
+        self.rtt_ms: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self) -> Tuple[float, float]:
+        """Take one /time sample and update the estimate; returns (offset_ms, rtt_ms) of the sample"""
+        sent = self.clock() * 1000
+        server = self.fetch_time()
+        received = self.clock() * 1000
+        rtt = received - sent
+        offset = server - (sent + received) / 2
+        self._samples.append((offset, rtt))
+        self._estimate()
+        return offset, rtt
+
+    def _estimate(self):
+        fastest = sorted(self._samples, key=lambda sample: sample[1])[:max(1, (len(self._samples) + 1) // 2)]
+        self.offset_ms = statistics.median(offset for offset, _ in fastest)
+        self.rtt_ms = fastest[0][1]
+        CLOCK_OFFSET.set(self.offset_ms / 1000)
+        CLOCK_RTT.set(self.rtt_ms / 1000)
+
+    def now_ms(self) -> int:
+        """Exchange time in milliseconds, for request signatures"""
+        return int(self.clock() * 1000 + self.offset_ms)
+
+    def in_sync(self) -> bool:
+        """False while the estimated skew exceeds ``max_skew_ms``"""
+        return abs(self.offset_ms) <= self.max_skew_ms
+
+    def start(self, burst: int = 4) -> 'ClockSync':
+        """Take ``burst`` samples now, then one every ``interval`` seconds in the background"""
+        for _ in range(burst):
+            self._try_sample()
+        self._thread = threading.Thread(target=self._run, name='clock-sync', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._try_sample()
+
+    def _try_sample(self):
+        was_in_sync = self.in_sync()
+        try:
+            self.sample()
+        except Exception as e:
+            logger.warning(f"Clock sync with exchange failed: {e}")
+            return
+        if self.in_sync() != was_in_sync:
+            if was_in_sync:
+                logger.error(f"Clock is {self.offset_ms:.0f} ms off the exchange (bound {self.max_skew_ms:.0f} ms); "
+                             f"no orders until it is back in sync")
+            else:
+                logger.info(f"Clock back in sync with the exchange ({self.offset_ms:.0f} ms)")
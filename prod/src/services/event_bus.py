@@ -0,0 +1,221 @@
+"""In-process event bus with typed events and pre-resolved topics
+
+Events are frozen dataclasses, so a subscriber can keep one without copying it
+and cannot change what the next subscriber sees. A topic is one event type,
+optionally narrowed to a key such as a market. Publishers resolve their
+``Topic`` once and publish to it directly: no topic strings are built or
+looked up per event; for per-market topics ``EventBus.topics`` gives a map that
+resolves each market's handle once. Subscribers of the unkeyed topic of a type
+receive the events of every key.
+
+Delivery is synchronous by default: the callback runs in the publisher's
+thread. A queued subscriber gets its own bounded queue and thread. When that
+queue is full, new events are dropped rather than stalling the trading loop.
+Each subscriber's delivered, dropped and failed events and its delivery latency
+are exported as metrics (``bot_event_*``). For queued subscribers the latency
+includes the time spent in the queue.
+"""
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Optional, Tuple, Type
+
+from services.metrics import EVENT_ERRORS, EVENT_LATENCY, EVENTS_DELIVERED, EVENTS_DROPPED, QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------- events
+
+@dataclass(frozen=True, slots=True)
+class QuoteEvent:
+    """Latest price of a market, as collected at the end of a cycle"""
+    market: str
+    price: float
+    bid: float
+    ask: float
+    ts: float
+
+
+@dataclass(frozen=True, slots=True)
+class BarEvent:
+    """A finished OHLCV bar (timestamps in milliseconds)"""
+    market: str
+    interval: str
+    ts: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+@dataclass(frozen=True, slots=True)
+class SignalEvent:
+    """Buy or sell signal of a rung switched on or off"""
+    market: str
+    coin_id: Optional[int]
+    matrix: float
+    buy_signal: bool
+    sell_signal: bool
+    ts: float
+
+
+@dataclass(frozen=True, slots=True)
+class OrderEvent:
+    """A rung bought or sold"""
+    market: str
+    coin_id: Optional[int]
+    side: str
+    price: float
+    amount: float
+    matrix: float
+    ts: float
+
+
+# ---------------------------------------------------------------------- bus
+
+class Subscription:
+    """One callback on a topic, with its delivery metrics"""
+
+    def __init__(self, topic: 'Topic', callback: Callable, name: str, queued: bool = False, maxsize: int = 1024):
+        self.topic = topic
+        self.callback = callback
+        self.name = name
+        self.delivered = EVENTS_DELIVERED.labels(subscriber=name)
+        self.dropped = EVENTS_DROPPED.labels(subscriber=name)
+        self.errors = EVENT_ERRORS.labels(subscriber=name)
+        self.latency = EVENT_LATENCY.labels(subscriber=name)
+        self._queue: Optional[queue.Queue] = None
+        if queued:
+            self._queue = queue.Queue(maxsize)
+            QUEUE_DEPTH.labels(queue=f'events_{name}').set_function(self.pending)
+            threading.Thread(target=self._drain, name=f'events-{name}', daemon=True).start()
+
+    def deliver(self, event, published: float):
+        if self._queue is None:
+            self._call(event, published)
+            return
+        try:
+            self._queue.put_nowait((event, published))
+        except queue.Full:
+            self.dropped.inc()
+
+    def _call(self, event, published: float):
+        try:
+            self.callback(event)
+        except Exception as e:
+            self.errors.inc()
+            logger.warning(f"Event subscriber {self.name} failed on {type(event).__name__}: {e}")
+            return
+        self.delivered.inc()
+        self.latency.observe(time.perf_counter() - published)
+
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            self._call(*item)
+            self._queue.task_done()
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def cancel(self):
+        """Stop delivering to this subscriber"""
+        self.topic._remove(self)
+        if self._queue is not None:
+            self._queue.put(None)
+
+    def join(self, timeout: float = 5.0):
+        """Wait until a queued subscriber has handled everything queued so far"""
+        if self._queue is None:
+            return
+        with self._queue.all_tasks_done:
+            self._queue.all_tasks_done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+
+
+class Topic:
+    """Handle for publishing one event type (and key); resolve it once with EventBus.topic"""
+
+    __slots__ = ('event_type', 'key', 'parent', '_subscribers', '_lock')
+
+    def __init__(self, event_type: Type, key: Hashable = None, parent: Optional['Topic'] = None):
+        self.event_type = event_type
+        self.key = key
+        self.parent = parent
+        self._subscribers: Tuple[Subscription, ...] = ()  # replaced, never mutated, so publish needs no lock
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        if type(event) is not self.event_type:
+            raise TypeError(f"Topic {self.event_type.__name__} cannot carry {type(event).__name__}")
+        published = time.perf_counter()
+        for subscription in self._subscribers:
+            subscription.deliver(event, published)
+        if self.parent is not None:
+            for subscription in self.parent._subscribers:
+                subscription.deliver(event, published)
+
+    def subscribe(self, callback: Callable, name: Optional[str] = None, queued: bool = False,
+                  maxsize: int = 1024) -> Subscription:
+        """Call ``callback(event)`` for every event published here (and for every key, on an unkeyed topic)"""
+        name = name or getattr(callback, '__qualname__', repr(callback))
+        subscription = Subscription(self, callback, name, queued, maxsize)
+        with self._lock:
+            self._subscribers += (subscription,)
+        return subscription
+
+    def _remove(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+
+    def __repr__(self):
+        key = '' if self.key is None else f'[{self.key!r}]'
+        return f'<Topic {self.event_type.__name__}{key}: {len(self._subscribers)} subscribers>'
+
+
+class TopicMap(dict):
+    """Topics of one event type by key, each resolved on first use; ``topics[market].publish(event)``"""
+
+    def __init__(self, bus: 'EventBus', event_type: Type):
+        super().__init__()
+        self.bus = bus
+        self.event_type = event_type
+
+    def __missing__(self, key: Hashable) -> Topic:
+        topic = self[key] = self.bus.topic(self.event_type, key)
+        return topic
+
+
+class EventBus:
+    """Registry of topics; ``topic`` returns the same handle for the same type and key"""
+
+    def __init__(self):
+        self._topics: Dict[Tuple[Type, Hashable], Topic] = {}
+        self._lock = threading.Lock()
+
+    def topic(self, event_type: Type, key: Hashable = None) -> Topic:
+        topic = self._topics.get((event_type, key))
+        if topic is not None:
+            return topic
+        parent = self.topic(event_type) if key is not None else None
+        with self._lock:
+            return self._topics.setdefault((event_type, key), Topic(event_type, key, parent))
+
+    def topics(self, event_type: Type) -> TopicMap:
+        """Per-key handles for ``event_type``, for publishers that publish to many keys"""
+        return TopicMap(self, event_type)
+
+    def publish(self, event, key: Hashable = None):
+        """Publish without a resolved handle (one dict lookup per event)"""
+        self.topic(type(event), key).publish(event)
+
+    def subscribe(self, event_type: Type, callback: Callable, key: Hashable = None, **kwargs) -> Subscription:
+        return self.topic(event_type, key).subscribe(callback, **kwargs)
+
+    def subscriptions(self):
+        return [subscription for topic in list(self._topics.values()) for subscription in topic._subscribers]
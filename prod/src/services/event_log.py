@@ -0,0 +1,166 @@
+"""Structured, lazily formatted event logging
+
+Hot-path code logs named events with keyword fields instead of pre-built
+f-strings:
+
+    events.emit('temp_high', market=pair, coin_id=coin_id, old=old, new=bid, diff=bid - old)
+
+Each event has its own level (overridable per event with ``set_event_levels``)
+and ``emit`` returns before doing any work when that level is disabled. When it
+is enabled, the message template is only formatted by the handler that writes
+it, which with ``setup_async_logging`` happens on the QueueListener thread rather
+than in the trading loop. JsonLinesFormatter writes the same events with their
+raw fields as one JSON object per line for analysis.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+_level_overrides: Dict[str, int] = {}
+_event_loggers: List['EventLogger'] = []
+
+
+class _Overhead:
+    """Time spent inside emit() since the last take(), for per-cycle measurement"""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.events = 0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.seconds += seconds
+            self.events += 1
+
+    def take(self) -> Tuple[float, int]:
+        with self._lock:
+            result = (self.seconds, self.events)
+            self.seconds, self.events = 0.0, 0
+        return result
+
+
+overhead = _Overhead()
+
+
+class _Event:
+    """Log message that formats its template only when str() is called"""
+
+    __slots__ = ('name', 'template', 'fields')
+
+    def __init__(self, name: str, template: str, fields: Dict):
+        self.name = name
+        self.template = template
+        self.fields = fields
+
+    def __str__(self) -> str:
+        try:
+            return self.template.format(**self.fields)
+        except (KeyError, ValueError, TypeError) as e:
+            return f'{self.name} {self.fields} (template error: {e})'
+
+
+def _to_level(level: Union[int, str]) -> int:
+    return level if isinstance(level, int) else logging.getLevelName(level.upper())
+
+
+class EventLogger:
+    """Named events with a level and message template each, logged through ``logger``"""
+
+    def __init__(self, logger: logging.Logger, events: Mapping[str, Tuple[int, str]]):
+        self.logger = logger
+        self.defaults = {name: level for name, (level, _) in events.items()}
+        self.templates = {name: template for name, (_, template) in events.items()}
+        self.levels = {name: _level_overrides.get(name, level) for name, level in self.defaults.items()}
+        _event_loggers.append(self)
+
+    def enabled(self, name: str) -> bool:
+        """True when ``name`` would be logged; use it to skip computing expensive fields"""
+        return self.logger.isEnabledFor(self.levels[name])
+
+    def emit(self, name: str, **fields):
+        level = self.levels[name]
+        if not self.logger.isEnabledFor(level):
+            return
+        start = time.perf_counter()
+        self.logger.log(level, _Event(name, self.templates[name], fields),
+                        extra={'event': name, 'fields': fields}, stacklevel=2)
+        overhead.add(time.perf_counter() - start)
+
+
+def set_event_levels(levels: Mapping[str, Union[int, str]]):
+    """Override the level of individual events, e.g. {'skip_buy': 'DEBUG'}"""
+    for name, level in levels.items():
+        _level_overrides[name] = _to_level(level)
+    for event_logger in _event_loggers:
+        for name in event_logger.levels:
+            event_logger.levels[name] = _level_overrides.get(name, event_logger.defaults[name])
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, event name, fields and message"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        event = getattr(record, 'event', None)
+        if event is not None:
+            data['event'] = event
+            data.update(getattr(record, 'fields', {}))
+        data['message'] = record.getMessage()
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class EventsOnlyFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        return getattr(record, 'event', None) is not None
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread
+
+    The stock prepare() formats the message in the calling thread, which is the
+    cost we are trying to move off the trading loop. Event fields are plain values,
+    so handing the record over unformatted is safe.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+
+def setup_async_logging(json_path: Optional[str] = None, events_only: bool = True,
+                        extra_handlers: Iterable[logging.Handler] = ()) -> logging.handlers.QueueListener:
+    """Move the root logger's handlers behind a queue and a listener thread
+
+    The existing handlers (e.g. from logging.basicConfig) keep their formatters and
+    levels. With ``json_path``, events (or all records with ``events_only=False``)
+    are also written there as JSON lines. Call ``stop()`` on the returned listener
+    at shutdown to flush the queue.
+    """
+    root = logging.getLogger()
+    handlers = list(root.handlers) + list(extra_handlers)
+    if json_path:
+        json_handler = logging.FileHandler(json_path, encoding='utf-8')
+        json_handler.setFormatter(JsonLinesFormatter())
+        if events_only:
+            json_handler.addFilter(EventsOnlyFilter())
+        handlers.append(json_handler)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root.addHandler(_LazyQueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,353 @@
+"""Compact ladders: one spec per price ladder, rung state in a numpy array
+
+coin_info.csv describes ladders as one row per rung (AKRO at 0.00295, 0.003,
+0.00305, ... with the same gain, trail and amount), and every row used to become
+a Coin object and a database row. A ``LadderSpec`` stores such a run once
+(market, first price, rung count, linear or geometric spacing, gain, trail,
+amount per rung); the mutable per-rung fields live in a structured array of
+``RUNG_DTYPE``.
+
+``LadderBook`` creates Coin objects only for the rungs the market is near
+(within ``band`` of the price) and for rungs in position or with an active
+signal, and folds the others back into the array. The monitor's cycle, memory
+and loading costs then scale with the number of active rungs. Rung coins have
+no database id; their state is saved with the ladder file, at the end of each
+cycle and at once when a rung buys or sells.
+
+    python src/services/ladder.py coin_info.csv ladders.npz   # convert a CSV
+"""
+import json
+import logging
+import math
+import os
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RUNG_DTYPE = np.dtype([
+    ('position', '?'),
+    ('amount', '<f8'),
+    ('temp_high', '<f8'),
+    ('temp_low', '<f8'),
+    ('number_deals', '<i4'),
+    ('sleep_till', '<i8'),
+    ('last_buy_price', '<f8'),
+    ('last_update', 'S19'),
+])
+
+# Relative tolerance when recognising equal steps between rung prices
+STEP_TOLERANCE = 1e-6
+
+
+@dataclass
+class LadderSpec:
+    base_currency: str
+    quote_currency: str
+    start: float            # price of the lowest rung
+    count: int
+    step: float             # price difference (linear) or ratio (geometric) between rungs
+    gain: float
+    trail: float
+    amount: float           # transactie_bedrag per rung
+    spacing: str = 'linear'
+    index_start: int = 0    # index_num of the lowest rung
+    index_step: int = 1
+    decimals: Optional[int] = None  # prices are rounded to this many decimals, as they were entered
+
+    @property
+    def market(self) -> str:
+        return f'{self.base_currency}-{self.quote_currency}'
+
+    def prices(self) -> np.ndarray:
+        steps = np.arange(self.count, dtype=np.float64)
+        if self.spacing == 'geometric':
+            prices = self.start * self.step ** steps
+        else:
+            prices = self.start + self.step * steps
+        return prices if self.decimals is None else np.round(prices, self.decimals)
+
+    def index(self, rung: int) -> int:
+        return self.index_start + self.index_step * rung
+
+    def pristine_state(self) -> np.ndarray:
+        """State of rungs that never traded: watching, temp_high/low at the matrix price"""
+        state = np.zeros(self.count, dtype=RUNG_DTYPE)
+        prices = self.prices()
+        state['amount'] = self.amount
+        state['temp_high'] = prices
+        state['temp_low'] = prices
+        return state
+
+
+class Ladder:
+    """A spec with the state of its rungs"""
+
+    def __init__(self, spec: LadderSpec, state: Optional[np.ndarray] = None):
+        self.spec = spec
+        self.prices = spec.prices()
+        self.state = spec.pristine_state() if state is None else state
+
+    def __len__(self) -> int:
+        return self.spec.count
+
+    def near(self, price: float, band: float) -> np.ndarray:
+        """Rungs with a matrix price within ``band`` of ``price``, plus rungs in position"""
+        lo = np.searchsorted(self.prices, price / (1 + band), side='left')
+        hi = np.searchsorted(self.prices, price * (1 + band), side='right')
+        return np.union1d(np.arange(lo, hi), np.flatnonzero(self.state['position']))
+
+    def row(self, rung: int) -> Dict:
+        """The rung as a coins-table row, as Coin expects it"""
+        spec, state = self.spec, self.state[rung]
+        return {
+            'id': None,
+            'index_num': spec.index(rung),
+            'base_currency': spec.base_currency,
+            'quote_currency': spec.quote_currency,
+            'position': 'Y' if state['position'] else 'N',
+            'transactie_bedrag': float(state['amount']),
+            'current_price': float(self.prices[rung]),
+            'gain': spec.gain,
+            'trail': spec.trail,
+            'temp_high': float(state['temp_high']),
+            'temp_low': float(state['temp_low']),
+            'number_deals': int(state['number_deals']),
+            'last_update': state['last_update'].decode(),
+            'sleep_till': int(state['sleep_till']),
+            'last_buy_price': float(state['last_buy_price']),
+        }
+
+    def store(self, rung: int, row: Dict) -> bool:
+        """Copy a coins-table row into the array, True if anything changed"""
+        new = (row['position'] == 'Y', row['transactie_bedrag'], row['temp_high'], row['temp_low'],
+               row['number_deals'], row['sleep_till'], row['last_buy_price'] or 0.0,
+               str(row['last_update'] or '')[:19].encode())
+        if self.state[rung].item() == new:
+            return False
+        self.state[rung] = new
+        return True
+
+
+def _decimals(price: float) -> int:
+    text = repr(price)
+    if 'e' in text:
+        mantissa, exponent = text.split('e')
+        return max(0, len(mantissa.partition('.')[2]) - int(exponent))
+    return len(text.partition('.')[2])
+
+
+def _fits(prices: Sequence[float], indexes: Sequence[int], start: int, end: int, spacing: str) -> bool:
+    """Whether rung ``end`` continues the run prices[start:end] with the same step"""
+    if spacing == 'linear':
+        step, last = prices[start + 1] - prices[start], prices[end] - prices[end - 1]
+    else:
+        step, last = prices[start + 1] / prices[start], prices[end] / prices[end - 1]
+    return (math.isclose(last, step, rel_tol=STEP_TOLERANCE)
+            and indexes[end] - indexes[end - 1] == indexes[start + 1] - indexes[start])
+
+
+def compress_rows(rows: Iterable[Dict], min_run: int = 3) -> List[Ladder]:
+    """Group coins-table rows into ladders of equally spaced rungs
+
+    Rows with the same market, gain, trail and amount and prices at a constant
+    difference or ratio (and constant index step) become one spec; rows that do
+    not fit a run of ``min_run`` rungs become single-rung specs. The state of
+    every row is kept.
+    """
+    groups: Dict[Tuple, List[Dict]] = {}
+    for row in rows:
+        key = (row['base_currency'], row['quote_currency'], row['gain'], row['trail'], row['transactie_bedrag'])
+        groups.setdefault(key, []).append(row)
+
+    ladders = []
+    for (base, quote, gain, trail, amount), group in groups.items():
+        group.sort(key=lambda row: row['current_price'])
+        prices = [row['current_price'] for row in group]
+        indexes = [row['index_num'] for row in group]
+        start = 0
+        while start < len(group):
+            end, spacing = start + 1, 'linear'
+            if start + 1 < len(group) and prices[start + 1] != prices[start]:
+                for candidate in ('linear', 'geometric'):
+                    stop = start + 2
+                    while stop < len(group) and _fits(prices, indexes, start, stop, candidate):
+                        stop += 1
+                    if stop - start >= min_run:
+                        end, spacing = stop, candidate
+                        break
+            decimals = max(_decimals(price) for price in prices[start:end])
+            if end - start > 1:
+                # Keep the rungs the spec reproduces exactly
+                step = prices[start + 1] - prices[start] if spacing == 'linear' else prices[start + 1] / prices[start]
+                spec = LadderSpec(base, quote, prices[start], end - start, step, gain, trail, amount, spacing,
+                                  indexes[start], indexes[start + 1] - indexes[start], decimals)
+                exact = spec.prices() == np.array(prices[start:end])
+                end = start + (int(np.argmin(exact)) if not exact.all() else end - start)
+                if end - start < min_run:
+                    end = start + 1
+            if end - start == 1:
+                spec = LadderSpec(base, quote, prices[start], 1, 0.0, gain, trail, amount, 'linear',
+                                  indexes[start], 1, decimals)
+            else:
+                spec.count = end - start
+            run = group[start:end]
+            ladder = Ladder(spec)
+            for rung, row in enumerate(run):
+                ladder.store(rung, row)
+            ladders.append(ladder)
+            start = end
+    return ladders
+
+
+def csv_rows(path: str) -> List[Dict]:
+    """coin_info.csv rows as coins-table rows"""
+    import csv
+    rows = []
+    with open(path, newline='') as f:
+        for line in csv.reader(f):
+            if not line or not line[0].strip().isdigit():
+                continue
+            rows.append({
+                'index_num': int(line[0]), 'base_currency': line[1].strip(), 'quote_currency': line[2].strip(),
+                'position': line[3].strip(), 'transactie_bedrag': float(line[4]), 'current_price': float(line[5]),
+                'gain': float(line[6]), 'trail': float(line[7]), 'temp_high': float(line[9]),
+                'temp_low': float(line[10]), 'number_deals': int(line[11]), 'last_update': line[12],
+                'sleep_till': int(line[13]), 'last_buy_price': 0.0,
+            })
+    return rows
+
+
+def save_ladders(path: str, ladders: Sequence[Ladder]):
+    """Atomically write the specs and the state of all rungs (one array) to a .npz file"""
+    specs = np.frombuffer(json.dumps([asdict(ladder.spec) for ladder in ladders]).encode(), dtype=np.uint8)
+    state = np.concatenate([ladder.state for ladder in ladders]) if ladders else np.zeros(0, RUNG_DTYPE)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, specs=specs, state=state)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_ladders(path: str) -> List[Ladder]:
+    with np.load(path, allow_pickle=False) as data:
+        specs = [LadderSpec(**spec) for spec in json.loads(data['specs'].tobytes())]
+        state = data['state']
+    ladders, offset = [], 0
+    for spec in specs:
+        ladders.append(Ladder(spec, state[offset:offset + spec.count].copy()))
+        offset += spec.count
+    return ladders
+
+
+class LadderBook:
+    """Ladders of the monitor, with Coin objects for the active rungs only"""
+
+    def __init__(self, path: str, ladders: Sequence[Ladder], band: float = 0.10):
+        self.path = path
+        self.ladders = list(ladders)
+        self.band = band
+        self.coins: Dict[Tuple[int, int], object] = {}   # (ladder, rung) -> Coin
+        self._keys: Dict[int, Tuple[int, int]] = {}       # id(Coin) -> (ladder, rung)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: str, band: float = 0.10) -> 'LadderBook':
+        ladders = load_ladders(path)
+        logger.info(f"Loaded {len(ladders)} ladders with {sum(map(len, ladders))} rungs from {path}")
+        return cls(path, ladders, band)
+
+    def rung_count(self) -> int:
+        return sum(map(len, self.ladders))
+
+    def _wanted(self, quotes: Dict) -> Dict[Tuple[int, int], None]:
+        wanted = {}
+        for i, ladder in enumerate(self.ladders):
+            quote = quotes.get(ladder.spec.market)
+            price = quote[0] if quote else math.nan
+            if math.isnan(price):
+                rungs = np.flatnonzero(ladder.state['position'])
+            else:
+                rungs = ladder.near(price, self.band)
+            wanted.update(((i, int(rung)), None) for rung in rungs)
+        return wanted
+
+    def refresh(self, coin_list: List, quotes: Dict, make_coin) -> Tuple[int, int]:
+        """Create coins for rungs that became active and retire idle far-away ones
+
+        ``make_coin(row)`` builds a Coin from a rung row. ``coin_list`` is updated in
+        place. Returns the number of coins added and retired.
+        """
+        self.sync()
+        wanted = self._wanted(quotes)
+        retired = [key for key, coin in self.coins.items()
+                   if key not in wanted and not (coin.position or coin.buy_signal or coin.sell_signal)]
+        for key in retired:
+            coin = self.coins.pop(key)
+            del self._keys[id(coin)]
+            coin_list.remove(coin)
+        added = 0
+        for key in wanted:
+            if key not in self.coins:
+                ladder, rung = key
+                coin = make_coin(self.ladders[ladder].row(rung))
+                self.coins[key] = coin
+                self._keys[id(coin)] = key
+                coin_list.append(coin)
+                added += 1
+        return added, len(retired)
+
+    def sync(self):
+        """Copy the state of the active rung coins into the arrays"""
+        for (ladder, rung), coin in self.coins.items():
+            if self.ladders[ladder].store(rung, coin._coin_row()):
+                self.dirty = True
+
+    def record(self, coin):
+        """Copy the state of a rung coin into its array; a changed position is saved at once"""
+        key = self._keys.get(id(coin))
+        if key is None:
+            return
+        ladder, rung = key
+        was_in_position = bool(self.ladders[ladder].state['position'][rung])
+        row = coin._coin_row()
+        if self.ladders[ladder].store(rung, row):
+            self.dirty = True
+            if (row['position'] == 'Y') != was_in_position:
+                self.save()
+
+    def save(self):
+        self.sync()
+        if self.dirty:
+            save_ladders(self.path, self.ladders)
+            self.dirty = False
+
+    def in_position(self, base_currency: str) -> List[Dict]:
+        """Rung coins of ``base_currency`` in position, as get_coins_in_position rows"""
+        return [{'current_price': coin.current_price} for coin in self.coins.values()
+                if coin.position and coin.base_currency == base_currency]
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Convert coin_info.csv rows into compact ladder specs')
+    parser.add_argument('csv')
+    parser.add_argument('output')
+    parser.add_argument('--min-run', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = csv_rows(args.csv)
+    ladders = compress_rows(rows, args.min_run)
+    save_ladders(args.output, ladders)
+    for ladder in ladders:
+        spec = ladder.spec
+        print(f"{spec.market:12s} {spec.count:4d} rungs from {spec.start:g} "
+              f"({spec.spacing} step {spec.step:g}), gain {spec.gain:g}, trail {spec.trail:g}, amount {spec.amount:g}")
+    print(f"{len(rows)} rows -> {len(ladders)} ladder specs in {args.output}")
+
+
+if __name__ == '__main__':
+    main()
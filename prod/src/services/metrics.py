@@ -0,0 +1,347 @@
+"""In-process metrics registry with Prometheus text output
+
+Counters, gauges and histograms with optional labels, kept in memory and
+rendered in the Prometheus text exposition format (version 0.0.4). The monitor
+serves them on a local port with MetricsServer; everything else only records.
+
+The bot's metrics are defined at the bottom of this module so their names and
+label sets live in one place.
+"""
+import bisect
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple = ()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use .labels()")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class _Value:
+    __slots__ = ('value', 'function', 'lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from ``function`` at scrape time (e.g. a queue length)"""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception as e:
+                logger.debug(f"Metric callback failed: {e}")
+                return math.nan
+        return self.value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def _render_child(self, values, child):
+        return [f'{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}']
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self._default().set_function(function)
+
+
+class _HistogramValue:
+    __slots__ = ('bounds', 'counts', 'sum', 'count', 'lock')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound below which a fraction ``q`` of observations falls"""
+        with self.lock:
+            if not self.count:
+                return math.nan
+            target = q * self.count
+            seen = 0
+            for bound, count in zip(self.bounds + (math.inf,), self.counts):
+                seen += count
+                if seen >= target:
+                    return bound
+        return math.inf
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, values, child):
+        with child.lock:
+            counts, total, count = list(child.counts), child.sum, child.count
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (math.inf,), counts):
+            cumulative += n
+            labels = _format_labels(self.labelnames, values, (('le', _format_value(bound)),))
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+        lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics; asking twice for the same name returns the same metric"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered as {metric.kind} {metric.labelnames}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+def _timed(method: Callable, child: _HistogramValue) -> Callable:
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            child.observe(time.perf_counter() - start)
+
+    timed._instrumented = True
+    return timed
+
+
+def instrument(obj, method_names: Iterable[str], histogram: Histogram, label: str = 'operation'):
+    """Time the given methods of ``obj`` into ``histogram`` labelled by method name
+
+    Used for objects owned elsewhere, such as the database singleton, so every
+    call site is measured without touching it.
+    """
+    for method_name in method_names:
+        method = getattr(obj, method_name, None)
+        if method is None or getattr(method, '_instrumented', False):
+            continue
+        setattr(obj, method_name, _timed(method, histogram.labels(**{label: method_name})))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """Serves a registry at http://host:port/metrics from a daemon thread"""
+
+    daemon_threads = True
+
+    def __init__(self, registry: MetricsRegistry, host: str = '127.0.0.1', port: int = 9108):
+        super().__init__((host, port), _MetricsHandler)
+        self.registry = registry
+
+    def start(self) -> 'MetricsServer':
+        threading.Thread(target=self.serve_forever, name='metrics-server', daemon=True).start()
+        logger.info(f"Metrics available on http://{self.server_address[0]}:{self.server_address[1]}/metrics")
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+# ---------------------------------------------------------------------- bot metrics
+
+metrics = MetricsRegistry()
+
+CYCLE_SECONDS = metrics.histogram(
+    'bot_cycle_duration_seconds', 'Duration of one trading cycle over all coins',
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200))
+CYCLES = metrics.counter('bot_cycles_total', 'Completed trading cycles')
+CHECK_ACTION_SECONDS = metrics.histogram(
+    'bot_check_action_seconds', 'Duration of Coin.check_action', ['side'])
+QUOTE_AGE = metrics.gauge(
+    'bot_quote_age_seconds', 'Age of the last quote used for a market', ['market'])
+REST_SECONDS = metrics.histogram(
+    'bot_rest_latency_seconds', 'Bitvavo REST call latency', ['endpoint'])
+REST_ERRORS = metrics.counter(
+    'bot_rest_errors_total', 'Failed Bitvavo REST calls', ['endpoint'])
+RATE_LIMIT_REMAINING = metrics.gauge(
+    'bot_rate_limit_remaining', 'Bitvavo weight points left in the current rate-limit window')
+DB_SECONDS = metrics.histogram(
+    'bot_db_write_seconds', 'Database write latency', ['operation'])
+QUEUE_DEPTH = metrics.gauge(
+    'bot_queue_depth', 'Items waiting in internal queues and buffers', ['queue'])
+LOG_SECONDS = metrics.histogram(
+    'bot_log_seconds_per_cycle', 'Time spent emitting log events during one trading cycle',
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+LOG_EVENTS = metrics.counter('bot_log_events_total', 'Log events emitted by the trading loop')
+ORDERS = metrics.counter(
+    'bot_orders_total', 'Orders by side and result', ['side', 'result'])
+EVENTS_DELIVERED = metrics.counter(
+    'bot_events_delivered_total', 'Events handled by an event bus subscriber', ['subscriber'])
+EVENTS_DROPPED = metrics.counter(
+    'bot_events_dropped_total', 'Events dropped because a queued subscriber fell behind', ['subscriber'])
+EVENT_ERRORS = metrics.counter(
+    'bot_event_errors_total', 'Events whose subscriber raised', ['subscriber'])
+EVENT_LATENCY = metrics.histogram(
+    'bot_event_latency_seconds', 'Time from publishing an event until its subscriber handled it', ['subscriber'],
+    buckets=(0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0))
+POLL_INTERVAL = metrics.gauge(
+    'bot_poll_interval_seconds', 'Effective interval between checks of a market under adaptive polling', ['market'])
+CLOCK_OFFSET = metrics.gauge(
+    'bot_clock_offset_seconds', 'Exchange clock minus local clock, as applied to signed requests')
+CLOCK_RTT = metrics.gauge(
+    'bot_clock_rtt_seconds', 'Round-trip time of the fastest recent /time sample')
@@ -0,0 +1,104 @@
+"""Adaptive polling: markets near a trigger are checked often, far ones rarely
+
+Every rung fetches the order book of its market when it is checked, so one
+pass over all coins costs a request per rung. ``PollScheduler`` decides per
+market whether its rungs are checked this cycle. It uses the market's distance
+to the nearest level any of its rungs acts on: the buy or sell trigger, or the
+trailing stop once a signal is active.
+
+* a rung with an active signal, or a level within ``near`` of the price,
+  makes its market hot: it is checked every ``min_interval`` seconds
+* from there the interval grows linearly with the distance, up to
+  ``max_interval`` for markets ``far`` or more from every level
+* if the requests this would take exceed ``budget`` per second, every interval
+  is stretched by the same factor, so hot markets keep their lead
+
+Markets without a known price are always due. The effective interval per
+market is exported as ``bot_poll_interval_seconds``.
+"""
+import math
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.metrics import POLL_INTERVAL
+
+
+def trigger_distance(coin, price: float) -> float:
+    """Relative distance from ``price`` to the nearest level ``coin`` acts on; 0 with an active signal"""
+    if coin.buy_signal or coin.sell_signal:
+        return 0.0
+    if coin.position:
+        level = coin.sell_drempel or coin.current_price * (1 + coin.gain)
+        return max(level - price, 0.0) / price
+    level = coin.buy_drempel or coin.current_price * (1 - coin.gain)
+    return max(price - level, 0.0) / price
+
+
+class PollScheduler:
+    """Per-market poll intervals from the distance to the nearest trigger, within a request budget"""
+
+    def __init__(self, min_interval: float = 0.0, max_interval: float = 300.0, near: float = 0.005,
+                 far: float = 0.20, budget: Optional[float] = None):
+        if not 0 <= near < far:
+            raise ValueError(f"Poll distances must satisfy 0 <= near < far, got near={near}, far={far}")
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.near = near
+        self.far = far
+        self.budget = budget              # requests per second, None for no limit
+        self.prices: Dict[str, float] = {}
+        self.intervals: Dict[str, float] = {}
+        self.distances: Dict[str, float] = {}
+        self._polled: Dict[str, float] = {}  # market -> time its rungs were last due
+
+    def observe(self, quotes: Dict[str, Tuple[float, float, float, float]]):
+        """Remember the latest market prices, as collected by market_snapshot.collect"""
+        for market, (price, _, _, _) in quotes.items():
+            if price == price and price > 0:  # skip NaN
+                self.prices[market] = price
+
+    def interval_for(self, distance: float) -> float:
+        if distance <= self.near:
+            return self.min_interval
+        fraction = min((distance - self.near) / (self.far - self.near), 1.0)
+        return self.min_interval + fraction * (self.max_interval - self.min_interval)
+
+    def plan(self, coins: Iterable) -> Dict[str, List]:
+        """Group ``coins`` per market and set each market's interval; returns the groups"""
+        markets: Dict[str, List] = {}
+        for coin in coins:
+            markets.setdefault(coin.analysis_pair, []).append(coin)
+
+        distances = {}
+        for market, market_coins in markets.items():
+            price = self.prices.get(market)
+            distances[market] = math.inf if price is None else \
+                min(trigger_distance(coin, price) for coin in market_coins)
+        intervals = {market: self.interval_for(distance) for market, distance in distances.items()}
+
+        if self.budget:
+            # Requests per second at these intervals (hot markets at least once per second)
+            demand = sum(len(markets[market]) / max(interval, 1.0) for market, interval in intervals.items())
+            stretch = max(demand / self.budget, 1.0)
+            intervals = {market: max(interval, 1.0) * stretch if stretch > 1 else interval
+                         for market, interval in intervals.items()}
+
+        for market in set(self.intervals) - set(intervals):
+            POLL_INTERVAL.labels(market=market).set(math.nan)
+            self._polled.pop(market, None)
+        for market, interval in intervals.items():
+            POLL_INTERVAL.labels(market=market).set(interval)
+        self.intervals = intervals
+        self.distances = distances
+        return markets
+
+    def due(self, coins: Iterable, now: Optional[float] = None) -> List:
+        """The coins to check this cycle: all rungs of every market whose interval has passed"""
+        now = time.time() if now is None else now
+        due = []
+        for market, market_coins in self.plan(coins).items():
+            # Against the last poll, so a market that turns hot is due at once
+            if market not in self.prices or now >= self._polled.get(market, -math.inf) + self.intervals[market]:
+                self._polled[market] = now
+                due.extend(market_coins)
+        return due
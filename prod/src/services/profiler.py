@@ -0,0 +1,202 @@
+"""On-demand profiling of trading cycles in a running monitor
+
+A profile is requested from anywhere (signal handler, keyboard thread) with
+``request()``; the monitor calls ``start_cycle()`` / ``end_cycle()`` around every
+cycle, so profiling always covers whole cycles on the trading thread. Two modes:
+
+- ``cprofile``: deterministic, exact call counts, some overhead on every call
+- ``sample``: a background thread samples the trading thread's stack every few
+  milliseconds; low overhead, statistical
+
+When the requested number of cycles is done, the stats are written to
+``output_dir`` and the top functions by cumulative time are logged. Writing the
+report happens on a separate thread, the monitor keeps trading meanwhile.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MODES = ('cprofile', 'sample')
+
+
+class SamplingProfiler:
+    """Samples one thread's call stack at a fixed interval"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def top(self, limit: int = 25) -> List[Tuple[str, float, float]]:
+        """(function, cumulative seconds, self seconds), by cumulative time"""
+        cumulative: Counter = Counter()
+        own: Counter = Counter()
+        for stack, count in self.stacks.items():
+            for frame in set(stack):  # recursion counts once per sample
+                cumulative[frame] += count
+            own[stack[-1]] += count
+        rows = []
+        for key, count in cumulative.items():
+            filename, line, name = key
+            rows.append((f'{os.path.basename(filename)}:{line}({name})',
+                         count * self.interval, own[key] * self.interval))
+        return sorted(rows, key=lambda row: row[1], reverse=True)[:limit]
+
+    def write_collapsed(self, path: str):
+        """Stacks in the 'collapsed' format used by flamegraph tools"""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                frames = ';'.join(f'{name} ({os.path.basename(filename)}:{line})' for filename, line, name in stack)
+                f.write(f'{frames} {count}\n')
+
+
+class CycleProfiler:
+    """Profiles the next N trading cycles when asked to"""
+
+    def __init__(self, output_dir: str = 'profiles', cycles: int = 3, mode: str = 'cprofile',
+                 top: int = 25, sample_interval: float = 0.005):
+        self.output_dir = output_dir
+        self.cycles = cycles
+        self.mode = mode
+        self.top = top
+        self.sample_interval = sample_interval
+        self._lock = threading.RLock()  # re-entrant: request() may run in a signal handler
+        self._requested: Optional[Tuple[str, int]] = None
+        self._active = None
+        self._active_mode = None
+        self._remaining = 0
+        self._first_cycle = None
+        self._report_thread: Optional[threading.Thread] = None
+        self.last_report: Optional[str] = None
+
+    @property
+    def active(self) -> bool:
+        return self._active is not None
+
+    def request(self, cycles: Optional[int] = None, mode: Optional[str] = None):
+        """Profile the next ``cycles`` cycles; safe to call from signal handlers and other threads
+
+        A request while a profile is running stops it after the current cycle.
+        """
+        mode = mode or self.mode
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiler mode {mode!r}, expected one of {MODES}")
+        with self._lock:
+            if self._active is not None:
+                self._remaining = 1
+            else:
+                self._requested = (mode, cycles or self.cycles)
+
+    def start_cycle(self, cycle: int):
+        """Called by the trading thread before a cycle"""
+        with self._lock:
+            if self._requested is None or self._active is not None:
+                return
+            mode, self._remaining = self._requested
+            self._requested = None
+        logger.info(f"Profiling {self._remaining} cycle(s) from cycle {cycle} with {mode}")
+        self._first_cycle = cycle
+        self._active_mode = mode
+        if mode == 'cprofile':
+            self._active = cProfile.Profile()
+            self._active.enable()
+        else:
+            self._active = SamplingProfiler(threading.get_ident(), self.sample_interval)
+            self._active.start()
+
+    def end_cycle(self, cycle: int):
+        """Called by the trading thread after a cycle"""
+        if self._active is None:
+            return
+        with self._lock:
+            self._remaining -= 1
+            done = self._remaining <= 0
+        if not done:
+            return
+        profiler, mode, first = self._active, self._active_mode, self._first_cycle
+        if mode == 'cprofile':
+            profiler.disable()
+        else:
+            profiler.stop()
+        self._active = None
+        self._report_thread = threading.Thread(target=self._report, args=(profiler, mode, first, cycle),
+                                               name='profile-report', daemon=True)
+        self._report_thread.start()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Wait until the last report has been written"""
+        if self._report_thread is not None:
+            self._report_thread.join(timeout)
+
+    def _report(self, profiler, mode: str, first: int, last: int):
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            stamp = time.strftime('%Y%m%d-%H%M%S')
+            base = os.path.join(self.output_dir, f'cycles_{first}-{last}_{stamp}')
+            if mode == 'cprofile':
+                path = base + '.prof'
+                profiler.dump_stats(path)
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(self.top)
+                report = out.getvalue()
+            else:
+                path = base + '.collapsed'
+                profiler.write_collapsed(path)
+                lines = [f"{profiler.samples} samples every {profiler.interval * 1000:.1f} ms",
+                         f"{'cumulative s':>12} {'self s':>8}  function"]
+                lines += [f'{cum:12.3f} {own:8.3f}  {name}' for name, cum, own in profiler.top(self.top)]
+                report = '\n'.join(lines)
+            self.last_report = report
+            logger.info(f"Profile of cycles {first}-{last} written to {path}\n{report}")
+        except Exception as e:
+            logger.error(f"Writing profile failed: {e}")
+
+
+def parse_command(command: str) -> Optional[Tuple[str, int]]:
+    """'prof', 'prof 5' or 'prof sample 5' -> (mode, cycles); None if not a profile command"""
+    words = command.strip().split()
+    if not words or words[0] != 'prof':
+        return None
+    mode, cycles = 'cprofile', 0
+    for word in words[1:]:
+        if word.isdigit():
+            cycles = int(word)
+        elif word in MODES:
+            mode = word
+        else:
+            raise ValueError(f"Unknown profile option {word!r}")
+    return mode, cycles
@@ -0,0 +1,216 @@
+"""Read-only HTTP/JSON API over the monitor's in-memory state
+
+Dashboards, the Discord report and chat bots can poll the running monitor
+instead of opening SQLite and calling the exchange themselves:
+
+    GET /coins[?market=BTC-EUR]   coins per market with their triggers and trail stops
+    GET /rungs[?market=BTC-EUR]   hot and warm rungs per market around the latest price
+    GET /signals                  coins with an active buy or sell signal
+    GET /transactions[?limit=50]  recent buys and sells seen by the monitor
+    GET /cycle                    last cycle and cycle-duration statistics
+    GET /bars?market=BTC-EUR[&interval=1m&limit=100]  OHLCV bars built from the monitor's quotes
+
+The trading thread calls ``BotState.publish_cycle`` after every cycle, which
+takes a copy of every coin's state; the trading thread keeps changing the Coin
+objects while requests are served. Responses are built from that copy on the
+first request after a cycle and cached until the next cycle; each
+carries an ETag, and a request with a matching If-None-Match gets 304 without a
+body, so frequent polling costs next to nothing.
+"""
+import json
+import logging
+import math
+import threading
+import time
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from reporting.ladder_view import MarketLadder
+
+logger = logging.getLogger(__name__)
+
+
+def coin_view(coin) -> Dict:
+    return {
+        'id': coin.coin_id,
+        'index': coin.index,
+        'market': coin.analysis_pair,
+        'position': 'Y' if coin.position else 'N',
+        'amount': coin.transactie_bedrag,
+        'matrix': coin.current_price,
+        'gain': coin.gain,
+        'trail': coin.trail,
+        'buy_trigger': coin.buy_drempel,
+        'sell_trigger': coin.sell_drempel,
+        'low': coin.low,
+        'high': coin.high,
+        'trail_buy': coin.trail_stop_buy_drempel,
+        'trail_sell': coin.trail_stop_sell_drempel,
+        'buy_signal': coin.buy_signal,
+        'sell_signal': coin.sell_signal,
+        'deals': coin.number_deals,
+        'last_buy_price': coin.last_buy_price,
+    }
+
+
+class BotState:
+    """The monitor state served by QueryServer, updated by the trading thread"""
+
+    def __init__(self, max_transactions: int = 500):
+        self._lock = threading.Lock()
+        self.version = 0
+        self.coins: List[Dict] = []  # coin_view of every coin at the end of the last cycle
+        self.quotes: Dict[str, Tuple[float, float, float, float]] = {}
+        self.cycle: Dict = {}
+        self.transactions = deque(maxlen=max_transactions)
+        self._cache: Dict[str, Tuple[bytes, str]] = {}
+        self._cache_version = -1
+        self.bar_builder = None  # market_data.bars.BarBuilder, when the monitor builds bars
+
+    def publish_cycle(self, coins, quotes: Dict, cycle: int, duration: float):
+        views = [coin_view(coin) for coin in coins]
+        with self._lock:
+            self.coins = views
+            self.quotes = dict(quotes)
+            self.cycle = {'cycle': cycle, 'duration': duration, 'finished': time.time()}
+            self.version += 1
+
+    def on_order(self, event):
+        """OrderEvent subscriber (services/event_bus.py); the only way trades get into the state"""
+        with self._lock:
+            self.transactions.appendleft({
+                'time': event.ts, 'id': event.coin_id, 'market': event.market, 'side': event.side,
+                'price': event.price, 'amount': event.amount, 'matrix': event.matrix,
+            })
+            self.version += 1
+
+    # -- views
+
+    def _by_market(self, market: Optional[str]) -> Dict[str, List]:
+        markets: Dict[str, List] = {}
+        for coin in self.coins:
+            if market is None or coin['market'] == market:
+                markets.setdefault(coin['market'], []).append(coin)
+        return markets
+
+    def view_coins(self, market: Optional[str] = None) -> Dict:
+        return {name: sorted(coins, key=lambda coin: coin['matrix'])
+                for name, coins in sorted(self._by_market(market).items())}
+
+    def view_rungs(self, market: Optional[str] = None) -> Dict:
+        result = {}
+        for name, coins in sorted(self._by_market(market).items()):
+            quote = self.quotes.get(name)
+            if quote is None:
+                continue
+            price, bid, ask, ts = quote
+            ladder = MarketLadder(coins)
+            result[name] = {'price': price, 'bid': bid, 'ask': ask, 'quote_time': ts,
+                            'hot': ladder.hot(price), 'warm': ladder.warm(price)}
+        return result
+
+    def view_signals(self) -> List[Dict]:
+        return [coin for coin in self.coins if coin['buy_signal'] or coin['sell_signal']]
+
+    def view_transactions(self, limit: int = 50) -> List[Dict]:
+        return list(self.transactions)[:limit]
+
+    def view_cycle(self) -> Dict:
+        from services.metrics import CYCLE_SECONDS, CYCLES
+        durations = CYCLE_SECONDS.labels()
+        quantiles = {f'duration_p{int(q * 100)}': durations.quantile(q) for q in (0.5, 0.95)}
+        return dict(self.cycle, cycles_total=CYCLES.labels().get(), coins=len(self.coins),
+                    **{name: value if math.isfinite(value) else None for name, value in quantiles.items()})
+
+    def view_bars(self, market: Optional[str], interval: str = '1m', limit: int = 100) -> Dict:
+        if self.bar_builder is None:
+            return {}
+        if market is None:
+            return {'markets': self.bar_builder.markets(), 'intervals': list(self.bar_builder.intervals)}
+        if interval not in self.bar_builder.intervals:
+            raise ValueError(f"Unknown interval {interval!r}")
+        bars = self.bar_builder.bars(market, interval)[-max(limit, 0):] if limit > 0 else []
+        return {'market': market, 'interval': interval, 'columns': ['ts', 'open', 'high', 'low', 'close', 'volume'],
+                'bars': [list(bar) for bar in bars],
+                'current': self.bar_builder.current(market, interval)}
+
+    def render(self, path: str, query: Dict[str, List[str]]) -> Optional[Tuple[bytes, str]]:
+        """(JSON body, ETag) for a request, or None for an unknown path"""
+        views: Dict[str, Callable[[], object]] = {
+            '/coins': lambda: self.view_coins(_first(query, 'market')),
+            '/rungs': lambda: self.view_rungs(_first(query, 'market')),
+            '/signals': self.view_signals,
+            '/transactions': lambda: self.view_transactions(int(_first(query, 'limit') or 50)),
+            '/cycle': self.view_cycle,
+            '/bars': lambda: self.view_bars(_first(query, 'market'), _first(query, 'interval') or '1m',
+                                            int(_first(query, 'limit') or 100)),
+        }
+        if path not in views:
+            return None
+        key = path + '?' + '&'.join(f'{k}={v}' for k, values in sorted(query.items()) for v in values)
+        with self._lock:
+            if self._cache_version != self.version:
+                self._cache.clear()
+                self._cache_version = self.version
+            cached = self._cache.get(key)
+            if cached is None:
+                body = json.dumps(views[path](), default=str).encode()
+                cached = self._cache[key] = (body, f'"{self.version:x}-{zlib.crc32(body):08x}"')
+        return cached
+
+
+def _first(query: Dict[str, List[str]], name: str) -> Optional[str]:
+    values = query.get(name)
+    return values[0] if values else None
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            rendered = self.server.state.render(url.path.rstrip('/') or '/', parse_qs(url.query))
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        if rendered is None:
+            self.send_error(404, 'Endpoints: /coins /rungs /signals /transactions /cycle /bars')
+            return
+        body, etag = rendered
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class QueryServer(ThreadingHTTPServer):
+    """Serves a BotState at http://host:port/ from a daemon thread"""
+
+    daemon_threads = True
+
+    def __init__(self, state: BotState, host: str = '127.0.0.1', port: int = 9109):
+        super().__init__((host, port), _QueryHandler)
+        self.state = state
+
+    def start(self) -> 'QueryServer':
+        threading.Thread(target=self.serve_forever, name='query-api', daemon=True).start()
+        logger.info(f"Query API available on http://{self.server_address[0]}:{self.server_address[1]}/")
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
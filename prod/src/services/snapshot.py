@@ -0,0 +1,146 @@
+"""Binary snapshot of the monitor's in-memory trading state for fast restarts
+
+A cold start rebuilds every Coin and re-validates each active signal with a REST
+call. The monitor therefore writes the state that is NOT in the coins table
+(signal flags, absolute high/low, trigger and trail-stop levels, last quotes)
+to a snapshot after every cycle, together with the ticker cache.
+
+File layout: 8-byte magic, little-endian uint32 header length, a JSON header,
+padding to 8 bytes, then one fixed-width record per coin (SNAPSHOT_DTYPE). The
+records are memory-mapped on load; nothing is parsed per coin.
+
+Every record carries a CRC of the coin's persistent row (Coin._coin_row) as it
+was when the snapshot was written. On restart the row is rebuilt from the
+database and the state journal; only records whose CRC still matches are used,
+so a coin changed after the snapshot (or edited in the database) is validated
+the slow way and a stale snapshot is never applied. A snapshot older than
+``max_age`` is not used at all: the market has moved on since its signals and
+quotes were current, so every coin is validated as on a cold start.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'BOTSNAP\x01'
+FORMAT_VERSION = 1
+
+SNAPSHOT_DTYPE = np.dtype([
+    ('coin_id', '<i8'),
+    ('row_crc', '<u4'),
+    ('buy_signal', '?'),
+    ('sell_signal', '?'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('buy_drempel', '<f8'),
+    ('sell_drempel', '<f8'),
+    ('trail_stop_buy_drempel', '<f8'),
+    ('trail_stop_sell_drempel', '<f8'),
+    ('ask', '<f8'),
+    ('bid', '<f8'),
+])
+
+# Record field -> Coin attribute (same name for all but the identifiers)
+STATE_FIELDS = SNAPSHOT_DTYPE.names[2:]
+
+
+def row_crc(row: Dict) -> int:
+    """Checksum of a coin's persistent row, independent of key order"""
+    return zlib.crc32(json.dumps(row, sort_keys=True, default=str).encode())
+
+
+class Snapshot:
+    """A loaded snapshot: header dict plus memory-mapped per-coin records"""
+
+    def __init__(self, header: Dict, records: np.ndarray, buffer: mmap.mmap):
+        self.header = header
+        self.records = records
+        self._buffer = buffer
+        self._positions = {int(coin_id): i for i, coin_id in enumerate(records['coin_id'])}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def record(self, coin_id: int, row: Dict) -> Optional[np.void]:
+        """The record for ``coin_id`` if its persistent row still matches ``row``"""
+        i = self._positions.get(coin_id)
+        if i is None:
+            return None
+        record = self.records[i]
+        return record if int(record['row_crc']) == row_crc(row) else None
+
+    def close(self):
+        self.records = None
+        try:
+            self._buffer.close()
+        except BufferError:
+            pass  # a record view is still referenced; the map is released with it
+
+
+def write_snapshot(path: str, coins: Iterable, client=None, cycle: Optional[int] = None):
+    """Write the state of ``coins`` (and the client's ticker cache) atomically to ``path``"""
+    coins = [coin for coin in coins if coin.coin_id]
+    records = np.zeros(len(coins), dtype=SNAPSHOT_DTYPE)
+    for i, coin in enumerate(coins):
+        records[i] = (coin.coin_id, row_crc(coin._coin_row()),
+                      *(getattr(coin, field) for field in STATE_FIELDS))
+    header = {
+        'format': FORMAT_VERSION,
+        'dtype': SNAPSHOT_DTYPE.descr,
+        'count': len(records),
+        'created': time.time(),
+        'cycle': cycle,
+    }
+    if client is not None and client._ticker_cache:
+        header['ticker_cache'] = client._ticker_cache
+        header['cache_timestamp'] = client._cache_timestamp
+    header_bytes = json.dumps(header, separators=(',', ':')).encode()
+    offset = len(MAGIC) + 4 + len(header_bytes)
+    padding = b'\0' * (-offset % 8)
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes + padding)
+        f.write(records.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_snapshot(path: str, max_age: Optional[float] = None, now: Optional[float] = None) -> Optional[Snapshot]:
+    """Memory-map a snapshot; None if it is missing, truncated, of another format or older than ``max_age`` seconds"""
+    try:
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # missing, or empty (mmap of length 0)
+        return None
+    try:
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError('bad magic')
+        (header_length,) = struct.unpack_from('<I', buffer, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(buffer[start:start + header_length])
+        if header.get('format') != FORMAT_VERSION or \
+                np.dtype([tuple(field) for field in header['dtype']]) != SNAPSHOT_DTYPE:
+            raise ValueError(f"format {header.get('format')} not supported")
+        offset = start + header_length
+        offset += -offset % 8
+        if len(buffer) - offset != header['count'] * SNAPSHOT_DTYPE.itemsize:
+            raise ValueError('truncated')
+        age = (time.time() if now is None else now) - header['created']
+        if max_age is not None and age > max_age:
+            raise ValueError(f"written {age:.0f}s ago, more than {max_age:.0f}s")
+        records = np.frombuffer(buffer, dtype=SNAPSHOT_DTYPE, count=header['count'], offset=offset)
+    except (ValueError, KeyError, TypeError, struct.error) as e:
+        logger.warning(f"Ignoring snapshot {path}: {e}")
+        buffer.close()
+        return None
+    return Snapshot(header, records, buffer)
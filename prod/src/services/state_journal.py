@@ -0,0 +1,204 @@
+"""Append-only journal of coin state changes with periodic checkpoints
+
+Instead of rewriting the full coins row on every temp_high/temp_low move, each
+change is appended as a small delta holding only the fields that changed:
+
+    <crc32> {"s": 17, "c": 4, "t": 1718000000.1, "d": {"temp_high": 61234.5}}
+
+Deltas are buffered and written with one write + fsync per batch (every
+``batch_size`` records or ``sync_interval`` seconds, and at the end of every
+cycle). Changes to an urgent field (by default ``position``) are synced and
+written to the database immediately, so other readers of the coins table never
+miss a trade.
+
+A checkpoint writes the latest state of every changed coin through ``apply`` (in
+the monitor: ``db.save_coin``) and then atomically replaces the journal with an
+empty one. Deltas hold absolute values, so replaying a journal whose checkpoint
+was interrupted just writes the same values again.
+
+After a crash, ``recover()`` folds the journal tail into the last known state
+per coin. A torn last line (crash mid-write) fails its checksum and is dropped
+together with everything after it.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def _encode(record: Dict) -> bytes:
+    payload = json.dumps(record, separators=(',', ':'), default=str)
+    return f'{zlib.crc32(payload.encode()):08x} {payload}\n'.encode()
+
+
+def _decode(line: bytes) -> Optional[Dict]:
+    """The record on ``line``, or None if it is incomplete or corrupt"""
+    if not line.endswith(b'\n') or len(line) < 10 or line[8:9] != b' ':
+        return None
+    payload = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+class StateJournal:
+    """Delta journal for per-coin state dicts, checkpointed into the database"""
+
+    def __init__(self, path: str, apply: Callable[[int, Dict], None], batch_size: int = 64,
+                 sync_interval: float = 1.0, checkpoint_every: int = 5000,
+                 checkpoint_interval: float = 300.0, urgent_fields: Iterable[str] = ('position',)):
+        self.path = path
+        self.apply = apply
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_interval = checkpoint_interval
+        self.urgent_fields = frozenset(urgent_fields)
+        self._lock = threading.RLock()
+        self._state: Dict[int, Dict] = {}
+        self._dirty: Set[int] = set()
+        self._buffer: List[bytes] = []
+        self._seq = 0
+        self._records_since_checkpoint = 0
+        self._last_sync = time.monotonic()
+        self._last_checkpoint = time.monotonic()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'ab')
+
+    # -- writing
+
+    def track(self, coin_id: int, state: Dict, dirty: bool = False):
+        """Set the state deltas are computed against (e.g. right after loading a coin)"""
+        with self._lock:
+            self._state[coin_id] = dict(state)
+            if dirty:
+                self._dirty.add(coin_id)
+
+    def record(self, coin_id: int, state: Dict):
+        """Journal the fields of ``state`` that differ from the last recorded state"""
+        with self._lock:
+            known = self._state.setdefault(coin_id, {})
+            delta = {key: value for key, value in state.items() if known.get(key, _MISSING) != value}
+            if not delta:
+                return
+            known.update(delta)
+            self._dirty.add(coin_id)
+            self._seq += 1
+            self._records_since_checkpoint += 1
+            self._buffer.append(_encode({'s': self._seq, 'c': coin_id, 't': time.time(), 'd': delta}))
+
+            if self.urgent_fields.intersection(delta):
+                self.sync()
+                self._apply(coin_id)
+            elif len(self._buffer) >= self.batch_size or \
+                    time.monotonic() - self._last_sync >= self.sync_interval:
+                self.sync()
+
+    def sync(self):
+        """Write buffered deltas and fsync them"""
+        with self._lock:
+            if self._buffer:
+                self._file.write(b''.join(self._buffer))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._buffer.clear()
+            self._last_sync = time.monotonic()
+
+    def end_cycle(self):
+        """Sync, and checkpoint when enough deltas or time have accumulated"""
+        with self._lock:
+            self.sync()
+            if self._records_since_checkpoint >= self.checkpoint_every or \
+                    (self._dirty and time.monotonic() - self._last_checkpoint >= self.checkpoint_interval):
+                self.checkpoint()
+
+    def _apply(self, coin_id: int):
+        self.apply(coin_id, dict(self._state[coin_id]))
+        self._dirty.discard(coin_id)
+
+    def checkpoint(self):
+        """Fold every changed coin into the database and start an empty journal"""
+        with self._lock:
+            self.sync()
+            for coin_id in sorted(self._dirty):
+                self._apply(coin_id)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(_encode({'checkpoint': self._seq, 't': time.time()}))
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp, self.path)
+            _fsync_dir(self.path)
+            self._file = open(self.path, 'ab')
+            self._records_since_checkpoint = 0
+            self._last_checkpoint = time.monotonic()
+
+    def close(self, checkpoint: bool = True):
+        with self._lock:
+            if checkpoint:
+                self.checkpoint()
+            else:
+                self.sync()
+            self._file.close()
+
+    # -- recovery
+
+    def recover(self) -> Dict[int, Dict]:
+        """Fields changed per coin since the last checkpoint, read from the journal on disk
+
+        A corrupt or incomplete record ends the journal; it and anything after it
+        are cut off so new deltas are appended to a clean file.
+        """
+        with self._lock:
+            self.sync()
+            recovered: Dict[int, Dict] = {}
+            valid_bytes = 0
+            records = 0
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    record = _decode(line)
+                    if record is None:
+                        logger.warning(f"State journal {self.path}: dropping corrupt tail "
+                                       f"after {records} records")
+                        break
+                    valid_bytes += len(line)
+                    if 'checkpoint' in record:
+                        self._seq = max(self._seq, record['checkpoint'])
+                        continue
+                    records += 1
+                    self._seq = max(self._seq, record['s'])
+                    recovered.setdefault(record['c'], {}).update(record['d'])
+            if valid_bytes < os.path.getsize(self.path):
+                self._file.truncate(valid_bytes)
+                os.fsync(self._file.fileno())
+            for coin_id, fields in recovered.items():
+                self._state.setdefault(coin_id, {}).update(fields)
+            if records:
+                logger.info(f"State journal {self.path}: recovered {records} changes "
+                            f"for {len(recovered)} coins")
+            return recovered
+
+
+def _fsync_dir(path: str):
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # not supported on every platform/filesystem
+    finally:
+        os.close(fd)
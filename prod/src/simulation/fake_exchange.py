@@ -0,0 +1,592 @@
+"""Local stand-in for the Bitvavo REST and WebSocket API
+
+Serves the endpoints the bot uses (/time, /markets, /ticker/price, /ticker/24h,
+/ticker/book, /{market}/book, /order, /balance) plus the ``ticker``, ``ticker24h``
+and ``book`` WebSocket channels on the same port. Prices come from a feed that
+either simulates paths (MarketSimulator) or replays a TickStore; market orders
+walk a synthetic order book around the current quote and settle against an
+in-memory balance ledger. Latency, HTTP errors and Bitvavo error payloads can be
+injected to exercise retry paths.
+
+Point the bot at it with BITVAVO_REST_URL = 'http://127.0.0.1:<port>/v2' and
+BITVAVO_WS_URL = 'ws://127.0.0.1:<port>/ws' in the config.
+"""
+import base64
+import hashlib
+import itertools
+import json
+import logging
+import random
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from simulation.price_paths import MarketSimulator
+
+logger = logging.getLogger(__name__)
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+def time_ms() -> int:
+    return int(time.time() * 1000)
+
+
+# ---------------------------------------------------------------------- price feeds
+
+class SimulatedFeed:
+    """Quotes from a MarketSimulator; ``markets`` maps market -> start price"""
+
+    def __init__(self, markets: Dict[str, float], simulator: Optional[MarketSimulator] = None):
+        self.simulator = simulator or MarketSimulator()
+        self.start = dict(markets)
+
+    def markets(self) -> List[str]:
+        return list(self.start)
+
+    def quote(self, market: str) -> Tuple[float, float]:
+        return self.simulator.quote(market, start=self.start[market])
+
+    def advance(self):
+        self.simulator.advance()
+
+
+class ReplayFeed:
+    """Quotes replayed from a TickStore, wrapping around at the end of the recording"""
+
+    def __init__(self, tick_store, markets: Optional[Iterable[str]] = None):
+        self.views = {market: tick_store.read(market) for market in (markets or tick_store.markets())}
+        self.views = {market: view for market, view in self.views.items() if len(view.ts)}
+        self.step = 0
+
+    def markets(self) -> List[str]:
+        return list(self.views)
+
+    def quote(self, market: str) -> Tuple[float, float]:
+        view = self.views[market]
+        i = self.step % len(view.ts)
+        return float(view.bid[i]), float(view.ask[i])
+
+    def advance(self):
+        self.step += 1
+
+
+# ---------------------------------------------------------------------- exchange state
+
+class ExchangeError(Exception):
+    """Bitvavo-style error: HTTP status, errorCode and message"""
+
+    def __init__(self, status: int, code: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+class FakeExchange:
+    """Order books, balances and fills behind the fake HTTP/WebSocket API
+
+    The book for a market has ``depth`` levels per side, ``level_step`` apart
+    (relative), each holding ``level_quote`` EUR of liquidity. Liquidity taken by
+    fills is gone until the next ``advance()``, when the book is rebuilt around the
+    new quote.
+    """
+
+    def __init__(self, feed, balances: Optional[Dict[str, float]] = None, fee: float = 0.0025,
+                 depth: int = 25, level_step: float = 0.0005, level_quote: float = 5000.0):
+        self.feed = feed
+        self.balances = {'EUR': 10_000.0}
+        self.balances.update(balances or {})
+        self.fee = fee
+        self.depth = depth
+        self.level_step = level_step
+        self.level_quote = level_quote
+        self.orders: List[Dict] = []
+        self.nonce = 0
+        self._books: Dict[str, Dict[str, List[List[float]]]] = {}
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._ids = itertools.count(1)
+
+    # -- market data
+
+    def markets(self) -> List[str]:
+        return self.feed.markets()
+
+    def _check_market(self, market: str):
+        if market not in self.feed.markets():
+            raise ExchangeError(404, 205, f'{market} is not a supported market.')
+
+    def book(self, market: str) -> Dict[str, List[List[float]]]:
+        with self._lock:
+            self._check_market(market)
+            if market not in self._books:
+                bid, ask = self.feed.quote(market)
+                self._books[market] = {
+                    'bids': [[bid * (1 - self.level_step) ** k, self.level_quote / bid] for k in range(self.depth)],
+                    'asks': [[ask * (1 + self.level_step) ** k, self.level_quote / ask] for k in range(self.depth)],
+                }
+            return self._books[market]
+
+    def book_payload(self, market: str, depth: Optional[int] = None) -> Dict:
+        book = self.book(market)
+        depth = depth or self.depth
+        return {
+            'market': market,
+            'nonce': self.nonce,
+            'bids': [[_fmt(p), _fmt(s)] for p, s in book['bids'][:depth] if s > 0],
+            'asks': [[_fmt(p), _fmt(s)] for p, s in book['asks'][:depth] if s > 0],
+        }
+
+    def ticker_book(self, market: str) -> Dict:
+        book = self.book(market)
+        bid = next(level for level in book['bids'] if level[1] > 0)
+        ask = next(level for level in book['asks'] if level[1] > 0)
+        return {'market': market, 'bid': _fmt(bid[0]), 'bidSize': _fmt(bid[1]),
+                'ask': _fmt(ask[0]), 'askSize': _fmt(ask[1])}
+
+    def ticker_24h(self, market: str) -> Dict:
+        ticker = self.ticker_book(market)
+        last = (float(ticker['bid']) + float(ticker['ask'])) / 2
+        ticker.update({'open': _fmt(last), 'high': _fmt(last), 'low': _fmt(last), 'last': _fmt(last),
+                       'volume': '0', 'volumeQuote': '0', 'timestamp': time_ms()})
+        return ticker
+
+    def advance(self):
+        """Move every market to its next quote and push WebSocket updates"""
+        with self._lock:
+            self.feed.advance()
+            self._books.clear()
+            self.nonce += 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def subscribe(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    # -- trading
+
+    def balance(self, symbol: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            symbols = [symbol] if symbol else sorted(self.balances)
+            return [{'symbol': s, 'available': _fmt(self.balances.get(s, 0.0)), 'inOrder': '0'}
+                    for s in symbols]
+
+    def place_order(self, body: Dict) -> Dict:
+        market = body.get('market')
+        side = body.get('side')
+        if body.get('orderType') != 'market':
+            raise ExchangeError(400, 203, 'Only market orders are supported by the fake exchange.')
+        if side not in ('buy', 'sell'):
+            raise ExchangeError(400, 203, 'side must be buy or sell.')
+        amount = float(body['amount']) if body.get('amount') else None
+        amount_quote = float(body['amountQuote']) if body.get('amountQuote') else None
+        if (amount is None) == (amount_quote is None):
+            raise ExchangeError(400, 203, 'Specify exactly one of amount or amountQuote.')
+
+        with self._lock:
+            self._check_market(market)
+            base, quote = market.split('-')
+            levels = self.book(market)['asks' if side == 'buy' else 'bids']
+
+            fills = []
+            remaining_base, remaining_quote = amount, amount_quote
+            for level in levels:
+                price, size = level
+                if size <= 0:
+                    continue
+                take = size
+                if remaining_base is not None:
+                    take = min(take, remaining_base)
+                else:
+                    take = min(take, remaining_quote / price)
+                if take <= 0:
+                    break
+                fills.append((level, take))
+                level[1] -= take
+                if remaining_base is not None:
+                    remaining_base -= take
+                    if remaining_base <= 1e-12:
+                        break
+                else:
+                    remaining_quote -= take * price
+                    if remaining_quote <= 1e-9:
+                        break
+            filled = sum(size for _, size in fills)
+            filled_quote = sum(level[0] * size for level, size in fills)
+            fee_paid = filled_quote * self.fee
+
+            if side == 'buy':
+                cost = filled_quote + fee_paid
+                if cost > self.balances.get(quote, 0.0) + 1e-9:
+                    self._restore(fills)
+                    raise ExchangeError(400, 216, 'You do not have sufficient balance to complete this operation.')
+                self.balances[quote] = self.balances.get(quote, 0.0) - cost
+                self.balances[base] = self.balances.get(base, 0.0) + filled
+            else:
+                if filled > self.balances.get(base, 0.0) + 1e-12:
+                    self._restore(fills)
+                    raise ExchangeError(400, 216, 'You do not have sufficient balance to complete this operation.')
+                self.balances[base] = self.balances.get(base, 0.0) - filled
+                self.balances[quote] = self.balances.get(quote, 0.0) + filled_quote - fee_paid
+
+            now = time_ms()
+            order = {
+                'orderId': str(uuid.uuid4()),
+                'market': market,
+                'created': now,
+                'updated': now,
+                'status': 'filled',
+                'side': side,
+                'orderType': 'market',
+                'amount': _fmt(filled),
+                'amountRemaining': '0',
+                'filledAmount': _fmt(filled),
+                'filledAmountQuote': _fmt(filled_quote),
+                'feePaid': _fmt(fee_paid),
+                'feeCurrency': quote,
+                'fills': [{'id': str(next(self._ids)), 'timestamp': now, 'amount': _fmt(size),
+                           'price': _fmt(level[0]), 'taker': True,
+                           'fee': _fmt(level[0] * size * self.fee), 'feeCurrency': quote, 'settled': True}
+                          for level, size in fills],
+                'selfTradePrevention': 'decrementAndCancel',
+                'visible': False,
+                'timeInForce': 'IOC',
+            }
+            if body.get('operatorId') is not None:
+                order['operatorId'] = body['operatorId']
+            self.orders.append(order)
+            return order
+
+    @staticmethod
+    def _restore(fills):
+        """Put liquidity back after a rejected order"""
+        for level, size in fills:
+            level[1] += size
+
+
+def _fmt(value: float) -> str:
+    return f'{value:.10g}'
+
+
+# ---------------------------------------------------------------------- fault injection
+
+class Faults:
+    """Latency and error injection shared by all requests
+
+    ``latency`` is a fixed delay or a (low, high) range in seconds. ``error_rate``
+    is the probability of answering with ``error_status``. ``fail_next(n)`` makes
+    the next n requests fail deterministically.
+    """
+
+    def __init__(self, latency=0.0, error_rate: float = 0.0, error_status: int = 500, seed: Optional[int] = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._forced: List[Tuple[int, int, str]] = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fail_next(self, n: int = 1, status: int = 500, code: int = 101, message: str = 'Unknown error.'):
+        with self._lock:
+            self._forced.extend([(status, code, message)] * n)
+
+    def apply(self):
+        delay = self.latency
+        if isinstance(delay, tuple):
+            delay = self._rng.uniform(*delay)
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            if self._forced:
+                status, code, message = self._forced.pop(0)
+                raise ExchangeError(status, code, message)
+            if self.error_rate and self._rng.random() < self.error_rate:
+                raise ExchangeError(self.error_status, 101, 'Injected error.')
+
+
+# ---------------------------------------------------------------------- HTTP + WebSocket
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def exchange(self) -> FakeExchange:
+        return self.server.exchange
+
+    def _send(self, status: int, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('bitvavo-ratelimit-remaining', '1000')
+        self.send_header('bitvavo-ratelimit-resetat', str(time_ms() + 60_000))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, method: str):
+        self.server.requests += 1
+        url = urlparse(self.path)
+        path = url.path
+        if path.startswith('/v2'):
+            path = path[3:]
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        try:
+            self.server.faults.apply()
+            self._send(200, self._route(method, path, query))
+        except ExchangeError as e:
+            self._send(e.status, {'errorCode': e.code, 'error': e.message})
+        except (KeyError, ValueError, json.JSONDecodeError) as e:
+            self._send(400, {'errorCode': 203, 'error': f'Bad request: {e}'})
+
+    def _route(self, method: str, path: str, query: Dict):
+        exchange = self.exchange
+        market = query.get('market')
+        if method == 'GET':
+            if path == '/time':
+                return {'time': time_ms()}
+            if path == '/markets':
+                return [{'market': m, 'status': 'trading', 'base': m.split('-')[0], 'quote': m.split('-')[1]}
+                        for m in exchange.markets()]
+            if path in ('/ticker/24h', '/ticker/book', '/ticker/price'):
+                if path == '/ticker/24h':
+                    render = exchange.ticker_24h
+                elif path == '/ticker/book':
+                    render = exchange.ticker_book
+                else:
+                    render = lambda m: {'market': m, 'price': exchange.ticker_24h(m)['last']}
+                if market:
+                    return render(market)
+                return [render(m) for m in exchange.markets()]
+            if path.endswith('/book'):
+                depth = int(query['depth']) if 'depth' in query else None
+                return exchange.book_payload(path.strip('/').split('/')[0], depth)
+            if path == '/balance':
+                return exchange.balance(query.get('symbol'))
+        elif method == 'POST' and path == '/order':
+            length = int(self.headers.get('Content-Length') or 0)
+            return exchange.place_order(json.loads(self.rfile.read(length) or b'{}'))
+        raise ExchangeError(404, 110, f'Invalid endpoint: {method} {path}')
+
+    def do_GET(self):
+        if self.headers.get('Upgrade', '').lower() == 'websocket':
+            self._websocket()
+        else:
+            self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    # -- WebSocket (RFC 6455, text frames only)
+
+    def _websocket(self):
+        key = self.headers['Sec-WebSocket-Key']
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        self.send_response(101, 'Switching Protocols')
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept)
+        self.end_headers()
+        self.wfile.flush()
+
+        session = _WsSession(self)
+        self.exchange.subscribe(session.push)
+        try:
+            while True:
+                message = session.receive()
+                if message is None:
+                    break
+                session.handle(message)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.exchange.unsubscribe(session.push)
+        self.close_connection = True
+
+
+class _WsSession:
+    """Subscriptions and framing for one WebSocket connection"""
+
+    CHANNELS = ('ticker', 'ticker24h', 'book')
+
+    def __init__(self, handler: _Handler):
+        self.handler = handler
+        self.exchange = handler.exchange
+        self.subscriptions: Dict[str, set] = {}
+        self._write_lock = threading.Lock()
+
+    def send(self, payload: Dict):
+        data = json.dumps(payload).encode()
+        header = bytes([0x81])
+        if len(data) < 126:
+            header += bytes([len(data)])
+        elif len(data) < 1 << 16:
+            header += bytes([126]) + struct.pack('!H', len(data))
+        else:
+            header += bytes([127]) + struct.pack('!Q', len(data))
+        with self._write_lock:
+            self.handler.wfile.write(header + data)
+            self.handler.wfile.flush()
+
+    def receive(self) -> Optional[str]:
+        rfile = self.handler.rfile
+        while True:
+            head = rfile.read(2)
+            if len(head) < 2:
+                return None
+            opcode = head[0] & 0x0F
+            length = head[1] & 0x7F
+            if length == 126:
+                length = struct.unpack('!H', rfile.read(2))[0]
+            elif length == 127:
+                length = struct.unpack('!Q', rfile.read(8))[0]
+            mask = rfile.read(4) if head[1] & 0x80 else b'\0\0\0\0'
+            data = bytes(b ^ mask[i % 4] for i, b in enumerate(rfile.read(length)))
+            if opcode == 0x8:
+                return None
+            if opcode == 0x9:  # ping -> pong
+                with self._write_lock:
+                    self.handler.wfile.write(bytes([0x8A, len(data)]) + data)
+                    self.handler.wfile.flush()
+                continue
+            if opcode == 0x1:
+                return data.decode()
+
+    def handle(self, message: str):
+        try:
+            request = json.loads(message)
+        except json.JSONDecodeError:
+            self.send({'event': 'error', 'error': 'Invalid JSON'})
+            return
+        action = request.get('action')
+        if action in ('subscribe', 'unsubscribe'):
+            for channel in request.get('channels', []):
+                name = channel.get('name')
+                if name not in self.CHANNELS:
+                    self.send({'action': action, 'errorCode': 203, 'error': f'Unknown channel {name}'})
+                    continue
+                markets = set(channel.get('markets', []))
+                if action == 'subscribe':
+                    self.subscriptions.setdefault(name, set()).update(markets)
+                else:
+                    self.subscriptions.get(name, set()).difference_update(markets)
+            self.send({'event': f'{action}d',
+                       'subscriptions': {name: sorted(m) for name, m in self.subscriptions.items() if m}})
+            if action == 'subscribe':
+                self.push()
+        elif action == 'getTickerBook':
+            self.send({'action': action, 'response': self.exchange.ticker_book(request['market'])})
+        elif action == 'getBook':
+            self.send({'action': action, 'response': self.exchange.book_payload(request['market'])})
+        elif action == 'getTime':
+            self.send({'action': action, 'response': {'time': time_ms()}})
+        else:
+            self.send({'action': action, 'errorCode': 110, 'error': f'Unknown action {action}'})
+
+    def push(self):
+        try:
+            for market in sorted(self.subscriptions.get('ticker', ())):
+                ticker = self.exchange.ticker_book(market)
+                self.send({'event': 'ticker', 'market': market, 'bestBid': ticker['bid'],
+                           'bestBidSize': ticker['bidSize'], 'bestAsk': ticker['ask'],
+                           'bestAskSize': ticker['askSize']})
+            if self.subscriptions.get('ticker24h'):
+                self.send({'event': 'ticker24h',
+                           'data': [self.exchange.ticker_24h(m) for m in sorted(self.subscriptions['ticker24h'])]})
+            for market in sorted(self.subscriptions.get('book', ())):
+                payload = self.exchange.book_payload(market)
+                payload['event'] = 'book'
+                self.send(payload)
+        except (ConnectionError, OSError, ValueError):
+            self.exchange.unsubscribe(self.push)
+
+
+class FakeExchangeServer(ThreadingHTTPServer):
+    """HTTP/WebSocket server around a FakeExchange
+
+    With ``tick_interval`` set, a background thread advances prices on that period;
+    otherwise call ``exchange.advance()`` yourself.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, exchange: FakeExchange, host: str = '127.0.0.1', port: int = 0,
+                 faults: Optional[Faults] = None, tick_interval: Optional[float] = None):
+        super().__init__((host, port), _Handler)
+        self.exchange = exchange
+        self.faults = faults or Faults()
+        self.tick_interval = tick_interval
+        self.requests = 0
+        self._workers: List[threading.Thread] = []
+        self._stopped = threading.Event()
+
+    @property
+    def rest_url(self) -> str:
+        return f'http://{self.server_address[0]}:{self.server_address[1]}/v2'
+
+    @property
+    def ws_url(self) -> str:
+        return f'ws://{self.server_address[0]}:{self.server_address[1]}/ws'
+
+    def _ticker(self):
+        while not self._stopped.wait(self.tick_interval):
+            self.exchange.advance()
+
+    def start(self) -> 'FakeExchangeServer':
+        self._workers.append(threading.Thread(target=self.serve_forever, daemon=True))
+        if self.tick_interval:
+            self._workers.append(threading.Thread(target=self._ticker, daemon=True))
+        for thread in self._workers:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a local fake Bitvavo exchange')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--markets', default='BTC-EUR:60000,ETH-EUR:3000,ADA-EUR:0.4',
+                        help='comma separated MARKET:START_PRICE for simulated prices')
+    parser.add_argument('--ticks', default=None, help='replay this TickStore directory instead')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tick-interval', type=float, default=1.0)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.ticks:
+        from market_data.tick_store import TickStore
+        feed = ReplayFeed(TickStore(args.ticks))
+    else:
+        starts = {m: float(p) for m, p in (item.split(':') for item in args.markets.split(','))}
+        feed = SimulatedFeed(starts, MarketSimulator(seed=args.seed))
+    server = FakeExchangeServer(FakeExchange(feed), port=args.port,
+                                faults=Faults(latency=args.latency, error_rate=args.error_rate),
+                                tick_interval=args.tick_interval).start()
+    logger.info(f"Fake exchange on {server.rest_url} / {server.ws_url} with {len(feed.markets())} markets")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,132 @@
+"""Seeded, vectorized price-path generators for test mode and Monte Carlo runs
+
+All generators return an array of shape ``(n_paths, n_steps + 1)`` starting at
+``s0``, with volatility and drift expressed per step (one step is one trading
+cycle in test mode, one bar in a backtest). The same seed always produces the
+same paths.
+"""
+import zlib
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+MODELS = ('gbm', 'jump', 'bootstrap')
+
+
+def _rng(seed) -> np.random.Generator:
+    return seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+
+def _from_log_returns(s0: float, log_returns: np.ndarray) -> np.ndarray:
+    paths = np.empty((log_returns.shape[0], log_returns.shape[1] + 1))
+    paths[:, 0] = 0.0
+    np.cumsum(log_returns, axis=1, out=paths[:, 1:])
+    np.exp(paths, out=paths)
+    paths *= s0
+    return paths
+
+
+def gbm_paths(s0: float, n_steps: int, n_paths: int = 1, sigma: float = 0.005,
+              mu: float = 0.0, seed=None) -> np.ndarray:
+    """Geometric Brownian motion"""
+    rng = _rng(seed)
+    log_returns = rng.normal(mu - 0.5 * sigma ** 2, sigma, size=(n_paths, n_steps))
+    return _from_log_returns(s0, log_returns)
+
+
+def jump_diffusion_paths(s0: float, n_steps: int, n_paths: int = 1, sigma: float = 0.005,
+                         mu: float = 0.0, jump_rate: float = 0.002, jump_mean: float = -0.02,
+                         jump_std: float = 0.04, seed=None) -> np.ndarray:
+    """Merton jump-diffusion: GBM plus Poisson jumps with normal log-sizes
+
+    ``jump_rate`` is the expected number of jumps per step.
+    """
+    rng = _rng(seed)
+    log_returns = rng.normal(mu - 0.5 * sigma ** 2, sigma, size=(n_paths, n_steps))
+    jumps = rng.poisson(jump_rate, size=(n_paths, n_steps))
+    if jumps.any():
+        # Sum of k normal jumps is normal with k * mean, sqrt(k) * std
+        log_returns += jumps * jump_mean + np.sqrt(jumps) * jump_std * rng.standard_normal((n_paths, n_steps))
+    return _from_log_returns(s0, log_returns)
+
+
+def bootstrap_paths(s0: float, n_steps: int, history: Sequence[float], n_paths: int = 1,
+                    block: int = 1, seed=None) -> np.ndarray:
+    """Resample log returns of a historical price series in blocks of ``block`` steps
+
+    Blocks keep short-range structure such as volatility clustering intact.
+    """
+    rng = _rng(seed)
+    history = np.asarray(history, dtype=np.float64)
+    returns = np.diff(np.log(history))
+    if len(returns) < block:
+        raise ValueError(f"Need at least {block + 1} historical prices, got {len(history)}")
+    n_blocks = -(-n_steps // block)
+    starts = rng.integers(0, len(returns) - block + 1, size=(n_paths, n_blocks))
+    index = (starts[:, :, None] + np.arange(block)).reshape(n_paths, -1)[:, :n_steps]
+    return _from_log_returns(s0, returns[index])
+
+
+def generate_paths(model: str, s0: float, n_steps: int, n_paths: int = 1, seed=None, **params) -> np.ndarray:
+    if model == 'gbm':
+        return gbm_paths(s0, n_steps, n_paths, seed=seed, **params)
+    if model == 'jump':
+        return jump_diffusion_paths(s0, n_steps, n_paths, seed=seed, **params)
+    if model == 'bootstrap':
+        return bootstrap_paths(s0, n_steps, n_paths=n_paths, seed=seed, **params)
+    raise ValueError(f"Unknown price model {model!r}, expected one of {MODELS}")
+
+
+class MarketSimulator:
+    """One simulated price path per market, shared by every rung of that market
+
+    Each market gets its own random stream derived from ``seed`` and the market
+    name, so a market's path does not depend on which other markets are simulated
+    or in which order they are asked for. Paths are generated in chunks as the
+    simulation advances. ``advance()`` moves all markets one step; until then every
+    caller sees the same price.
+    """
+
+    def __init__(self, model: str = 'gbm', seed: int = 0, spread: float = 0.001,
+                 chunk: int = 4096, **params):
+        if model not in MODELS:
+            raise ValueError(f"Unknown price model {model!r}, expected one of {MODELS}")
+        if model == 'bootstrap' and 'history' not in params:
+            raise ValueError("Price model 'bootstrap' resamples historical prices; pass history=[...]")
+        self.model = model
+        self.seed = seed
+        self.spread = spread
+        self.chunk = chunk
+        self.params = params
+        self.step = 0
+        self._paths: Dict[str, np.ndarray] = {}
+        self._rngs: Dict[str, np.random.Generator] = {}
+
+    def _extend(self, market: str, start: float):
+        path = self._paths.get(market)
+        if path is None:
+            self._rngs[market] = np.random.default_rng([self.seed, zlib.crc32(market.encode())])
+            path = np.array([start])
+        while len(path) <= self.step:
+            more = generate_paths(self.model, path[-1], self.chunk, 1, seed=self._rngs[market], **self.params)[0, 1:]
+            path = np.concatenate([path, more])
+        self._paths[market] = path
+
+    def price(self, market: str, start: Optional[float] = None) -> float:
+        """Mid price of ``market`` at the current step
+
+        ``start`` is the price at step 0 for a market seen for the first time.
+        """
+        if market not in self._paths or len(self._paths[market]) <= self.step:
+            if market not in self._paths and start is None:
+                raise KeyError(f"No start price for simulated market {market}")
+            self._extend(market, start)
+        return float(self._paths[market][self.step])
+
+    def quote(self, market: str, start: Optional[float] = None):
+        """(bid, ask) around the simulated mid price"""
+        mid = self.price(market, start)
+        return mid * (1 - self.spread / 2), mid * (1 + self.spread / 2)
+
+    def advance(self, steps: int = 1):
+        self.step += steps
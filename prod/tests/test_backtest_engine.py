@@ -0,0 +1,216 @@
+"""
+Golden tests for the vectorized ladder backtester.
+
+MockCoin below is a tick-by-tick copy of Coin.check_action (test mode, no database):
+temp_high/temp_low tracking, gain trigger, trailing stop, the "stijgende markt"
+buy gate and the proceeds strategies. The engine must reproduce its trades and
+final rung state exactly on random price paths.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import time
+import unittest
+
+import numpy as np
+
+from backtest.engine import (LadderBacktest, proceeds_new_buy_amount, quotes_from_bars,
+                             run_backtest, sell_amount_eur)
+
+
+class MockCoin:
+    """Scalar replica of Coin (prod/src/coin.py) for one rung"""
+
+    def __init__(self, row, ladder):
+        self.ladder = ladder
+        self.current_price = row['current_price']
+        self.gain = row['gain']
+        self.trail = row['trail']
+        self.transactie_bedrag = row['transactie_bedrag']
+        self.position = row['position'] == 'Y'
+        self.temp_high = self.high = row['temp_high']
+        self.temp_low = self.low = row['temp_low']
+        self.number_deals = row.get('number_deals', 0)
+        self.last_buy_price = row.get('last_buy_price', 0.0)
+        self.proceeds_strategy = row.get('proceeds_strategy', 'eur')
+        self.proceeds_crypto_ratio = row.get('proceeds_crypto_ratio', 0.5)
+        self.buy_signal = self.sell_signal = False
+        self.trail_stop_buy_drempel = self.trail_stop_sell_drempel = 0.0
+        self.sell_drempel = self.current_price * (1 + self.gain)
+        self.buy_drempel = self.current_price * (1 - self.gain)
+
+    def init_signals(self, bid, ask):
+        if self.position:
+            if self.temp_high >= self.sell_drempel:
+                if bid >= self.sell_drempel:
+                    self.sell_signal = True
+                else:
+                    self.temp_high = self.high = bid
+        elif self.temp_low < self.buy_drempel:
+            if ask <= self.buy_drempel:
+                self.buy_signal = True
+                self.trail_stop_buy_drempel = self.temp_low * (1 + self.trail)
+            else:
+                self.temp_low = self.low = ask
+
+    def check_action(self, t, bid, ask, trades):
+        if not self.position:
+            coins_in_bezit = [c for c in self.ladder if c.position]
+            if coins_in_bezit and ask > min(c.current_price for c in coins_in_bezit):
+                return
+
+        if self.position:
+            if bid > self.temp_high:
+                self.temp_high = bid
+                if bid > self.high:
+                    self.high = bid
+                if self.high >= self.sell_drempel:
+                    self.sell_signal = True
+                    self.trail_stop_sell_drempel = self.temp_high * (1 - self.trail)
+            if self.sell_signal and bid <= self.trail_stop_sell_drempel:
+                total = sell_amount_eur(self.proceeds_strategy, self.transactie_bedrag,
+                                        self.last_buy_price, bid, self.proceeds_crypto_ratio)
+                trades.append((t, self, 'sell', bid))
+                self.sell_signal = False
+                self.number_deals += 1
+                new_buy = proceeds_new_buy_amount(self.proceeds_strategy, total, self.transactie_bedrag)
+                if new_buy > 0:
+                    self.transactie_bedrag = new_buy
+                    trades.append((t, self, 'buy', ask))
+                    self.last_buy_price = ask
+                    self.high = self.temp_high = self.low = self.temp_low = ask
+                else:
+                    self.position = False
+                    if self.proceeds_strategy == 'split':
+                        self.transactie_bedrag = total
+                    self.low = self.temp_low = self.high = self.temp_high = self.current_price
+                    self.last_buy_price = 0.0
+        else:
+            if ask < self.temp_low:
+                self.temp_low = ask
+                if ask < self.low:
+                    self.low = ask
+                if self.low < self.buy_drempel:
+                    self.buy_signal = True
+                    self.trail_stop_buy_drempel = self.temp_low * (1 + self.trail)
+            if self.buy_signal and self.trail_stop_buy_drempel <= ask:
+                trades.append((t, self, 'buy', ask))
+                self.buy_signal = False
+                self.position = True
+                self.high = self.temp_high = self.low = self.temp_low = self.current_price
+                self.number_deals += 1
+                self.last_buy_price = ask
+
+
+def run_reference(rows, bid, ask):
+    ladder = []
+    for row in rows:
+        ladder.append(MockCoin(row, ladder))
+    for coin in ladder:
+        coin.init_signals(bid[0], ask[0])
+    trades = []
+    for t in range(len(bid)):
+        for coin in ladder:
+            coin.check_action(t, bid[t], ask[t], trades)
+    return ladder, [(t, ladder.index(c), side, price) for t, c, side, price in trades]
+
+
+def make_ladder(low, high, step, gain=0.03, trail=0.01, strategy='eur', owned_above=None):
+    rows = []
+    for k, price in enumerate(np.arange(low, high, step)):
+        owned = owned_above is not None and price >= owned_above
+        rows.append({
+            'index_num': k, 'current_price': float(price), 'gain': gain, 'trail': trail,
+            'transactie_bedrag': 10.0, 'position': 'Y' if owned else 'N',
+            'temp_high': float(price), 'temp_low': float(price), 'number_deals': 0,
+            'last_buy_price': float(price) if owned else 0.0,
+            'proceeds_strategy': strategy, 'proceeds_crypto_ratio': 0.5,
+        })
+    return rows
+
+
+def random_walk(n, seed, start=100.0, vol=0.004, spread=0.001):
+    rng = np.random.default_rng(seed)
+    mid = start * np.exp(np.cumsum(rng.normal(0, vol, n)))
+    return mid * (1 - spread / 2), mid * (1 + spread / 2)
+
+
+class TestBacktestGolden(unittest.TestCase):
+    """Engine versus tick-by-tick replica of Coin.check_action"""
+
+    def assert_matches_reference(self, rows, bid, ask):
+        ladder, ref_trades = run_reference(rows, bid, ask)
+        result = LadderBacktest(rows, fee=0.0, slippage=0.0).run(bid, ask)
+
+        got = [(int(t['tick']), int(t['rung']), str(t['side']), float(t['price'])) for t in result.trades]
+        self.assertEqual(got, ref_trades)
+        for coin, state in zip(ladder, result.final_state):
+            self.assertEqual(state['position'], 'Y' if coin.position else 'N')
+            self.assertEqual(state['temp_high'], coin.temp_high)
+            self.assertEqual(state['temp_low'], coin.temp_low)
+            self.assertEqual(state['number_deals'], coin.number_deals)
+            self.assertEqual(state['last_buy_price'], coin.last_buy_price)
+            self.assertEqual(state['transactie_bedrag'], coin.transactie_bedrag)
+            self.assertEqual(state['buy_signal'], coin.buy_signal)
+            self.assertEqual(state['sell_signal'], coin.sell_signal)
+        return result
+
+    def test_eur_strategy_random_walks(self):
+        for seed in range(6):
+            bid, ask = random_walk(5000, seed)
+            rows = make_ladder(80, 125, 2.5, owned_above=104)
+            result = self.assert_matches_reference(rows, bid, ask)
+            self.assertGreater(len(result.trades), 0)
+
+    def test_crypto_and_split_strategies(self):
+        for strategy in ('crypto', 'split'):
+            for seed in range(4):
+                bid, ask = random_walk(4000, 100 + seed)
+                rows = make_ladder(85, 120, 2.0, gain=0.02, trail=0.005, strategy=strategy, owned_above=101)
+                self.assert_matches_reference(rows, bid, ask)
+
+    def test_zero_trail_buys_on_trigger_tick(self):
+        bid, ask = random_walk(3000, 7)
+        rows = make_ladder(90, 110, 1.0, gain=0.01, trail=0.0)
+        self.assert_matches_reference(rows, bid, ask)
+
+    def test_restart_with_active_signals(self):
+        bid, ask = random_walk(3000, 11)
+        rows = make_ladder(92, 108, 4.0, owned_above=100)
+        rows[0]['temp_low'] = rows[0]['current_price'] * 0.9     # buy signal was active
+        rows[-1]['temp_high'] = rows[-1]['current_price'] * 1.2  # sell signal was active
+        self.assert_matches_reference(rows, bid, ask)
+
+
+class TestBacktestAccounting(unittest.TestCase):
+
+    def test_fees_and_slippage_reduce_profit(self):
+        bid, ask = random_walk(20000, 3)
+        rows = make_ladder(80, 125, 2.5, owned_above=104)
+        free = run_backtest(rows, bid, ask, fee=0.0, slippage=0.0)
+        costly = run_backtest(rows, bid, ask, fee=0.0025, slippage=0.001)
+        self.assertGreater(free.profit, costly.profit)
+        self.assertGreater(costly.fees, 0)
+        self.assertGreater(free.capital_utilisation, 0)
+        self.assertLessEqual(free.capital_utilisation, 1.5)
+
+    def test_quotes_from_bars(self):
+        bid, ask, ts = quotes_from_bars([10, 10], [12, 11], [9, 8], [11, 9], spread=0.0, ts=[0, 60])
+        self.assertEqual(list(bid), [10, 9, 12, 11, 10, 11, 8, 9])
+        self.assertEqual(list(ts), [0, 0, 0, 0, 60, 60, 60, 60])
+
+    def test_year_of_minutes_runs_in_seconds(self):
+        bid, ask = random_walk(525_600, 5, vol=0.0008)
+        rows = make_ladder(60, 160, 2.0)  # 50 rungs
+        start = time.perf_counter()
+        result = run_backtest(rows, bid, ask)
+        elapsed = time.perf_counter() - start
+        self.assertLess(elapsed, 20.0)
+        self.assertGreater(len(result.trades), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,83 @@
+"""
+Test the parallel parameter sweep: shared-memory workers, streamed results and resume.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import tempfile
+import unittest
+
+import numpy as np
+
+from backtest.engine import run_backtest
+from backtest.sweep import ParameterSweep, build_ladder, grid, params_key, random_search
+
+
+def random_walk(n, seed, start=100.0, vol=0.004, spread=0.001):
+    rng = np.random.default_rng(seed)
+    mid = start * np.exp(np.cumsum(rng.normal(0, vol, n)))
+    return mid * (1 - spread / 2), mid * (1 + spread / 2)
+
+
+class TestParameterSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, 'sweep.db')
+        self.bid, self.ask = random_walk(5000, 1)
+        self.ladder = {'low': 85.0, 'high': 120.0, 'amount': 10.0, 'owned_above': 101.0}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_build_ladder_geometric(self):
+        rows = build_ladder(100, 110, 0.02, 0.03, 0.01, owned_above=105)
+        prices = [row['current_price'] for row in rows]
+        self.assertEqual(len(rows), 5)
+        self.assertAlmostEqual(prices[1] / prices[0], 1.02)
+        self.assertEqual([row['position'] for row in rows], ['N', 'N', 'N', 'Y', 'Y'])
+        for low, spacing in ((0.0, 0.02), (100, 0.0), (100, -0.01)):
+            with self.assertRaises(ValueError):
+                build_ladder(low, 110, spacing, 0.03, 0.01)
+
+    def test_grid_and_random_search(self):
+        space = {'gain': [0.02, 0.03], 'trail': [0.005, 0.01], 'proceeds_strategy': ['eur', 'crypto']}
+        self.assertEqual(len(list(grid(space))), 8)
+        first = list(random_search({'gain': (0.01, 0.05), 'trail': [0.01]}, 5, seed=3))
+        again = list(random_search({'gain': (0.01, 0.05), 'trail': [0.01]}, 5, seed=3))
+        self.assertEqual(first, again)
+        self.assertTrue(all(0.01 <= p['gain'] <= 0.05 for p in first))
+
+    def test_results_match_direct_backtest_and_resume(self):
+        space = {'gain': [0.02, 0.03], 'trail': [0.005], 'spacing': [0.02],
+                 'proceeds_strategy': ['eur', 'split']}
+        sweep = ParameterSweep('t', self.bid, self.ask, self.ladder, self.db, workers=2)
+        self.assertEqual(sweep.run(grid(space)), 4)
+
+        results = sweep.results()
+        self.assertEqual(len(results), 4)
+        best = results[0]
+        rows = build_ladder(85.0, 120.0, best['spacing'], best['gain'], best['trail'], amount=10.0,
+                            proceeds_strategy=best['proceeds_strategy'], owned_above=101.0)
+        direct = run_backtest(rows, self.bid, self.ask)
+        self.assertAlmostEqual(best['profit'], direct.profit)
+        self.assertEqual(best['deals'], direct.deals)
+
+        # A restarted sweep only runs what is missing
+        space['trail'] = [0.005, 0.01]
+        sweep.close()
+        resumed = ParameterSweep('t', self.bid, self.ask, self.ladder, self.db, workers=2)
+        self.assertEqual(resumed.run(grid(space)), 4)
+        self.assertEqual(resumed.run(grid(space)), 0)
+        self.assertEqual(len(resumed.completed()), 8)
+        self.assertIn(params_key({'gain': 0.02, 'trail': 0.01, 'spacing': 0.02,
+                                  'proceeds_strategy': 'eur', 'proceeds_crypto_ratio': 0.5}),
+                      resumed.completed())
+        resumed.close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,81 @@
+"""
+Test the streaming bar builder: OHLCV aggregation per interval, the ring buffer,
+publishing finished bars and closing bars when time passes without quotes.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import unittest
+
+from market_data.bars import BarBuilder, BarSeries
+
+T0 = 1_700_000_100_000  # start of a 5-minute period
+
+
+class TestBarSeries(unittest.TestCase):
+
+    def test_ring_buffer_keeps_the_newest_bars(self):
+        series = BarSeries(60_000, capacity=3)
+        for minute in range(5):
+            series.add(T0 + minute * 60_000, float(minute))
+        series.close()
+        bars = series.bars()
+        self.assertEqual(list(bars['ts']), [T0 + 120_000, T0 + 180_000, T0 + 240_000])
+        self.assertEqual(list(bars['close']), [2.0, 3.0, 4.0])
+
+
+class TestBarBuilder(unittest.TestCase):
+
+    def setUp(self):
+        self.builder = BarBuilder(('1m', '5m'))
+        self.published = []
+        self.builder.subscribe(lambda market, interval, bar: self.published.append((market, interval, bar)))
+
+    def test_ohlcv_per_interval(self):
+        for offset, price in ((0, 10.0), (10_000, 12.0), (20_000, 9.0), (50_000, 11.0), (65_000, 13.0)):
+            self.builder.update('BTC-EUR', price, T0 + offset)
+        self.assertEqual(self.published, [('BTC-EUR', '1m', (T0, 10.0, 12.0, 9.0, 11.0, 4.0))])
+        self.assertEqual(self.builder.current('BTC-EUR', '5m'), (T0, 10.0, 13.0, 9.0, 13.0, 5.0))
+
+        # The 5m bar closes with the first quote of the next period
+        self.builder.update('BTC-EUR', 14.0, T0 + 300_000)
+        self.assertEqual([(interval, bar[0]) for _, interval, bar in self.published[1:]],
+                         [('1m', T0 + 60_000), ('5m', T0)])
+        self.assertEqual(len(self.builder.bars('BTC-EUR', '1m')), 2)
+
+    def test_repeated_quotes_are_ignored_and_flush_closes_bars(self):
+        self.builder.update_quotes({'ETH-EUR': (3000.0, 2999.0, 3001.0, T0 / 1000)})
+        self.builder.update_quotes({'ETH-EUR': (3005.0, 3004.0, 3006.0, T0 / 1000)})  # same ticker again
+        self.builder.update_quotes({'ETH-EUR': (float('nan'), 0.0, 0.0, T0 / 1000 + 1)})
+        self.assertEqual(self.builder.current('ETH-EUR', '1m')[5], 1.0)
+
+        self.builder.flush(T0 + 59_999)
+        self.assertEqual(self.published, [])
+        self.builder.flush(T0 + 60_000)
+        self.assertEqual([interval for _, interval, _ in self.published], ['1m'])
+        self.assertIsNone(self.builder.current('ETH-EUR', '1m'))
+        self.assertEqual(self.builder.markets(), ['ETH-EUR'])
+
+    def test_failing_subscriber_does_not_stop_others(self):
+        def broken(market, interval, bar):
+            raise RuntimeError('boom')
+        builder = BarBuilder(('1m',))
+        seen = []
+        builder.subscribe(broken)
+        builder.subscribe(lambda *args: seen.append(args), market='BTC-EUR', interval='1m')
+        builder.subscribe(lambda *args: seen.append(args), market='ETH-EUR')
+        with self.assertLogs('market_data.bars', level='WARNING'):
+            builder.update('BTC-EUR', 1.0, T0)
+            builder.update('BTC-EUR', 2.0, T0 + 60_000)
+        self.assertEqual(len(seen), 1)
+
+    def test_unknown_interval(self):
+        with self.assertRaises(ValueError):
+            BarBuilder(('7m',))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
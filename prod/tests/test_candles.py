@@ -0,0 +1,136 @@
+"""
+Test the candle cache and downloader against a local stand-in for the Bitvavo candles endpoint.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from market_data.candles import (CandleCache, CandleDownloader, RateBudget, merge_ranges,
+                                 missing_ranges)
+
+MINUTE = 60_000
+T0 = 1_700_000_000_000 // 86_400_000 * 86_400_000  # midnight, aligned to every interval
+
+
+class FakeCandleHandler(BaseHTTPRequestHandler):
+    """Serves one candle per interval with close = intervals since T0, newest first like Bitvavo"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        market = url.path.strip('/').split('/')[0]
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        server = self.server
+        server.calls.append((market, int(query['start']), int(query['end'])))
+        if server.fail_after is not None and len(server.calls) > server.fail_after:
+            self.send_response(500)
+            self.end_headers()
+            return
+
+        start, end = int(query['start']), int(query['end'])
+        limit = int(query.get('limit', 1440))
+        step = MINUTE * int(query['interval'].rstrip('m'))
+        ts = start + (-start) % step
+        candles = []
+        while ts <= end and len(candles) < limit:
+            if ts not in server.holes:
+                value = (ts - T0) / step
+                candles.append([ts, str(value), str(value + 1), str(value - 1), str(value), '1.5'])
+            ts += step
+        body = json.dumps(candles[::-1]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('bitvavo-ratelimit-remaining', '900')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCandleDownloader(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeCandleHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.calls = []
+        self.server.fail_after = None
+        self.server.holes = set()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = CandleCache(self.tmp.name)
+        self.downloader = CandleDownloader(self.cache, base_url=self.base_url,
+                                           budget=RateBudget(per_minute=60_000, share=1.0), retries=0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ranges(self):
+        self.assertEqual(merge_ranges([(5, 8), (0, 3), (3, 4), (7, 10)]), [(0, 4), (5, 10)])
+        self.assertEqual(missing_ranges([(0, 4), (5, 10)], 2, 12), [(4, 5), (10, 12)])
+        self.assertEqual(missing_ranges([], 2, 12), [(2, 12)])
+
+    def test_download_pages_and_never_refetches(self):
+        end = T0 + 3000 * MINUTE
+        self.assertEqual(self.downloader.download('BTC-EUR', '1m', T0, end), 3000)
+        self.assertEqual(len(self.server.calls), 3)  # 1440 + 1440 + 120
+
+        candles = self.cache.read('BTC-EUR', '1m')
+        self.assertEqual(len(candles), 3000)
+        self.assertEqual(int(candles['ts'][0]), T0)
+        self.assertEqual(float(candles['close'][2999]), 2999.0)
+
+        self.assertEqual(self.downloader.download('BTC-EUR', '1m', T0, end), 0)
+        self.assertEqual(len(self.server.calls), 3)
+
+        # Extending backwards only fetches the new part and keeps the file sorted
+        self.downloader.download('BTC-EUR', '1m', T0 - 100 * MINUTE, end)
+        self.assertEqual(self.server.calls[-1], ('BTC-EUR', T0 - 100 * MINUTE, T0 - 1))
+        candles = self.cache.read('BTC-EUR', '1m', start=T0 - 10 * MINUTE, end=T0 + 10 * MINUTE)
+        self.assertEqual(len(candles), 20)
+        self.assertEqual(float(candles['close'][0]), -10.0)
+
+    def test_empty_ranges_count_as_covered(self):
+        self.server.holes = {T0 + i * MINUTE for i in range(10, 20)}
+        self.downloader.download('ETH-EUR', '1m', T0, T0 + 30 * MINUTE)
+        self.assertEqual(len(self.cache.read('ETH-EUR', '1m')), 20)
+        self.assertEqual(self.cache.missing('ETH-EUR', '1m', T0, T0 + 30 * MINUTE), [])
+
+    def test_resume_after_interruption(self):
+        end = T0 + 5000 * MINUTE
+        self.server.fail_after = 2
+        self.downloader.download_many(['ADA-EUR'], '1m', T0, end)
+        self.assertEqual(len(self.cache.read('ADA-EUR', '1m')), 2880)
+
+        self.server.fail_after = None
+        self.server.calls = []
+        self.downloader.download('ADA-EUR', '1m', T0, end)
+        self.assertEqual(self.server.calls[0][1], T0 + 2880 * MINUTE)
+        self.assertEqual(len(self.cache.read('ADA-EUR', '1m')), 5000)
+
+    def test_several_markets_concurrently(self):
+        markets = ['BTC-EUR', 'ETH-EUR', 'SOL-EUR', 'XRP-EUR']
+        results = self.downloader.download_many(markets, '5m', T0, T0 + 2000 * 5 * MINUTE)
+        self.assertEqual(results, {market: 2000 for market in markets})
+        self.assertEqual({call[0] for call in self.server.calls}, set(markets))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,70 @@
+"""
+Test the exchange clock offset: slow samples are filtered out, the offset is
+applied to the signing time, and a large skew is reported as out of sync.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import unittest
+
+from services.clock_sync import ClockSync
+from services.metrics import metrics
+
+
+class FakeExchange:
+    """A server clock ``offset_ms`` ahead of the local clock, with a given round trip per request"""
+
+    def __init__(self, offset_ms):
+        self.local = 1700000000.0
+        self.offset_ms = offset_ms
+        self.trips = []
+
+    def clock(self):
+        return self.local
+
+    def fetch_time(self):
+        out, back = self.trips.pop(0)  # seconds there and back; asymmetric on a congested link
+        self.local += out
+        server = self.local * 1000 + self.offset_ms
+        self.local += back
+        return server
+
+
+class TestClockSync(unittest.TestCase):
+
+    def test_fast_samples_decide_the_offset(self):
+        exchange = FakeExchange(offset_ms=1500)
+        sync = ClockSync(exchange.fetch_time, samples=8, clock=exchange.clock)
+        # Fast symmetric round trips, and slow ones that skew the midpoint by up to a second
+        exchange.trips = [(0.01, 0.01), (0.05, 2.0), (0.012, 0.012), (2.0, 0.05), (0.009, 0.011), (1.0, 0.02)]
+        for _ in range(6):
+            sync.sample()
+        self.assertAlmostEqual(sync.offset_ms, 1500, delta=2)
+        self.assertAlmostEqual(sync.rtt_ms, 20, delta=1)
+        self.assertIn('bot_clock_offset_seconds 1.5', metrics.render())
+        self.assertAlmostEqual(sync.now_ms(), exchange.local * 1000 + 1500, delta=2)
+        self.assertTrue(sync.in_sync())
+
+    def test_large_skew_is_out_of_sync(self):
+        exchange = FakeExchange(offset_ms=-8000)
+        sync = ClockSync(exchange.fetch_time, max_skew_ms=5000, clock=exchange.clock)
+        self.assertTrue(sync.in_sync())  # nothing known yet: local clock
+        exchange.trips = [(0.01, 0.01)] * 4
+        sync.start(burst=4)
+        sync.stop()
+        self.assertFalse(sync.in_sync())
+
+    def test_failed_samples_keep_the_estimate(self):
+        def unreachable():
+            raise ConnectionError('no route')
+        sync = ClockSync(unreachable)
+        sync.start(burst=2)
+        sync.stop()
+        self.assertEqual(sync.offset_ms, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
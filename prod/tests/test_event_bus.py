@@ -0,0 +1,92 @@
+"""
+Test the event bus: typed events on pre-resolved topics, keyed and unkeyed
+subscribers, queued delivery with drops, and per-subscriber metrics.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import dataclasses
+import threading
+import unittest
+
+from services.event_bus import BarEvent, EventBus, OrderEvent, QuoteEvent
+
+
+def quote(market, price):
+    return QuoteEvent(market, price, price, price, 1700000000.0)
+
+
+class TestEventBus(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = EventBus()
+
+    def test_keyed_and_unkeyed_subscribers(self):
+        btc, every = [], []
+        self.bus.subscribe(QuoteEvent, btc.append, key='BTC-EUR', name='test_keyed')
+        self.bus.subscribe(QuoteEvent, every.append, name='test_unkeyed')
+        self.bus.subscribe(BarEvent, self.fail, name='test_bars')
+
+        topic = self.bus.topic(QuoteEvent, 'BTC-EUR')
+        self.assertIs(self.bus.topic(QuoteEvent, 'BTC-EUR'), topic)
+        topic.publish(quote('BTC-EUR', 50000.0))
+        self.bus.publish(quote('ETH-EUR', 3000.0), key='ETH-EUR')
+
+        self.assertEqual([e.market for e in btc], ['BTC-EUR'])
+        self.assertEqual([e.market for e in every], ['BTC-EUR', 'ETH-EUR'])
+
+    def test_topic_map_resolves_each_key_once(self):
+        every = []
+        self.bus.subscribe(QuoteEvent, every.append, name='test_topic_map')
+        topics = self.bus.topics(QuoteEvent)
+        topics['BTC-EUR'].publish(quote('BTC-EUR', 50000.0))
+        self.assertIs(topics['BTC-EUR'], self.bus.topic(QuoteEvent, 'BTC-EUR'))
+        self.assertEqual(list(topics), ['BTC-EUR'])
+        self.assertEqual([e.market for e in every], ['BTC-EUR'])
+
+    def test_events_are_typed_and_immutable(self):
+        event = quote('BTC-EUR', 50000.0)
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            event.price = 1.0
+        with self.assertRaises(TypeError):
+            self.bus.topic(OrderEvent).publish(event)
+
+    def test_failing_subscriber_does_not_stop_delivery(self):
+        received = []
+
+        def broken(event):
+            raise RuntimeError('boom')
+        failing = self.bus.subscribe(QuoteEvent, broken, name='test_broken')
+        working = self.bus.subscribe(QuoteEvent, received.append, name='test_after_broken')
+        self.bus.publish(quote('BTC-EUR', 1.0))
+        self.assertEqual(len(received), 1)
+        self.assertEqual((failing.errors.get(), working.delivered.get()), (1, 1))
+        self.assertEqual(working.latency.count, 1)
+
+    def test_queued_subscriber_drops_when_full(self):
+        gate = threading.Event()
+        received = []
+
+        def slow(event):
+            gate.wait(5)
+            received.append(event)
+        subscription = self.bus.subscribe(QuoteEvent, slow, name='test_queued', queued=True, maxsize=2)
+        topic = self.bus.topic(QuoteEvent)
+        for price in range(10):
+            topic.publish(quote('BTC-EUR', float(price)))  # never blocks the publisher
+        gate.set()
+        subscription.join()
+        dropped = subscription.dropped.get()
+        self.assertGreaterEqual(dropped, 6)
+        self.assertEqual(len(received) + dropped, 10)
+
+        subscription.cancel()
+        topic.publish(quote('BTC-EUR', 99.0))
+        self.assertNotIn(99.0, [e.price for e in received])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
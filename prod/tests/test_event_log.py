@@ -0,0 +1,127 @@
+"""
+Test structured event logging: level guards, lazy formatting, per-event level
+overrides, JSON lines output and the async queue sink.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import json
+import logging
+import tempfile
+import unittest
+
+from services import event_log
+from services.event_log import EventLogger, JsonLinesFormatter, set_event_levels, setup_async_logging
+
+
+class Recording(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class Unformattable:
+    """Fails the test if a template ever formats it"""
+
+    def __format__(self, spec):
+        raise AssertionError('formatted although the event is disabled')
+
+
+class TestEventLogger(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger('test_event_log')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.handler = Recording()
+        self.logger.addHandler(self.handler)
+        self.events = EventLogger(self.logger, {
+            'move': (logging.DEBUG, 'MOVE {market}: €{old:,.2f} → €{new:,.2f}'),
+            'skip': (logging.INFO, 'SKIP {market}'),
+        })
+        event_log.overhead.take()
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.logger.propagate = True
+        event_log._level_overrides.clear()
+        event_log._event_loggers.remove(self.events)
+
+    def test_disabled_events_do_no_work(self):
+        self.events.emit('move', market='BTC-EUR', old=Unformattable(), new=Unformattable())
+        self.assertEqual(self.handler.records, [])
+        self.assertFalse(self.events.enabled('move'))
+        self.assertEqual(event_log.overhead.take(), (0.0, 0))
+
+    def test_enabled_events_carry_fields_and_format_lazily(self):
+        self.logger.setLevel(logging.DEBUG)
+        self.events.emit('move', market='BTC-EUR', old=60000.0, new=61234.5)
+        record, = self.handler.records
+        self.assertEqual(record.event, 'move')
+        self.assertEqual(record.fields, {'market': 'BTC-EUR', 'old': 60000.0, 'new': 61234.5})
+        self.assertEqual(record.getMessage(), 'MOVE BTC-EUR: €60,000.00 → €61,234.50')
+        self.assertEqual(record.funcName, 'test_enabled_events_carry_fields_and_format_lazily')
+        self.assertEqual(event_log.overhead.take()[1], 1)
+
+    def test_per_event_level_override(self):
+        set_event_levels({'move': 'INFO', 'skip': logging.DEBUG})
+        self.events.emit('move', market='ETH-EUR', old=1.0, new=2.0)
+        self.events.emit('skip', market='ETH-EUR')
+        self.assertEqual([r.event for r in self.handler.records], ['move'])
+        self.assertEqual(self.handler.records[0].levelno, logging.INFO)
+
+    def test_json_lines(self):
+        self.events.emit('skip', market='ADA-EUR')
+        line = json.loads(JsonLinesFormatter().format(self.handler.records[0]))
+        self.assertEqual(line['event'], 'skip')
+        self.assertEqual(line['market'], 'ADA-EUR')
+        self.assertEqual(line['message'], 'SKIP ADA-EUR')
+        self.assertEqual(line['level'], 'INFO')
+
+
+class TestAsyncLogging(unittest.TestCase):
+
+    def test_queue_sink_formats_on_listener(self):
+        root = logging.getLogger()
+        saved_handlers, saved_level = list(root.handlers), root.level
+        for handler in saved_handlers:
+            root.removeHandler(handler)
+        recording = Recording()
+        root.addHandler(recording)
+        root.setLevel(logging.INFO)
+        logger = logging.getLogger('test_event_log_async')
+        events = EventLogger(logger, {'tick': (logging.INFO, 'tick {n}')})
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'events.jsonl')
+                listener = setup_async_logging(path)
+                for n in range(3):
+                    events.emit('tick', n=n)
+                logger.info('plain message')
+                listener.stop()
+                for handler in listener.handlers:
+                    handler.close()
+
+                self.assertEqual([r.getMessage() for r in recording.records],
+                                 ['tick 0', 'tick 1', 'tick 2', 'plain message'])
+                with open(path, encoding='utf-8') as f:
+                    lines = [json.loads(line) for line in f]
+                self.assertEqual([line['n'] for line in lines], [0, 1, 2])  # events only
+        finally:
+            event_log._event_loggers.remove(events)
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            for handler in saved_handlers:
+                root.addHandler(handler)
+            root.setLevel(saved_level)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
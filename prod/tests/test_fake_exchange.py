@@ -0,0 +1,160 @@
+"""
+Test the local fake Bitvavo exchange: REST endpoints, market-order fills, balances,
+fault injection and the WebSocket ticker/book channels.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import base64
+import json
+import socket
+import struct
+import tempfile
+import unittest
+
+import requests
+
+from market_data.tick_store import TickStore
+from simulation.fake_exchange import (Faults, FakeExchange, FakeExchangeServer, ReplayFeed,
+                                      SimulatedFeed)
+from simulation.price_paths import MarketSimulator
+
+
+class WsClient:
+    """Just enough of a WebSocket client to talk to the fake exchange"""
+
+    def __init__(self, host, port):
+        self.sock = socket.create_connection((host, port), timeout=5)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.sock.sendall((f'GET /ws HTTP/1.1\r\nHost: {host}\r\nUpgrade: websocket\r\n'
+                           f'Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n'
+                           f'Sec-WebSocket-Version: 13\r\n\r\n').encode())
+        self.file = self.sock.makefile('rb')
+        status = self.file.readline()
+        assert b'101' in status, status
+        while self.file.readline() not in (b'\r\n', b''):
+            pass
+
+    def send(self, payload):
+        data = json.dumps(payload).encode()
+        mask = os.urandom(4)
+        header = bytes([0x81, 0x80 | len(data)]) if len(data) < 126 else \
+            bytes([0x81, 0x80 | 126]) + struct.pack('!H', len(data))
+        self.sock.sendall(header + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(data)))
+
+    def receive(self):
+        head = self.file.read(2)
+        length = head[1] & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', self.file.read(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', self.file.read(8))[0]
+        return json.loads(self.file.read(length))
+
+    def close(self):
+        self.sock.sendall(bytes([0x88, 0x80]) + os.urandom(4))
+        self.sock.close()
+
+
+class TestFakeExchange(unittest.TestCase):
+
+    def setUp(self):
+        feed = SimulatedFeed({'BTC-EUR': 60000.0, 'ADA-EUR': 0.4}, MarketSimulator(seed=1))
+        self.exchange = FakeExchange(feed, balances={'EUR': 1000.0, 'ADA': 100.0},
+                                     level_quote=100.0, level_step=0.001)
+        self.server = FakeExchangeServer(self.exchange).start()
+        self.url = self.server.rest_url
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_market_data_endpoints(self):
+        tickers = requests.get(f'{self.url}/ticker/24h', timeout=5).json()
+        self.assertEqual({t['market'] for t in tickers}, {'BTC-EUR', 'ADA-EUR'})
+        book = requests.get(f'{self.url}/BTC-EUR/book', params={'depth': 1}, timeout=5).json()
+        self.assertEqual(len(book['bids']), 1)
+        self.assertLess(float(book['bids'][0][0]), float(book['asks'][0][0]))
+        ticker = requests.get(f'{self.url}/ticker/book', params={'market': 'BTC-EUR'}, timeout=5).json()
+        self.assertEqual(ticker['ask'], book['asks'][0][0])
+
+        self.exchange.advance()
+        moved = requests.get(f'{self.url}/BTC-EUR/book', params={'depth': 1}, timeout=5).json()
+        self.assertNotEqual(moved['bids'][0][0], book['bids'][0][0])
+        self.assertEqual(requests.get(f'{self.url}/XYZ-EUR/book', timeout=5).json()['errorCode'], 205)
+
+    def test_market_orders_walk_the_book_and_settle(self):
+        best_ask = float(self.exchange.ticker_book('ADA-EUR')['ask'])
+        order = requests.post(f'{self.url}/order', json={
+            'market': 'ADA-EUR', 'side': 'buy', 'orderType': 'market', 'amountQuote': '250',
+            'operatorId': 1}, timeout=5).json()
+        self.assertEqual(order['status'], 'filled')
+        self.assertEqual(len(order['fills']), 3)  # 100 EUR per level
+        self.assertAlmostEqual(float(order['filledAmountQuote']), 250.0, places=6)
+        self.assertGreater(float(order['fills'][2]['price']), best_ask)
+
+        balances = {b['symbol']: float(b['available'])
+                    for b in requests.get(f'{self.url}/balance', timeout=5).json()}
+        self.assertAlmostEqual(balances['EUR'], 1000.0 - 250.0 * 1.0025, places=6)
+        self.assertAlmostEqual(balances['ADA'], 100.0 + float(order['filledAmount']), places=6)
+
+        # Taken liquidity stays gone until the book is rebuilt
+        self.assertGreater(float(self.exchange.ticker_book('ADA-EUR')['ask']), best_ask)
+
+        too_much = requests.post(f'{self.url}/order', json={
+            'market': 'ADA-EUR', 'side': 'sell', 'orderType': 'market', 'amount': '100000'}, timeout=5)
+        self.assertEqual(too_much.status_code, 400)
+        self.assertEqual(too_much.json()['errorCode'], 216)
+
+    def test_fault_injection(self):
+        self.server.faults.fail_next(2, status=503)
+        self.assertEqual(requests.get(f'{self.url}/time', timeout=5).status_code, 503)
+        self.assertEqual(requests.get(f'{self.url}/time', timeout=5).status_code, 503)
+        self.assertEqual(requests.get(f'{self.url}/time', timeout=5).status_code, 200)
+
+        self.server.faults = Faults(error_rate=1.0, error_status=500)
+        self.assertEqual(requests.get(f'{self.url}/balance', timeout=5).json()['errorCode'], 101)
+
+    def test_websocket_channels(self):
+        host, port = self.server.server_address
+        ws = WsClient(host, port)
+        try:
+            ws.send({'action': 'subscribe', 'channels': [{'name': 'ticker', 'markets': ['BTC-EUR']},
+                                                          {'name': 'book', 'markets': ['ADA-EUR']}]})
+            self.assertEqual(ws.receive()['event'], 'subscribed')
+            self.assertEqual(ws.receive()['event'], 'ticker')
+            self.assertEqual(ws.receive()['event'], 'book')
+
+            self.exchange.advance()
+            ticker = ws.receive()
+            self.assertEqual(ticker['market'], 'BTC-EUR')
+            self.assertEqual(ticker['bestAsk'], self.exchange.ticker_book('BTC-EUR')['ask'])
+            self.assertEqual(ws.receive()['nonce'], 1)
+
+            ws.send({'action': 'getTickerBook', 'market': 'ADA-EUR'})
+            self.assertEqual(ws.receive()['response']['market'], 'ADA-EUR')
+        finally:
+            ws.close()
+
+
+class TestReplayFeed(unittest.TestCase):
+
+    def test_replays_recorded_quotes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TickStore(tmp)
+            for i in range(3):
+                store.append('ETH-EUR', i, 3000.0 + i, 3001.0 + i)
+            store.flush()
+            exchange = FakeExchange(ReplayFeed(store), depth=2)
+            self.assertEqual(exchange.ticker_book('ETH-EUR')['bid'], '3000')
+            exchange.advance()
+            exchange.advance()
+            self.assertEqual(exchange.ticker_book('ETH-EUR')['ask'], '3003')
+            exchange.advance()  # wraps around
+            self.assertEqual(exchange.ticker_book('ETH-EUR')['bid'], '3000')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
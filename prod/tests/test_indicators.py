@@ -0,0 +1,82 @@
+"""
+Test the streaming indicators: bar-by-bar values match the batch functions over
+the same history, and one IndicatorSet per market is fed by the bar builder.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import unittest
+
+import numpy as np
+
+from market_data.bars import BarBuilder
+from market_data.candles import CANDLE_DTYPE
+from market_data.indicators import DEFAULT_INDICATORS, IndicatorHub, IndicatorSet, RollingExtreme, batch_indicator
+
+
+def random_bars(n, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 60000.0 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    bars = np.zeros(n, dtype=CANDLE_DTYPE)
+    bars['ts'] = np.arange(n) * 60_000
+    bars['open'] = np.concatenate(([close[0]], close[:-1]))
+    bars['close'] = close
+    bars['high'] = np.maximum(bars['open'], close) * (1 + rng.uniform(0, 0.001, n))
+    bars['low'] = np.minimum(bars['open'], close) * (1 - rng.uniform(0, 0.001, n))
+    bars['volume'] = 1.0
+    return bars
+
+
+class TestStreamingMatchesBatch(unittest.TestCase):
+
+    def test_default_indicators(self):
+        bars = random_bars(3000)
+        indicators = IndicatorSet()
+        streamed = {name: [] for name in DEFAULT_INDICATORS}
+        for bar in bars.tolist():
+            indicators.update(bar)
+            for name, value in indicators.values().items():
+                streamed[name].append(value)
+
+        for name, spec in DEFAULT_INDICATORS.items():
+            batch = batch_indicator(bars, *spec)
+            if spec[0] == 'bollinger':
+                batch = np.column_stack(batch)
+                stream = np.array([v if v is not None else (np.nan,) * 3 for v in streamed[name]])
+            else:
+                stream = np.array([np.nan if v is None else v for v in streamed[name]])
+            np.testing.assert_allclose(stream, batch, rtol=1e-9, equal_nan=True, err_msg=name)
+
+    def test_short_history_is_all_warm_up(self):
+        bars = random_bars(5)
+        for spec in DEFAULT_INDICATORS.values():
+            result = batch_indicator(bars, *spec)
+            for values in (result if spec[0] == 'bollinger' else (result,)):
+                self.assertTrue(np.isnan(values).all())
+
+    def test_rolling_extremes(self):
+        values = [5, 3, 4, 1, 2, 6, 6, 0, 7]
+        lowest, highest = RollingExtreme(3), RollingExtreme(3, highest=True)
+        self.assertEqual([lowest.update(v) for v in values], [None, None, 3, 1, 1, 1, 2, 0, 0])
+        self.assertEqual([highest.update(v) for v in values], [None, None, 5, 4, 4, 6, 6, 6, 7])
+
+
+class TestIndicatorHub(unittest.TestCase):
+
+    def test_one_set_per_market_fed_by_finished_bars(self):
+        builder = BarBuilder(('1m', '5m'))
+        hub = IndicatorHub(builder, '1m', specs={'sma_3': ('sma', 3)})
+        for minute in range(5):
+            builder.update('BTC-EUR', 100.0 + minute, minute * 60_000)
+        self.assertIsNone(hub.get('ETH-EUR'))
+        self.assertEqual(hub.markets(), ['BTC-EUR'])
+        indicators = hub.get('BTC-EUR')
+        self.assertEqual(indicators.count, 4)  # the fifth minute is still open
+        self.assertEqual(indicators['sma_3'], 102.0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
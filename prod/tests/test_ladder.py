@@ -0,0 +1,129 @@
+"""
+Test compact ladder specs: compressing coins-table rows without losing state,
+the ladder file round trip, and activating rungs only near the market price.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from services.ladder import (Ladder, LadderBook, LadderSpec, compress_rows, csv_rows, load_ladders,
+                             save_ladders)
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'coin_info.csv')
+KEYS = ('index_num', 'current_price', 'position', 'transactie_bedrag', 'gain', 'trail', 'temp_high',
+        'temp_low', 'number_deals', 'sleep_till', 'last_update')
+
+
+def rows_key(rows):
+    return sorted(tuple(row[key] for key in KEYS) for row in rows)
+
+
+def ladder_rows(ladders):
+    return [ladder.row(rung) for ladder in ladders for rung in range(len(ladder))]
+
+
+class FakeCoin(SimpleNamespace):
+    """Just what LadderBook reads from a Coin"""
+
+    def _coin_row(self):
+        return dict(self.row, position='Y' if self.position else 'N')
+
+
+def make_coin(row):
+    return FakeCoin(row=row, current_price=row['current_price'], base_currency=row['base_currency'],
+                    position=row['position'] == 'Y', buy_signal=False, sell_signal=False)
+
+
+class TestCompress(unittest.TestCase):
+
+    def test_csv_rows_survive_compression_and_file(self):
+        rows = csv_rows(CSV_PATH)
+        ladders = compress_rows(rows)
+        self.assertLess(len(ladders), len(rows))
+        self.assertEqual(rows_key(ladder_rows(ladders)), rows_key(rows))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'ladders.npz')
+            save_ladders(path, ladders)
+            self.assertEqual(rows_key(ladder_rows(load_ladders(path))), rows_key(rows))
+
+    def test_linear_and_geometric_runs(self):
+        def row(i, price):
+            return {'index_num': i, 'base_currency': 'KAS', 'quote_currency': 'EUR', 'position': 'N',
+                    'transactie_bedrag': 10.0, 'current_price': price, 'gain': 0.03, 'trail': 0.01,
+                    'temp_high': price, 'temp_low': price, 'number_deals': 0, 'last_update': '',
+                    'sleep_till': 0, 'last_buy_price': 0.0}
+        linear = [row(i, round(0.1 + 0.005 * i, 3)) for i in range(20)]
+        geometric = [row(100 + i, round(1.0 * 1.05 ** i, 6)) for i in range(10)]
+        ladders = compress_rows(linear + [row(50, 0.7)])
+        self.assertEqual([(l.spec.count, l.spec.spacing) for l in ladders], [(20, 'linear'), (1, 'linear')])
+        ladders = compress_rows(geometric)
+        self.assertEqual([(l.spec.count, l.spec.spacing) for l in ladders], [(10, 'geometric')])
+        self.assertEqual([r['current_price'] for r in ladder_rows(ladders)], [r['current_price'] for r in geometric])
+
+
+class TestLadderBook(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'ladders.npz')
+        spec = LadderSpec('KAS', 'EUR', start=0.100, count=1000, step=0.001, gain=0.03, trail=0.01, amount=10.0,
+                          decimals=3)
+        save_ladders(self.path, [Ladder(spec)])
+        self.book = LadderBook.load(self.path, band=0.05)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_only_rungs_near_the_price_are_active(self):
+        coins = []
+        added, retired = self.book.refresh(coins, {'KAS-EUR': (0.5, 0.5, 0.5, 0.0)}, make_coin)
+        prices = sorted(coin.current_price for coin in coins)
+        self.assertEqual((added, retired), (len(coins), 0))
+        self.assertEqual((prices[0], prices[-1]), (0.477, 0.525))
+
+        # A rung bought near 0.5 stays active when the market moves away; the rest are retired
+        bought = next(coin for coin in coins if coin.current_price == 0.5)
+        bought.position = True
+        bought.row = dict(bought.row, number_deals=1)
+        added, retired = self.book.refresh(coins, {'KAS-EUR': (0.8, 0.8, 0.8, 0.0)}, make_coin)
+        self.assertIn(bought, coins)
+        self.assertTrue(all(0.76 <= coin.current_price <= 0.84 or coin is bought for coin in coins))
+        self.assertEqual(self.book.in_position('KAS'), [{'current_price': 0.5}])
+
+        self.book.save()
+        state = load_ladders(self.path)[0].state
+        self.assertEqual(state['position'].sum(), 1)
+        self.assertEqual(int(state['number_deals'][400]), 1)
+
+    def test_position_change_is_saved_at_once(self):
+        coins = []
+        self.book.refresh(coins, {'KAS-EUR': (0.5, 0.5, 0.5, 0.0)}, make_coin)
+        rung = next(coin for coin in coins if coin.current_price == 0.5)
+
+        rung.row = dict(rung.row, temp_low=0.49)  # a new low is saved with the cycle
+        self.book.record(rung)
+        self.assertTrue(self.book.dirty)
+        self.assertEqual(float(load_ladders(self.path)[0].state['temp_low'][400]), 0.5)
+
+        rung.position = True  # a buy is saved right away
+        rung.row = dict(rung.row, last_buy_price=0.49)
+        self.book.record(rung)
+        self.assertFalse(self.book.dirty)
+        state = load_ladders(self.path)[0].state
+        self.assertTrue(state['position'][400])
+        self.assertEqual(float(state['last_buy_price'][400]), 0.49)
+
+    def test_no_quote_keeps_only_positions(self):
+        coins = []
+        self.assertEqual(self.book.refresh(coins, {}, make_coin), (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,94 @@
+"""
+Test the ladder view used by the reports: bisect-based hot, warm and nearest
+rungs must match classifying and sorting every rung, as the reports used to.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import random
+import unittest
+
+from reporting.ladder_view import MarketLadder, build_ladders, temperature
+
+
+def make_rungs(rng, count, base=100.0):
+    return [{'id': i, 'matrix': round(base * rng.uniform(0.5, 1.5), 2), 'gain': rng.choice((0.01, 0.02, 0.05)),
+             'position': rng.choice('YN')} for i in range(count)]
+
+
+def classify(rung, price):
+    return temperature(rung['position'] == 'Y', rung['matrix'], rung['gain'], price)
+
+
+class TestTemperature(unittest.TestCase):
+
+    def test_temperature(self):
+        self.assertEqual(temperature(False, 100.0, 0.02, 98.0), 'hot')
+        self.assertEqual(temperature(False, 100.0, 0.02, 99.0), 'warm')
+        self.assertEqual(temperature(False, 100.0, 0.02, 101.0), 'cold')
+        self.assertEqual(temperature(True, 100.0, 0.02, 102.0), 'hot')
+        self.assertEqual(temperature(True, 100.0, 0.02, 101.0), 'warm')
+        self.assertEqual(temperature(True, 100.0, 0.02, 99.0), 'cold')
+
+
+class TestMarketLadder(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(7)
+
+    def test_hot_and_warm_match_full_scan(self):
+        rungs = make_rungs(self.rng, 2000)
+        ladder = MarketLadder(rungs)
+        by_matrix = sorted(rungs, key=lambda r: r['matrix'])
+        for price in [self.rng.uniform(40, 160) for _ in range(50)] + [by_matrix[10]['matrix']]:
+            self.assertEqual([r['id'] for r in ladder.hot(price)],
+                             [r['id'] for r in by_matrix if classify(r, price) == 'hot'])
+            self.assertEqual([r['id'] for r in ladder.warm(price)],
+                             [r['id'] for r in by_matrix if classify(r, price) == 'warm'])
+            counts = ladder.counts(price)
+            self.assertEqual(counts['hot'], sum(classify(r, price) == 'hot' for r in rungs))
+            self.assertEqual(counts['in_position'] + counts['watching'], len(rungs))
+
+    def test_nearest_matches_overview_selection(self):
+        rungs = make_rungs(self.rng, 500)
+        ladder = MarketLadder(rungs)
+        for price in [self.rng.uniform(40, 160) for _ in range(30)]:
+            below, above = ladder.nearest(price, 5)
+            for side, is_above in ((below, False), (above, True)):
+                group = sorted((r for r in rungs if (r['matrix'] > price) == is_above), key=lambda r: r['matrix'])
+                others = [r for r in group if classify(r, price) != 'hot']
+                others = others[:5] if is_above else others[-5:]
+                expected = sorted([r for r in group if classify(r, price) == 'hot'] + others,
+                                  key=lambda r: r['matrix'])
+                self.assertEqual([r['matrix'] for r in side], [r['matrix'] for r in expected])
+
+    def test_side_matches_discord_selection(self):
+        rungs = make_rungs(self.rng, 500)
+        ladder = MarketLadder(rungs)
+        for price in [self.rng.uniform(40, 160) for _ in range(30)]:
+            for position in 'YN':
+                side = sorted((r for r in rungs if r['position'] == position), key=lambda r: r['matrix'],
+                              reverse=position == 'N')
+                expected = ([r for r in side if classify(r, price) == 'hot'] +
+                            [r for r in side if classify(r, price) != 'hot'][:3])
+                self.assertEqual(sorted(r['matrix'] for r in ladder.side(position == 'Y', price, 3)),
+                                 sorted(r['matrix'] for r in expected))
+
+    def test_build_ladders_and_empty_market(self):
+        rungs = [{'market': 'BTC-EUR', 'matrix': 100.0, 'gain': 0.02, 'position': 'N'},
+                 {'market': 'ETH-EUR', 'matrix': 3000.0, 'gain': 0.02, 'position': 'Y'}]
+        ladders = build_ladders(rungs, lambda r: r['market'])
+        self.assertEqual(sorted(ladders), ['BTC-EUR', 'ETH-EUR'])
+        self.assertEqual(len(ladders['BTC-EUR']), 1)
+
+        empty = MarketLadder([])
+        self.assertEqual(empty.hot(1.0), [])
+        self.assertEqual(empty.nearest(1.0, 5), ([], []))
+        self.assertEqual(empty.counts(1.0)['warm'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,67 @@
+"""
+Test the market snapshot the monitor publishes for the report scripts: merging
+ticker and book quotes, the round trip through the file, staleness checks and
+the path the monitor and the reports share.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from market_data import market_snapshot
+
+T0 = 1700000000.0
+
+
+class TestMarketSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'market_snapshot.bin')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_collect_prefers_fresher_book_quotes(self):
+        tickers = [{'market': 'BTC-EUR', 'last': '60000', 'bid': '59990', 'ask': '60010'},
+                   {'market': 'ADA-EUR', 'last': '0.4', 'bid': None, 'ask': ''}]
+        quotes = market_snapshot.collect(tickers, T0, {'BTC-EUR': (60100.0, 60120.0, T0 + 5),
+                                                       'ETH-EUR': (3000.0, 3002.0, T0 - 5)})
+        self.assertEqual(quotes['BTC-EUR'], (60110.0, 60100.0, 60120.0, T0 + 5))
+        self.assertEqual(quotes['ETH-EUR'][0], 3001.0)
+        self.assertEqual(quotes['ADA-EUR'][0], 0.4)
+
+    def test_round_trip_and_staleness(self):
+        quotes = market_snapshot.collect(
+            [{'market': 'BTC-EUR', 'last': '60000', 'bid': '59990', 'ask': '60010'},
+             {'market': 'ADA-EUR', 'last': '0.4'}], T0, {'ETH-EUR': (3000.0, 3002.0, T0 - 50)})
+        market_snapshot.publish(self.path, quotes, ts=T0)
+
+        data = market_snapshot.read(self.path, max_age=30, now=T0 + 10)
+        self.assertEqual(data['BTC-EUR'], {'price': 60000.0, 'bid': 59990.0, 'ask': 60010.0})
+        self.assertEqual(data['ADA-EUR'], {'price': 0.4, 'bid': None, 'ask': None})
+        self.assertNotIn('ETH-EUR', data)  # quote older than max_age
+
+        self.assertIsNone(market_snapshot.read(self.path, max_age=30, now=T0 + 31))
+        self.assertIsNone(market_snapshot.read(os.path.join(self.tmp.name, 'missing.bin')))
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        self.assertIsNone(market_snapshot.read(self.path, now=T0))
+
+    def test_configured_path_is_independent_of_the_working_directory(self):
+        prod = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        self.assertEqual(market_snapshot.configured_path(SimpleNamespace()),
+                         os.path.join(prod, 'market_snapshot.bin'))
+        self.assertEqual(market_snapshot.configured_path(SimpleNamespace(MARKET_SNAPSHOT_PATH='data/quotes.bin')),
+                         os.path.join(prod, 'data', 'quotes.bin'))
+        self.assertEqual(market_snapshot.configured_path(SimpleNamespace(MARKET_SNAPSHOT_PATH=self.path)), self.path)
+        self.assertIsNone(market_snapshot.configured_path(SimpleNamespace(MARKET_SNAPSHOT_PATH=None)))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
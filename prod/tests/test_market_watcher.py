@@ -0,0 +1,251 @@
+"""
+Test the Titan market watcher against a stub exchange, a stub ohlcv_functions
+and a scheduler that only records jobs: syncing the gap after the latest DB
+candle page by page, retrying a sync that failed halfway, and pulling only the
+candle that just closed.
+"""
+import sys
+import os
+
+# Add the repository root to path, for the core package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import importlib
+import unittest
+from types import ModuleType, SimpleNamespace
+from unittest.mock import patch
+
+INTERVAL_MS = 60000
+
+
+class BaseError(Exception):
+    pass
+
+
+class StubExchange:
+    """ccxt exchange with one candle per minute; the candle at ``now`` is still running"""
+    id = 'stub'
+    rateLimit = 1000
+
+    def __init__(self, candles, now):
+        self.candles = {k * INTERVAL_MS: [k * INTERVAL_MS, 1.0, 2.0, 0.5, 1.5, 10.0] for k in candles}
+        self.now = now
+        self.failures = 0
+        self.requests = []
+
+    def parse_timeframe(self, interval):
+        return INTERVAL_MS // 1000
+
+    def milliseconds(self):
+        return self.now
+
+    def fetch_ohlcv(self, pair, interval, since=None, limit=None):
+        self.requests.append(since)
+        if self.failures:
+            self.failures -= 1
+            raise BaseError('exchange down')
+        candles = [list(self.candles[ts]) for ts in sorted(self.candles) if since is None or ts >= since]
+        return candles[:limit] if limit else candles
+
+
+class StubScheduler:
+    """Records jobs instead of running them"""
+
+    def __init__(self):
+        self.jobs = []
+        self.timers = []
+
+    def submit(self, job, *args):
+        self.jobs.append((job, args))
+
+    def call_at(self, when, job, *args):
+        timer = [when, job, args]
+        self.timers.append(timer)
+        return timer
+
+    def call_later(self, delay, job, *args):
+        return self.call_at(('later', delay), job, *args)
+
+    def cancel(self, timer):
+        timer[1] = None
+
+    def run_next(self):
+        """Run the last timer that was not cancelled"""
+        timer = [timer for timer in self.timers if timer[1] is not None][-1]
+        self.timers.remove(timer)
+        timer[1](*timer[2])
+        return timer[0]
+
+
+class Transaction:
+    def __init__(self, log):
+        self.log = log
+
+    def __enter__(self):
+        self.log.append('begin')
+
+    def __exit__(self, *exc):
+        self.log.append('commit' if exc[0] is None else 'rollback')
+
+
+def stub_ohlcv_functions(rows, fail_on=None, transactions=None):
+    """ohlcv_functions keeping the candle rows in ``rows``; inserting a candle listed in ``fail_on`` fails once"""
+    module = ModuleType('core.database.ohlcv_functions')
+    module.write_trade_pairs_to_db = lambda *args: 1
+    module.get_all_candles = lambda pair_id: list(rows)
+
+    def get_latest_candle(exchange, pair, interval):
+        return (None,) * 10 + (rows[-1][0],) if rows else None
+
+    def insert_data_into_ohlcv_table(exchange, pair, interval, candle, pair_id):
+        if fail_on and candle[0] in fail_on:
+            fail_on.remove(candle[0])
+            raise RuntimeError('database is locked')
+        if transactions is not None:
+            transactions.append(candle[0])
+        rows.append(candle)
+    module.get_latest_candle = get_latest_candle
+    module.insert_data_into_ohlcv_table = insert_data_into_ohlcv_table
+    if transactions is not None:
+        module.conn = SimpleNamespace(begin=lambda: Transaction(transactions))
+    return module
+
+
+class WatcherTestCase(unittest.TestCase):
+
+    def make_watcher(self, candles, rows, now=10 * INTERVAL_MS + 30000, **ohlcv):
+        """A watcher on the stub exchange, with the sync queued but not run"""
+        self.exchange = StubExchange(candles, now)
+        self.scheduler = StubScheduler()
+        self.messages = []
+        ccxt = ModuleType('ccxt')
+        ccxt.BaseError = BaseError
+        ccxt.stub = lambda: self.exchange
+        pubsub = ModuleType('pubsub')
+        pubsub.pub = SimpleNamespace(sendMessage=lambda topic, **kwargs: self.messages.append((topic, kwargs)),
+                                     subscribe=lambda callable, topic: None)
+        modules = {'ccxt': ccxt, 'pubsub': pubsub,
+                   'core.database.ohlcv_functions': stub_ohlcv_functions(rows, **ohlcv)}
+        patcher = patch.dict(sys.modules, modules)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sys.modules.pop('core.markets.market_watcher', None)
+        self.addCleanup(sys.modules.pop, 'core.markets.market_watcher', None)
+        market_watcher = importlib.import_module('core.markets.market_watcher')  # fresh, on these stubs
+        from core.markets import scheduler
+        self.market_watcher = market_watcher
+        for name, value in (('PAGE_CANDLES', 3), ('HISTORY_CANDLES', 10)):
+            patcher = patch.object(market_watcher, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        with patch.object(scheduler, 'get_scheduler', lambda: self.scheduler):
+            watcher = market_watcher.MarketWatcher('stub', 'BTC', 'EUR', '1m')
+        return watcher
+
+    def sync(self, watcher):
+        job, args = self.scheduler.jobs.pop()
+        job(*args)
+
+
+class TestMarketWatcherSync(WatcherTestCase):
+
+    def test_only_the_gap_is_synced_a_page_at_a_time(self):
+        rows = [[k * INTERVAL_MS] for k in range(3)]
+        watcher = self.make_watcher(range(11), rows)
+        self.sync(watcher)
+        # Pages of 3 from the candle after the latest DB candle; the running candle (10) is left out
+        self.assertEqual(self.exchange.requests, [3 * INTERVAL_MS, 6 * INTERVAL_MS, 9 * INTERVAL_MS])
+        self.assertEqual([row[0] // INTERVAL_MS for row in rows], list(range(10)))
+        self.assertTrue(watcher.historical_synced)
+        self.assertEqual(self.messages, [('stubBTC/EUR1mhistorical', {})])
+        self.assertEqual(len(self.scheduler.timers), 1)  # the first pull, after the next close
+
+    def test_empty_history_loads_history_candles_and_stops_at_an_empty_page(self):
+        rows = []
+        watcher = self.make_watcher(range(6), rows)  # the exchange has nothing after candle 5
+        self.sync(watcher)
+        self.assertEqual(self.exchange.requests, [0, 3 * INTERVAL_MS, 6 * INTERVAL_MS])
+        self.assertEqual([row[0] // INTERVAL_MS for row in rows], list(range(6)))
+        self.assertTrue(watcher.historical_synced)
+
+    def test_failed_sync_resumes_after_the_written_pages(self):
+        rows = [[0]]
+        watcher = self.make_watcher(range(11), rows, fail_on=[5 * INTERVAL_MS])
+        self.sync(watcher)
+        self.assertFalse(watcher.historical_synced)
+        self.assertEqual([row[0] // INTERVAL_MS for row in rows], [0, 1, 2, 3, 4])
+
+        self.assertEqual(self.scheduler.run_next(), ('later', 2.0))
+        self.assertEqual(self.exchange.requests[-2:], [5 * INTERVAL_MS, 8 * INTERVAL_MS])
+        self.assertEqual([row[0] // INTERVAL_MS for row in rows], list(range(10)))
+        self.assertTrue(watcher.historical_synced)
+
+    def test_retries_back_off_then_wait_for_the_next_close(self):
+        watcher = self.make_watcher(range(11), [])
+        self.exchange.failures = 100
+        self.sync(watcher)
+        delays = [self.scheduler.run_next() for _ in range(self.market_watcher.SYNC_RETRIES)]
+        self.assertEqual(delays, [('later', 2.0), ('later', 4.0), ('later', 6.0), ('later', 8.0), ('later', 10.0)])
+        when, job, args = self.scheduler.timers[-1]
+        self.assertEqual(args, ())  # a fresh round of attempts
+        self.assertEqual(when % 60, self.market_watcher.CLOSE_DELAY)
+        self.assertFalse(watcher.historical_synced)
+
+        watcher.stop()
+        self.assertIsNone(self.scheduler.timers[-1][1])
+
+    def test_each_page_is_one_transaction(self):
+        transactions = []
+        watcher = self.make_watcher(range(11), [[6 * INTERVAL_MS]], transactions=transactions)
+        self.sync(watcher)
+        self.assertEqual(transactions, ['begin', 7 * INTERVAL_MS, 8 * INTERVAL_MS, 9 * INTERVAL_MS, 'commit'])
+
+
+
+class TestMarketWatcherPull(WatcherTestCase):
+
+    def setUp(self):
+        self.rows = []
+        self.watcher = self.make_watcher(range(10), self.rows, fail_on=[])
+        self.sync(self.watcher)  # candles 0-9; the first pull is scheduled
+        self.exchange.now = 11 * INTERVAL_MS + 2000  # two seconds after candle 10 closed
+        self.exchange.requests.clear()
+
+    def test_pull_takes_the_candle_that_just_closed(self):
+        self.exchange.candles.update({k * INTERVAL_MS: [k * INTERVAL_MS, 1.0, 2.0, 0.5, 1.5, 10.0] for k in (10, 11)})
+        self.scheduler.run_next()
+        self.assertEqual(self.exchange.requests, [10 * INTERVAL_MS])
+        self.assertEqual(self.rows[-1][0], 10 * INTERVAL_MS)  # not the running candle 11
+        self.assertEqual(self.messages[-1], ('stubBTC/EUR1m', {'candle': self.rows[-1]}))
+        when, job, args = self.scheduler.timers[-1]
+        self.assertEqual((when % 60, args), (self.market_watcher.CLOSE_DELAY, ()))
+
+        # A tick within the same candle does not pull it again
+        self.watcher.tick()
+        self.sync(self.watcher)
+        self.assertEqual(self.exchange.requests, [10 * INTERVAL_MS])
+
+    def test_pull_retries_until_the_exchange_has_the_candle(self):
+        self.scheduler.run_next()  # the exchange has not closed candle 10 yet
+        self.assertEqual(len(self.rows), 10)
+        self.assertEqual(self.scheduler.timers[-1][::2], [('later', 2.0), (1, 10 * INTERVAL_MS)])
+
+        self.exchange.candles[10 * INTERVAL_MS] = [10 * INTERVAL_MS, 1.0, 2.0, 0.5, 1.5, 10.0]
+        self.exchange.now += 60000  # a retry after the next close still pulls candle 10
+        self.scheduler.run_next()
+        self.assertEqual(self.rows[-1][0], 10 * INTERVAL_MS)
+
+    def test_errors_are_retried_then_given_up(self):
+        self.exchange.candles[10 * INTERVAL_MS] = [10 * INTERVAL_MS, 1.0, 2.0, 0.5, 1.5, 10.0]
+        sys.modules['core.database.ohlcv_functions'].insert_data_into_ohlcv_table = None  # TypeError on insert
+        self.exchange.failures = 2
+        delays = [self.scheduler.run_next() for _ in range(self.market_watcher.PULL_RETRIES)]
+        self.assertEqual(delays[1:], [('later', 2.0), ('later', 4.0), ('later', 6.0), ('later', 8.0)])
+        self.scheduler.run_next()
+        when, job, args = self.scheduler.timers[-1]
+        self.assertEqual((when % 60, args), (self.market_watcher.CLOSE_DELAY, ()))  # wait for the next close
+        self.assertEqual(len(self.rows), 10)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,79 @@
+"""
+Test the metrics registry: counters, gauges, histograms, Prometheus text output and the HTTP endpoint.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import unittest
+
+import requests
+
+from services.metrics import MetricsRegistry, MetricsServer, instrument
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_and_gauge(self):
+        orders = self.registry.counter('orders_total', 'Orders', ['side'])
+        orders.labels(side='buy').inc()
+        orders.labels('buy').inc(2)
+        queue = []
+        depth = self.registry.gauge('queue_depth', 'Depth')
+        depth.set_function(lambda: len(queue))
+        queue.extend([1, 2, 3])
+
+        text = self.registry.render()
+        self.assertIn('# TYPE orders_total counter', text)
+        self.assertIn('orders_total{side="buy"} 3.0', text)
+        self.assertIn('queue_depth 3.0', text)
+        self.assertIs(self.registry.counter('orders_total', 'Orders', ['side']), orders)
+        with self.assertRaises(ValueError):
+            self.registry.gauge('orders_total', 'Orders', ['side'])
+        with self.assertRaises(ValueError):
+            orders.inc()  # labelled metric needs labels
+
+    def test_histogram_buckets(self):
+        latency = self.registry.histogram('latency_seconds', 'Latency', ['endpoint'], buckets=(0.1, 1.0))
+        child = latency.labels(endpoint='/book')
+        for value in (0.05, 0.1, 0.5, 3.0):
+            child.observe(value)
+        text = self.registry.render()
+        self.assertIn('latency_seconds_bucket{endpoint="/book",le="0.1"} 2', text)
+        self.assertIn('latency_seconds_bucket{endpoint="/book",le="1.0"} 3', text)
+        self.assertIn('latency_seconds_bucket{endpoint="/book",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count{endpoint="/book"} 4', text)
+        self.assertIn('latency_seconds_sum{endpoint="/book"} 3.65', text)
+        self.assertEqual(child.quantile(0.5), 0.1)
+
+    def test_instrument_methods(self):
+        class Db:
+            def save_coin(self, data):
+                return data['id']
+
+        db = Db()
+        histogram = self.registry.histogram('db_seconds', 'DB', ['operation'])
+        instrument(db, ['save_coin', 'missing'], histogram)
+        instrument(db, ['save_coin'], histogram)  # second call does not wrap twice
+        self.assertEqual(db.save_coin({'id': 7}), 7)
+        self.assertEqual(histogram.labels(operation='save_coin').count, 1)
+
+    def test_http_endpoint(self):
+        self.registry.counter('cycles_total', 'Cycles').inc()
+        server = MetricsServer(self.registry, port=0).start()
+        try:
+            response = requests.get(f'http://127.0.0.1:{server.server_address[1]}/metrics', timeout=5)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('text/plain', response.headers['Content-Type'])
+            self.assertIn('cycles_total 1.0', response.text)
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
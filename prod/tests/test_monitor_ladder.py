@@ -0,0 +1,95 @@
+"""
+Test that the monitor's cycle activates rungs of a ladder that has no active
+coins once the market price moves into its band: the cycle refreshes the
+ticker itself, since no coin fetches it for such a ladder.
+"""
+import sys
+import os
+
+# Add src to path, ahead of prod/ for the monitor (prod/coin.py is the old Coin)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import tempfile
+import unittest
+from types import ModuleType, SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from services.ladder import Ladder, LadderBook, LadderSpec, save_ladders
+
+
+def fake_modules():
+    """config and database as far as importing the monitor and running a cycle use them"""
+    config = ModuleType('config')
+    config.config = SimpleNamespace(STATE_JOURNAL=None, SNAPSHOT_PATH=None, MARKET_SNAPSHOT_PATH=None,
+                                    BAR_INTERVALS=None, CLOCK_SYNC_INTERVAL=None, COIN_DELAY=0,
+                                    is_test_mode=lambda: True)
+    database = ModuleType('database')
+    database.db = MagicMock()
+    return {'config': config, 'database': database}
+
+
+class FakeClient(SimpleNamespace):
+    """The client attributes run_cycle reads, with a ticker that returns ``price``"""
+
+    def __init__(self, ladder_book):
+        super().__init__(ladder_book=ladder_book, price=1.0, fetches=0, _ticker_cache={}, _cache_timestamp=0,
+                         book_quotes={}, price_simulator=None, tick_store=None, state_journal=None,
+                         bar_builder=None)
+
+    def start_new_cycle(self, cycle_id=None):
+        pass
+
+    def _get_public_ticker_data(self, force_refresh=False):
+        self.fetches += 1
+        data = [{'market': 'KAS-EUR', 'last': str(self.price), 'bid': str(self.price), 'ask': str(self.price)}]
+        self._ticker_cache = {'data': data}
+        self._cache_timestamp = float(self.fetches)
+        return data
+
+
+class FakeRung(SimpleNamespace):
+    """Just what LadderBook reads from a rung coin"""
+
+    def _coin_row(self):
+        return self.row
+
+
+class TestLadderCycle(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, 'ladders.npz')
+        spec = LadderSpec('KAS', 'EUR', start=0.100, count=100, step=0.001, gain=0.03, trail=0.01, amount=10.0,
+                          decimals=3)
+        save_ladders(path, [Ladder(spec)])
+        self.client = FakeClient(LadderBook.load(path, band=0.05))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_price_moving_into_the_band_of_an_empty_ladder(self):
+        with patch.dict(sys.modules, fake_modules()):
+            for name in ('monitor', 'coin'):
+                sys.modules.pop(name, None)
+            import monitor
+            monitor.bitvavo_client = self.client
+            make_rung = lambda client, row: FakeRung(row=row, current_price=row['current_price'], position=False,
+                                                     buy_signal=False, sell_signal=False)
+            with patch.object(monitor, 'make_rung_coin', make_rung), \
+                    patch.object(monitor, 'query_state', MagicMock()):
+                coins = []
+                monitor.run_cycle(coins, 1, coin_delay=0)
+                self.assertEqual(coins, [])  # 1.0 is far above the ladder (0.100 - 0.199)
+
+                self.client.price = 0.15
+                monitor.run_cycle(coins, 2, coin_delay=0)
+            for name in ('monitor', 'coin'):
+                sys.modules.pop(name, None)
+        prices = sorted(coin.current_price for coin in coins)
+        self.assertEqual(self.client.fetches, 2)
+        self.assertEqual((prices[0], prices[-1]), (0.143, 0.157))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,72 @@
+"""
+Test loading the coins at startup with a state journal: the journal tracks each
+coin before its signals are validated, so a signal that expired on restart is
+journaled as a small delta instead of a whole row that is synced and written to
+the database right away.
+"""
+import sys
+import os
+
+# Add src to path, ahead of prod/ for the monitor (prod/coin.py is the old Coin)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import tempfile
+import unittest
+from types import ModuleType, SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from services.state_journal import StateJournal
+
+ROW = {'id': 7, 'index_num': 7, 'base_currency': 'BTC', 'quote_currency': 'EUR', 'position': 'Y',
+       'transactie_bedrag': 10.0, 'current_price': 100.0, 'gain': 0.02, 'trail': 0.01, 'temp_high': 103.0,
+       'temp_low': 100.0, 'number_deals': 1, 'last_update': '', 'sleep_till': 0, 'last_buy_price': 100.0}
+
+
+def fake_modules(rows):
+    """config and database as far as loading coins uses them"""
+    config = ModuleType('config')
+    config.config = SimpleNamespace(STATE_JOURNAL=None, SNAPSHOT_PATH=None, MARKET_SNAPSHOT_PATH=None,
+                                    BAR_INTERVALS=None, CLOCK_SYNC_INTERVAL=None, OPERATOR_ID=1,
+                                    DEFAULT_PROCEEDS_STRATEGY='eur', DEFAULT_PROCEEDS_CRYPTO_RATIO=0.5,
+                                    is_test_mode=lambda: True)
+    database = ModuleType('database')
+    database.db = MagicMock()
+    database.db.get_all_coins.return_value = rows
+    return {'config': config, 'database': database}
+
+
+class TestCoinLoading(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.applied = []
+        self.journal = StateJournal(os.path.join(self.tmp.name, 'journal.log'),
+                                    lambda coin_id, state: self.applied.append(coin_id))
+
+    def tearDown(self):
+        self.journal.close()
+        self.tmp.cleanup()
+
+    def test_expired_signal_is_not_written_through_at_startup(self):
+        with patch.dict(sys.modules, fake_modules([dict(ROW)])):
+            for name in ('monitor', 'coin'):
+                sys.modules.pop(name, None)
+            import monitor
+            monitor.bitvavo_client = SimpleNamespace(bitvavo=None, state_journal=self.journal, ladder_book=None,
+                                                     _ticker_cache={}, _cache_timestamp=0)
+            # The bid fell below the sell trigger (102) while the bot was down: the signal expires
+            with patch.object(monitor.Coin, 'get_best_bid', lambda coin: 101.0):
+                coins = monitor.create_coin_list()
+            for name in ('monitor', 'coin'):
+                sys.modules.pop(name, None)
+
+        self.assertEqual(len(coins), 1)
+        self.assertEqual(coins[0].temp_high, 101.0)
+        self.assertEqual(self.applied, [])  # no urgent write to the coins table
+        self.journal.checkpoint()  # the change is journaled, and reaches the table with the next checkpoint
+        self.assertEqual(self.applied, [7])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
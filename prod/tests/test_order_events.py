@@ -0,0 +1,80 @@
+"""
+Test that Coin publishes every order on the event bus, including the buy that
+reinvests the proceeds of a sell and leaves the position unchanged, so the
+query API and the Discord report see both trades.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import unittest
+from decimal import Decimal
+from types import ModuleType, SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from reporting.portfolio_report import IncrementalReport
+from services.event_bus import EventBus, OrderEvent
+from services.query_api import BotState
+
+
+def fake_modules(new_buy_amount):
+    """config, database and the services Coin loads, as far as a test-mode sell uses them"""
+    config = ModuleType('config')
+    config.config = SimpleNamespace(OPERATOR_ID=1, DEFAULT_PROCEEDS_STRATEGY='crypto',
+                                    DEFAULT_PROCEEDS_CRYPTO_RATIO=0.5, is_test_mode=lambda: True)
+    database = ModuleType('database')
+    database.db = MagicMock()
+    calculator = ModuleType('services.proceeds_calculator')
+    calculator.proceeds_calculator = MagicMock()
+    calculator.proceeds_calculator.calculate.return_value = SimpleNamespace(
+        strategy_used='crypto', crypto_ratio=0.5, sell_amount=Decimal('12'), original_amount=Decimal('10'),
+        profit=Decimal('2'), profit_percentage=20.0, new_buy_amount=Decimal(new_buy_amount),
+        retained_eur=Decimal('1'), reinvestment_ratio=0.9, min_order_applied=False)
+    return {'config': config, 'database': database, 'services.proceeds_calculator': calculator,
+            'reporting.trade_discord_notifier': MagicMock()}
+
+
+class TestOrderEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = EventBus()
+        self.state = BotState()
+        self.report = IncrementalReport('https://example.invalid/webhook', post=lambda url, data: True)
+        orders = self.bus.topic(OrderEvent)
+        orders.subscribe(self.state.on_order, name='test_query_api')
+        orders.subscribe(self.report.on_order, name='test_discord_report')
+
+    def sell(self, new_buy_amount):
+        modules = fake_modules(new_buy_amount)
+        with patch.dict(sys.modules, modules):
+            sys.modules.pop('coin', None)
+            from coin import Coin
+            client = SimpleNamespace(bitvavo=None, event_bus=self.bus)
+            coin = Coin(client, [1, 'BTC', 'EUR', 'Y', 10.0, 100.0, 0.02, 0.01, 0, 106.0, 100.0, 0, '', 0],
+                        validate_signals=False)
+            coin.last_buy_price = 100.0
+            coin.sell_signal = True
+            coin.trail_stop_sell_drempel = 104.94
+            coin.get_next_test = lambda side='mid': 104.5
+            coin.get_best_ask = lambda: 104.6
+            coin.check_action(test=True)
+            sys.modules.pop('coin', None)
+        return coin
+
+    def test_sell_with_reinvestment_publishes_both_orders(self):
+        coin = self.sell('11')
+        self.assertTrue(coin.position)  # still in position: the proceeds were bought back
+        self.assertEqual([(t['side'], t['price'], t['amount']) for t in self.state.transactions],
+                         [('buy', 104.6, 11.0), ('sell', 104.5, 10.0)])
+        self.assertEqual(len(self.report._transactions), 2)
+
+    def test_sell_without_reinvestment(self):
+        coin = self.sell('0')
+        self.assertFalse(coin.position)
+        self.assertEqual([t['side'] for t in self.state.transactions], ['sell'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,71 @@
+"""
+Test adaptive polling: markets near a trigger or with an active signal are due
+every cycle, far ones at their longer interval, within the request budget.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import unittest
+from types import SimpleNamespace
+
+from services.metrics import POLL_INTERVAL
+from services.poll_scheduler import PollScheduler, trigger_distance
+
+T0 = 1700000000.0
+
+
+def make_coin(market, matrix, position=False, gain=0.02, buy_signal=False, sell_signal=False):
+    return SimpleNamespace(analysis_pair=market, current_price=matrix, position=position, gain=gain,
+                           buy_drempel=matrix * (1 - gain), sell_drempel=matrix * (1 + gain),
+                           buy_signal=buy_signal, sell_signal=sell_signal)
+
+
+def quotes(**prices):
+    return {f'{crypto}-EUR': (price, price, price, T0) for crypto, price in prices.items()}
+
+
+class TestTriggerDistance(unittest.TestCase):
+
+    def test_distance_to_buy_and_sell_trigger(self):
+        self.assertAlmostEqual(trigger_distance(make_coin('BTC-EUR', 100.0), 100.0), 0.02)
+        self.assertAlmostEqual(trigger_distance(make_coin('BTC-EUR', 100.0, position=True), 100.0), 0.02)
+        self.assertEqual(trigger_distance(make_coin('BTC-EUR', 100.0), 97.0), 0.0)  # below the buy trigger
+        self.assertEqual(trigger_distance(make_coin('BTC-EUR', 150.0, buy_signal=True), 100.0), 0.0)
+
+
+class TestPollScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = PollScheduler(min_interval=0.0, max_interval=300.0, near=0.005, far=0.20)
+        self.hot = make_coin('BTC-EUR', 100.0, buy_signal=True)
+        self.cold = [make_coin('ETH-EUR', 1000.0), make_coin('ETH-EUR', 1100.0)]
+        self.coins = [self.hot] + self.cold
+
+    def test_far_markets_wait_for_their_interval(self):
+        self.assertEqual(len(self.scheduler.due(self.coins, now=T0)), 3)  # no prices yet
+        self.scheduler.observe(quotes(BTC=100.0, ETH=1500.0))
+        self.assertEqual(self.scheduler.due(self.coins, now=T0 + 10), [self.hot])
+        self.assertEqual(self.scheduler.intervals['ETH-EUR'], 300.0)
+        self.assertEqual(POLL_INTERVAL.labels(market='ETH-EUR').get(), 300.0)
+
+        self.assertEqual(self.scheduler.due(self.coins, now=T0 + 200), [self.hot])
+        self.assertEqual(len(self.scheduler.due(self.coins, now=T0 + 310)), 3)
+
+    def test_interval_grows_with_distance(self):
+        near = PollScheduler(max_interval=100.0, near=0.0, far=0.10)
+        self.assertEqual(near.interval_for(0.05), 50.0)
+        self.assertEqual(near.interval_for(0.5), 100.0)
+
+    def test_budget_stretches_every_interval(self):
+        scheduler = PollScheduler(min_interval=2.0, max_interval=4.0, near=0.005, far=0.20, budget=0.5)
+        scheduler.observe(quotes(BTC=100.0, ETH=1500.0))
+        scheduler.plan(self.coins)
+        # 1 rung every 2s + 2 rungs every 4s = 1 request/s, twice the budget
+        self.assertEqual(scheduler.intervals, {'BTC-EUR': 4.0, 'ETH-EUR': 8.0})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,134 @@
+"""
+Test the incremental Discord report: sections are rendered from the monitor's
+coins and quotes, and the report is posted only when it changed.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import unittest
+from types import SimpleNamespace
+
+from reporting.ladder_view import MarketLadder
+from reporting.portfolio_report import IncrementalReport, render_crypto
+from services.event_bus import OrderEvent, SignalEvent
+
+T0 = 1700000000.0
+
+
+def make_coin(coin_id, base, matrix, position=False, gain=0.02):
+    return SimpleNamespace(coin_id=coin_id, base_currency=base, current_price=matrix, position=position,
+                           gain=gain, trail=0.01, low=matrix, high=matrix)
+
+
+def quotes(**prices):
+    return {f'{crypto}-EUR': (price, price, price, T0) for crypto, price in prices.items()}
+
+
+class TestRenderCrypto(unittest.TestCase):
+
+    def test_section_layout(self):
+        rows = [{'id': 1, 'matrix': 100.0, 'gain': 0.02, 'position': 'N'},
+                {'id': 2, 'matrix': 90.0, 'gain': 0.02, 'position': 'N'},
+                {'id': 3, 'matrix': 110.0, 'gain': 0.02, 'position': 'Y'}]
+        text, stats = render_crypto('BTC', 97.0, MarketLadder(rows), tx_buy=1)
+        self.assertEqual(text, "^ [B] 110.0000\n"
+                               "! BTC 97.0000 | Bezit:1 | Watch:2 | HOT:1\n"
+                               "v [K!] 100.0000 | [K] 90.0000\n"
+                               "Tx: 1 buy, 0 sell\n\n")
+        self.assertEqual((stats['hot'], stats['bezit'], stats['watching']), (1, 1, 2))
+
+
+class TestIncrementalReport(unittest.TestCase):
+
+    def setUp(self):
+        self.posted = []
+        self.webhook_up = True
+        self.report = IncrementalReport('https://example.invalid/webhook', min_interval=60, heartbeat=3600,
+                                        price_tolerance=0.01, post=self.fake_post)
+        self.coins = [make_coin(1, 'BTC', 100.0), make_coin(2, 'BTC', 120.0, position=True),
+                      make_coin(3, 'ETH', 3000.0)]
+
+    def fake_post(self, url, data):
+        if self.webhook_up:
+            self.posted.append(data)
+        return self.webhook_up
+
+    def post(self, now):
+        posted = self.report.maybe_post(now)
+        if posted:
+            self.report._posting.acquire()  # wait for the background post
+            self.report._posting.release()
+        return posted
+
+    def test_posts_only_on_change(self):
+        self.report.update(self.coins, quotes(BTC=110.0, ETH=3100.0), now=T0)
+        self.assertTrue(self.post(T0))
+        self.assertIn('BTC', self.posted[0]['embeds'][0]['fields'][0]['value'])
+
+        # Not again within min_interval, and not for a small price move
+        self.report.update(self.coins, quotes(BTC=112.0, ETH=3100.0), now=T0 + 30)
+        self.assertFalse(self.post(T0 + 30))
+        self.report.update(self.coins, quotes(BTC=110.5, ETH=3100.0), now=T0 + 120)
+        self.assertFalse(self.post(T0 + 120))
+
+        # A buy changes the BTC section
+        self.coins[0].position = True
+        self.report.on_order(OrderEvent('BTC-EUR', 1, 'buy', 98.0, 10.0, 100.0, T0 + 130))
+        self.report.update(self.coins, quotes(BTC=110.5, ETH=3100.0), now=T0 + 130)
+        self.assertTrue(self.post(T0 + 130))
+        self.assertIn('Transacties laatste uur: 1', self.posted[1]['embeds'][0]['description'])
+
+        # A price move beyond the tolerance, once min_interval has passed
+        self.report.update(self.coins, quotes(BTC=112.0, ETH=3100.0), now=T0 + 150)
+        self.assertFalse(self.post(T0 + 150))
+        self.assertTrue(self.post(T0 + 200))
+        self.assertFalse(self.post(T0 + 300))
+
+        # The buy drops out of the last hour
+        self.report.update(self.coins, quotes(BTC=112.0, ETH=3100.0), now=T0 + 4000)
+        self.assertTrue(self.post(T0 + 4000))
+        self.assertIn('Transacties laatste uur: 0', self.posted[3]['embeds'][0]['description'])
+
+    def test_failed_post_is_retried(self):
+        self.report.update(self.coins, quotes(BTC=110.0, ETH=3100.0), now=T0)
+        self.webhook_up = False
+        self.assertTrue(self.post(T0))
+        self.webhook_up = True
+        self.assertTrue(self.post(T0 + 1))  # nothing went out, so neither min_interval nor "unchanged" apply
+        self.assertEqual(len(self.posted), 1)
+        self.assertFalse(self.post(T0 + 2))
+
+    def test_signal_rerenders_the_section(self):
+        self.report.update(self.coins, quotes(BTC=110.0, ETH=3100.0), now=T0)
+        btc, eth = self.report._sections['BTC'], self.report._sections['ETH']
+        self.coins[0].current_price = 105.0  # the coin changed along with its signal
+        self.report.on_signal(SignalEvent('BTC-EUR', 1, 105.0, True, False, T0 + 1))
+        self.report.update(self.coins, quotes(BTC=110.0, ETH=3100.0), now=T0 + 1)
+        self.assertIsNot(self.report._sections['BTC'], btc)
+        self.assertIn('105.0000', self.report._sections['BTC'][0])
+        self.assertIs(self.report._sections['ETH'], eth)
+
+    def test_only_changed_sections_are_rendered(self):
+        self.report.update(self.coins, quotes(BTC=110.0, ETH=3100.0), now=T0)
+        eth = self.report._sections['ETH']
+        self.report.update(self.coins, quotes(BTC=111.0, ETH=3100.0), now=T0 + 1)
+        self.assertIs(self.report._sections['ETH'], eth)
+        self.assertIn('111.0000', self.report._sections['BTC'][0])
+
+    def test_swapped_rung_is_rendered(self):
+        # A ladder refresh retiring one rung and activating another keeps the coin count
+        coins = [make_coin(None, 'KAS', 100.0), make_coin(None, 'KAS', 90.0)]
+        self.report.update(coins, quotes(KAS=100.5), now=T0)
+        self.assertIn('90.0000', self.report._sections['KAS'][0])
+        coins[1] = make_coin(None, 'KAS', 110.0, position=True)
+        self.report.update(coins, quotes(KAS=100.5), now=T0 + 1)
+        text = self.report._sections['KAS'][0]
+        self.assertIn('110.0000', text)
+        self.assertNotIn('90.0000', text)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,107 @@
+"""
+Test the seeded price-path generators, the per-market test-mode simulator and the
+Monte Carlo batch runner.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import unittest
+
+import numpy as np
+
+from backtest.engine import run_backtest
+from backtest.monte_carlo import profit_distribution, run_paths
+from backtest.sweep import build_ladder
+from simulation.price_paths import (MarketSimulator, bootstrap_paths, gbm_paths,
+                                    generate_paths, jump_diffusion_paths)
+
+
+class TestPathGenerators(unittest.TestCase):
+
+    def test_seeded_and_shaped(self):
+        a = gbm_paths(100.0, 500, 8, sigma=0.01, seed=42)
+        b = gbm_paths(100.0, 500, 8, sigma=0.01, seed=42)
+        self.assertEqual(a.shape, (8, 501))
+        self.assertTrue(np.array_equal(a, b))
+        self.assertTrue(np.all(a[:, 0] == 100.0))
+        self.assertFalse(np.array_equal(a, gbm_paths(100.0, 500, 8, sigma=0.01, seed=43)))
+
+    def test_gbm_volatility(self):
+        paths = gbm_paths(1.0, 2000, 50, sigma=0.01, seed=1)
+        log_returns = np.diff(np.log(paths), axis=1)
+        self.assertAlmostEqual(log_returns.std(), 0.01, delta=0.0005)
+
+    def test_jump_diffusion_has_fat_tails(self):
+        plain = np.diff(np.log(gbm_paths(1.0, 20000, 1, sigma=0.005, seed=2)))
+        jumpy = np.diff(np.log(jump_diffusion_paths(1.0, 20000, 1, sigma=0.005, jump_rate=0.01, seed=2)))
+        self.assertGreater(np.abs(jumpy).max(), 3 * np.abs(plain).max())
+
+    def test_bootstrap_resamples_history(self):
+        history = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, 300)))
+        paths = bootstrap_paths(50.0, 100, history, n_paths=3, block=5, seed=3)
+        returns = set(np.round(np.diff(np.log(history)), 12))
+        self.assertTrue(set(np.round(np.diff(np.log(paths[0])), 12)) <= returns)
+        with self.assertRaises(ValueError):
+            generate_paths('nope', 1.0, 10)
+
+
+class TestMarketSimulator(unittest.TestCase):
+
+    def test_rungs_share_one_path_per_market(self):
+        sim = MarketSimulator(seed=7, chunk=16)
+        first = sim.price('BTC-EUR', start=100.0)
+        self.assertEqual(first, 100.0)
+        sim.advance()
+        self.assertEqual(sim.price('BTC-EUR'), sim.price('BTC-EUR'))
+        bid, ask = sim.quote('BTC-EUR')
+        self.assertLess(bid, ask)
+
+    def test_reproducible_regardless_of_market_order(self):
+        a = MarketSimulator(seed=5, chunk=10)
+        b = MarketSimulator(seed=5, chunk=10)
+        a.price('ETH-EUR', start=2000.0)
+        b.price('ADA-EUR', start=0.4)
+        b.price('ETH-EUR', start=2000.0)
+        prices_a, prices_b = [], []
+        for _ in range(35):  # crosses several chunk boundaries
+            a.advance()
+            b.advance()
+            prices_a.append(a.price('ETH-EUR'))
+            prices_b.append(b.price('ETH-EUR'))
+        self.assertEqual(prices_a, prices_b)
+        self.assertEqual(len(set(prices_a)), 35)
+
+    def test_bootstrap_needs_history(self):
+        with self.assertRaises(ValueError):
+            MarketSimulator(model='bootstrap')
+        sim = MarketSimulator(model='bootstrap', seed=3, chunk=8, history=[100.0, 101.0, 99.0, 102.0])
+        sim.price('BTC-EUR', start=100.0)
+        sim.advance()
+        self.assertNotEqual(sim.price('BTC-EUR'), 100.0)
+
+
+class TestMonteCarlo(unittest.TestCase):
+
+    def test_matches_direct_backtests(self):
+        rungs = build_ladder(90, 110, 0.02, 0.02, 0.005, owned_above=100)
+        paths = gbm_paths(100.0, 2000, 6, sigma=0.004, seed=9)
+        results = run_paths(rungs, paths, spread=0.001, workers=2, batch=4)
+        self.assertEqual(len(results['profit']), 6)
+        for i in (0, 5):
+            mid = paths[i]
+            direct = run_backtest(rungs, mid * (1 - 0.0005), mid * (1 + 0.0005))
+            self.assertAlmostEqual(results['profit'][i], direct.profit)
+            self.assertEqual(results['deals'][i], direct.deals)
+
+    def test_profit_distribution(self):
+        rungs = build_ladder(90, 110, 0.02, 0.02, 0.005, owned_above=100)
+        results = profit_distribution(rungs, 100.0, 1000, n_paths=64, model='jump', seed=1, workers=2)
+        self.assertEqual(results['profit'].shape, (64,))
+        self.assertGreater(results['profit'].std(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
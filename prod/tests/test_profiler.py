@@ -0,0 +1,82 @@
+"""
+Test the on-demand cycle profiler: cProfile and sampling modes, command parsing and early stop.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import tempfile
+import time
+import unittest
+
+from services.profiler import CycleProfiler, parse_command
+
+
+def slow_check_action():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+def run_cycles(profiler, first, count):
+    for cycle in range(first, first + count):
+        profiler.start_cycle(cycle)
+        slow_check_action()
+        profiler.end_cycle(cycle)
+
+
+class TestCycleProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_nothing_happens_without_request(self):
+        profiler = CycleProfiler(self.tmp.name)
+        run_cycles(profiler, 1, 2)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_cprofile_covers_requested_cycles(self):
+        profiler = CycleProfiler(self.tmp.name, cycles=2)
+        profiler.request()
+        run_cycles(profiler, 1, 1)
+        self.assertTrue(profiler.active)
+        run_cycles(profiler, 2, 2)
+        self.assertFalse(profiler.active)
+        profiler.wait(5)
+        self.assertEqual(len([f for f in os.listdir(self.tmp.name) if f.startswith('cycles_1-2')]), 1)
+        self.assertIn('slow_check_action', profiler.last_report)
+
+    def test_sampling_profile(self):
+        profiler = CycleProfiler(self.tmp.name, sample_interval=0.001)
+        profiler.request(cycles=2, mode='sample')
+        run_cycles(profiler, 5, 2)
+        profiler.wait(5)
+        files = os.listdir(self.tmp.name)
+        self.assertTrue(files[0].endswith('.collapsed'))
+        self.assertIn('slow_check_action', profiler.last_report)
+
+    def test_second_request_stops_after_current_cycle(self):
+        profiler = CycleProfiler(self.tmp.name, cycles=100)
+        profiler.request()
+        run_cycles(profiler, 1, 2)
+        profiler.request()
+        run_cycles(profiler, 3, 1)
+        self.assertFalse(profiler.active)
+        profiler.wait(5)
+        self.assertTrue(os.listdir(self.tmp.name)[0].startswith('cycles_1-3'))
+
+    def test_parse_command(self):
+        self.assertEqual(parse_command('prof'), ('cprofile', 0))
+        self.assertEqual(parse_command('prof sample 5'), ('sample', 5))
+        self.assertIsNone(parse_command('h'))
+        with self.assertRaises(ValueError):
+            parse_command('prof fast')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
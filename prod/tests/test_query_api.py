@@ -0,0 +1,126 @@
+"""
+Test the read-only query API: the per-market views built from coins, caching
+per cycle with ETags, and the HTTP server answering 304 for unchanged state.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import json
+import unittest
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+from services.event_bus import OrderEvent
+from services.query_api import BotState, QueryServer
+
+
+def make_coin(coin_id, market, matrix, position=False, gain=0.02, trail=0.01, buy_signal=False):
+    return SimpleNamespace(
+        coin_id=coin_id, index=coin_id, analysis_pair=market, position=position, transactie_bedrag=10.0,
+        current_price=matrix, gain=gain, trail=trail, buy_drempel=matrix * (1 - gain),
+        sell_drempel=matrix * (1 + gain), low=matrix, high=matrix, trail_stop_buy_drempel=0.0,
+        trail_stop_sell_drempel=0.0, buy_signal=buy_signal, sell_signal=False, number_deals=0,
+        last_buy_price=0.0)
+
+
+class TestBotState(unittest.TestCase):
+
+    def setUp(self):
+        self.state = BotState()
+        self.coins = [
+            make_coin(1, 'BTC-EUR', 100.0),                   # 97 < 98 buy trigger: hot
+            make_coin(2, 'BTC-EUR', 98.5),                    # between 96.53 and 98.5: warm
+            make_coin(3, 'BTC-EUR', 90.0),                    # far below: cold
+            make_coin(4, 'BTC-EUR', 96.0, position=True),     # 97 > 96: warm
+            make_coin(5, 'ETH-EUR', 3000.0, buy_signal=True),
+        ]
+        self.state.publish_cycle(self.coins, {'BTC-EUR': (97.0, 96.9, 97.1, 1.0)}, cycle=1, duration=0.5)
+
+    def test_views(self):
+        coins = self.state.view_coins()
+        self.assertEqual(sorted(coins), ['BTC-EUR', 'ETH-EUR'])
+        self.assertEqual([c['id'] for c in coins['BTC-EUR']], [3, 4, 2, 1])
+        self.assertEqual(list(self.state.view_coins('ETH-EUR')), ['ETH-EUR'])
+
+        rungs = self.state.view_rungs()
+        self.assertEqual(list(rungs), ['BTC-EUR'])  # no quote for ETH-EUR
+        self.assertEqual([c['id'] for c in rungs['BTC-EUR']['hot']], [1])
+        self.assertEqual([c['id'] for c in rungs['BTC-EUR']['warm']], [4, 2])
+
+        self.assertEqual([c['id'] for c in self.state.view_signals()], [5])
+
+    def test_views_show_the_state_at_the_end_of_the_cycle(self):
+        # The trading thread changes coins during the next cycle; requests keep seeing the published state
+        self.coins[4].buy_signal = False
+        self.coins[0].position = True
+        self.assertEqual([c['id'] for c in self.state.view_signals()], [5])
+        self.assertEqual(self.state.view_coins('BTC-EUR')['BTC-EUR'][-1]['position'], 'N')
+
+    def test_bars(self):
+        from market_data.bars import BarBuilder
+        self.assertEqual(self.state.view_bars('BTC-EUR'), {})
+        self.state.bar_builder = BarBuilder(('1m',))
+        for minute, price in enumerate((97.0, 98.0, 96.0)):
+            self.state.bar_builder.update('BTC-EUR', price, 1_700_000_100_000 + minute * 60_000)
+        bars = self.state.view_bars('BTC-EUR', '1m', limit=1)
+        self.assertEqual(bars['bars'], [[1_700_000_160_000, 98.0, 98.0, 98.0, 98.0, 1.0]])
+        self.assertEqual(bars['current'][4], 96.0)
+        self.assertEqual(self.state.view_bars(None)['markets'], ['BTC-EUR'])
+        with self.assertRaises(ValueError):
+            self.state.view_bars('BTC-EUR', '7m')
+
+    def test_render_is_cached_until_the_state_changes(self):
+        body, etag = self.state.render('/coins', {})
+        self.assertIs(self.state.render('/coins', {})[0], body)
+        self.assertIsNone(self.state.render('/nope', {}))
+
+        coin = self.coins[0]
+        self.state.on_order(OrderEvent(coin.analysis_pair, coin.coin_id, 'buy', 97.0, coin.transactie_bedrag,
+                                       coin.current_price, 1_700_000_000.0))
+        body2, etag2 = self.state.render('/transactions', {'limit': ['1']})
+        self.assertEqual(json.loads(body2)[0]['side'], 'buy')
+        self.assertNotEqual(self.state.render('/coins', {})[1], etag)
+
+
+class TestQueryServer(unittest.TestCase):
+
+    def setUp(self):
+        self.state = BotState()
+        self.state.publish_cycle([make_coin(1, 'BTC-EUR', 100.0)], {}, cycle=7, duration=0.25)
+        self.server = QueryServer(self.state, port=0).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_etag_and_not_modified(self):
+        with urllib.request.urlopen(self.url + '/cycle') as response:
+            etag = response.headers['ETag']
+            cycle = json.loads(response.read())
+        self.assertEqual(cycle['cycle'], 7)
+        self.assertEqual(cycle['coins'], 1)
+
+        request = urllib.request.Request(self.url + '/cycle', headers={'If-None-Match': etag})
+        with self.assertRaises(urllib.error.HTTPError) as raised:
+            urllib.request.urlopen(request)
+        self.assertEqual(raised.exception.code, 304)
+
+        self.state.publish_cycle([], {}, cycle=8, duration=0.25)
+        with urllib.request.urlopen(request) as response:
+            self.assertEqual(json.loads(response.read())['cycle'], 8)
+
+    def test_errors(self):
+        with self.assertRaises(urllib.error.HTTPError) as raised:
+            urllib.request.urlopen(self.url + '/unknown')
+        self.assertEqual(raised.exception.code, 404)
+        with self.assertRaises(urllib.error.HTTPError) as raised:
+            urllib.request.urlopen(self.url + '/transactions?limit=x')
+        self.assertEqual(raised.exception.code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
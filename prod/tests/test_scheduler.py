@@ -0,0 +1,76 @@
+"""
+Test the scheduler shared by the Titan market watchers: timed jobs run in time
+order on the workers, cancelled jobs never run, a failing job does not take a
+worker down, and next_close finds the end of the running candle.
+"""
+import sys
+import os
+
+# Add the repository root to path, for the core package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import threading
+import time
+import unittest
+
+from core.markets.scheduler import Scheduler, next_close
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = Scheduler(workers=2)
+        self.ran = []
+        self.done = threading.Event()
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def record(self, name):
+        self.ran.append(name)
+        if name == 'last':
+            self.done.set()
+
+    def test_timed_jobs_run_in_time_order(self):
+        start = time.time()
+        self.scheduler.call_later(0.15, self.record, 'last')
+        self.scheduler.call_at(start + 0.05, self.record, 'first')
+        self.scheduler.call_later(0.10, self.record, 'second')
+        self.assertTrue(self.done.wait(2))
+        self.assertEqual(self.ran, ['first', 'second', 'last'])
+        self.assertGreaterEqual(time.time() - start, 0.15)
+        self.assertEqual(self.scheduler.pending(), 0)
+
+    def test_cancelled_jobs_do_not_run(self):
+        timer = self.scheduler.call_later(0.05, self.record, 'cancelled')
+        self.scheduler.call_later(0.10, self.record, 'last')
+        self.assertEqual(self.scheduler.pending(), 2)
+        self.scheduler.cancel(timer)
+        self.assertEqual(self.scheduler.pending(), 1)
+        self.assertTrue(self.done.wait(2))
+        self.assertEqual(self.ran, ['last'])
+
+    def test_failing_job_keeps_the_workers_running(self):
+        def fail():
+            raise RuntimeError('boom')
+        for _ in range(3):
+            self.scheduler.submit(fail)
+        self.scheduler.submit(self.record, 'last')
+        self.assertTrue(self.done.wait(2))
+
+    def test_stop_drops_scheduled_jobs(self):
+        self.scheduler.call_later(0.05, self.record, 'last')
+        self.scheduler.stop()
+        self.assertFalse(self.done.wait(0.2))
+
+
+class TestNextClose(unittest.TestCase):
+
+    def test_next_close(self):
+        self.assertEqual(next_close(60, now=120.0), 180.0)
+        self.assertEqual(next_close(60, now=179.9), 180.0)
+        self.assertEqual(next_close(300, now=1700000001.0), 1700000100.0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
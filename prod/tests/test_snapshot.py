@@ -0,0 +1,98 @@
+"""
+Test the warm-start snapshot: round trip through the memory-mapped file, the
+per-coin row check that keeps stale records out, and rejection of damaged or
+old files.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import tempfile
+import unittest
+
+from services.snapshot import SNAPSHOT_DTYPE, load_snapshot, write_snapshot
+
+
+class FakeCoin:
+    """The attributes of Coin that a snapshot reads"""
+
+    def __init__(self, coin_id, temp_high):
+        self.coin_id = coin_id
+        self.temp_high = temp_high
+        self.buy_signal = False
+        self.sell_signal = True
+        self.high = temp_high
+        self.low = 90.0
+        self.buy_drempel = 95.0
+        self.sell_drempel = 103.0
+        self.trail_stop_buy_drempel = 0.0
+        self.trail_stop_sell_drempel = temp_high * 0.99
+        self.ask = 104.1
+        self.bid = 104.0
+
+    def _coin_row(self):
+        return {'index_num': self.coin_id, 'position': 'Y', 'temp_high': self.temp_high}
+
+
+class FakeClient:
+    _ticker_cache = {'data': [{'market': 'BTC-EUR', 'bid': '104.0'}]}
+    _cache_timestamp = 1700000000.0
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'state.snapshot')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_and_stale_rows(self):
+        coins = [FakeCoin(1, 105.0), FakeCoin(2, 110.0), FakeCoin(None, 1.0)]
+        write_snapshot(self.path, coins, FakeClient(), cycle=42)
+
+        snapshot = load_snapshot(self.path)
+        self.assertEqual(len(snapshot), 2)
+        self.assertEqual(snapshot.header['cycle'], 42)
+        self.assertEqual(snapshot.header['ticker_cache'], FakeClient._ticker_cache)
+
+        record = snapshot.record(1, coins[0]._coin_row())
+        self.assertTrue(record['sell_signal'])
+        self.assertAlmostEqual(float(record['trail_stop_sell_drempel']), 105.0 * 0.99)
+
+        moved = FakeCoin(2, 111.0)  # temp_high changed after the snapshot was written
+        self.assertIsNone(snapshot.record(2, moved._coin_row()))
+        self.assertIsNone(snapshot.record(3, coins[0]._coin_row()))
+        record = None
+        snapshot.close()
+
+    def test_damaged_files_are_ignored(self):
+        self.assertIsNone(load_snapshot(self.path))
+        write_snapshot(self.path, [FakeCoin(1, 105.0)])
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        with open(self.path, 'wb') as f:
+            f.write(data[:-SNAPSHOT_DTYPE.itemsize // 2])
+        self.assertIsNone(load_snapshot(self.path))
+        with open(self.path, 'wb') as f:
+            f.write(b'not a snapshot')
+        self.assertIsNone(load_snapshot(self.path))
+
+    def test_old_snapshots_are_ignored(self):
+        write_snapshot(self.path, [FakeCoin(1, 105.0)])
+        snapshot = load_snapshot(self.path)
+        created = snapshot.header['created']
+        snapshot.close()
+
+        snapshot = load_snapshot(self.path, max_age=300.0, now=created + 299.0)
+        self.assertEqual(len(snapshot), 1)
+        snapshot.close()
+        self.assertIsNone(load_snapshot(self.path, max_age=300.0, now=created + 301.0))
+        self.assertIsNotNone(load_snapshot(self.path, now=created + 86400.0))  # no limit
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,96 @@
+"""
+Test the coin state journal: delta encoding, batching, urgent write-through,
+checkpoints and recovery after a crash (including a torn last record).
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import json
+import tempfile
+import unittest
+
+from services.state_journal import StateJournal
+
+
+def row(**changes):
+    state = {'index_num': 1, 'position': 'N', 'temp_high': 100.0, 'temp_low': 100.0, 'buy_signal': False}
+    state.update(changes)
+    return state
+
+
+class TestStateJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'state.journal')
+        self.applied = []
+        self.journal = self.open()
+
+    def tearDown(self):
+        self.journal._file.close()
+        self.tmp.cleanup()
+
+    def open(self, **kwargs):
+        return StateJournal(self.path, lambda coin_id, state: self.applied.append((coin_id, state)),
+                            sync_interval=3600, **kwargs)
+
+    def lines(self):
+        with open(self.path, 'rb') as f:
+            return [json.loads(line[9:]) for line in f]
+
+    def test_only_changed_fields_are_journaled_in_batches(self):
+        self.journal.track(7, row())
+        self.journal.record(7, row())
+        self.journal.record(7, row(temp_low=99.0))
+        self.journal.record(7, row(temp_low=98.5, buy_signal=True))
+        self.assertEqual(self.lines(), [])  # still buffered
+
+        self.journal.sync()
+        deltas = [line['d'] for line in self.lines()]
+        self.assertEqual(deltas, [{'temp_low': 99.0}, {'temp_low': 98.5, 'buy_signal': True}])
+        self.assertEqual(self.applied, [])
+
+    def test_position_changes_are_written_through(self):
+        self.journal.track(7, row())
+        self.journal.record(7, row(position='Y', temp_high=90.0))
+        self.assertEqual(len(self.lines()), 1)
+        self.assertEqual(self.applied, [(7, row(position='Y', temp_high=90.0))])
+
+    def test_checkpoint_folds_state_and_empties_journal(self):
+        for coin_id in (1, 2):
+            self.journal.track(coin_id, row())
+        self.journal.record(1, row(temp_low=95.0))
+        self.journal.record(1, row(temp_low=94.0))
+        self.journal.checkpoint()
+        self.assertEqual(self.applied, [(1, row(temp_low=94.0))])
+        self.assertEqual(self.lines(), [self.lines()[0]])
+        self.assertIn('checkpoint', self.lines()[0])
+
+        self.journal.checkpoint()  # nothing changed since
+        self.assertEqual(len(self.applied), 1)
+
+    def test_recovery_after_crash_drops_torn_record(self):
+        self.journal.track(3, row())
+        self.journal.record(3, row(temp_low=97.0))
+        self.journal.record(3, row(temp_low=96.0, buy_signal=True))
+        self.journal.sync()
+        self.journal._file.write(b'0badc0de {"s": 9, "c": 3, "d": {"temp_lo')  # crash mid-write
+        self.journal._file.close()
+
+        journal = self.open()
+        try:
+            self.assertEqual(journal.recover(), {3: {'temp_low': 96.0, 'buy_signal': True}})
+            self.assertEqual(len(self.lines()), 2)  # torn tail cut off
+
+            journal.record(3, row(temp_low=95.0))
+            journal.sync()
+            self.assertEqual(self.lines()[-1]['s'], 3)
+        finally:
+            journal._file.close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
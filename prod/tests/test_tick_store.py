@@ -0,0 +1,81 @@
+"""
+Test the memory-mapped tick store: append, range reads, ordering and torn-tail recovery.
+"""
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import tempfile
+import unittest
+
+import numpy as np
+
+from market_data.tick_store import TickStore
+
+
+class TestTickStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = TickStore(self.tmp.name, flush_every=4)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_append_and_read_range(self):
+        for i in range(10):
+            self.store.append('BTC-EUR', 1000 + i, 100.0 + i, 101.0 + i, 0.5, 0.25)
+        self.store.flush()
+
+        view = self.store.read('BTC-EUR', start=1003, end=1007)
+        self.assertEqual(list(view.ts), [1003, 1004, 1005, 1006])
+        self.assertTrue(np.allclose(view.bid, [103, 104, 105, 106]))
+        self.assertTrue(np.allclose(view.ask, [104, 105, 106, 107]))
+        self.assertTrue(np.allclose(view.bid_size, 0.5))
+
+        # Views point into the mapped file instead of holding a copy
+        self.assertIsInstance(view.ts.base, np.memmap)
+
+    def test_out_of_order_ticks_are_dropped(self):
+        self.assertTrue(self.store.append('ETH-EUR', 2000, 1.0, 1.1))
+        self.assertFalse(self.store.append('ETH-EUR', 1999, 1.0, 1.1))
+        self.store.flush()
+        self.assertEqual(self.store.count('ETH-EUR'), 1)
+
+    def test_append_tickers_payload(self):
+        tickers = [
+            {'market': 'ADA-EUR', 'bid': '0.35', 'ask': '0.36', 'bidSize': '10', 'askSize': '12'},
+            {'market': 'XRP-EUR', 'bid': None, 'ask': '0.5'},  # no bid - skipped
+        ]
+        self.assertEqual(self.store.append_tickers(tickers, ts=5000), 1)
+        self.store.flush()
+        self.assertEqual(self.store.markets(), ['ADA-EUR'])
+        view = self.store.read('ADA-EUR')
+        self.assertEqual(float(view.ask_size[0]), 12.0)
+
+    def test_reopen_and_torn_tail(self):
+        for i in range(4):
+            self.store.append('SOL-EUR', i, 10.0, 11.0)
+        self.store.flush()
+
+        # Simulate a crash after a value column was written but before the timestamps
+        with open(os.path.join(self.tmp.name, 'SOL-EUR', 'bid.bin'), 'ab') as f:
+            f.write(np.float64(99.0).tobytes())
+
+        reopened = TickStore(self.tmp.name, flush_every=1)
+        self.assertEqual(reopened.count('SOL-EUR'), 4)
+        self.assertFalse(reopened.append('SOL-EUR', 2, 10.0, 11.0))
+        self.assertTrue(reopened.append('SOL-EUR', 4, 12.0, 13.0))
+        view = reopened.read('SOL-EUR')
+        self.assertEqual(list(view.ts), [0, 1, 2, 3, 4])
+        self.assertEqual(float(view.bid[-1]), 12.0)
+
+    def test_unknown_market_is_empty(self):
+        self.assertEqual(len(self.store.read('DOGE-EUR').ts), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)